@@ -9,6 +9,7 @@ import os
 import sys
 import json
 import uuid
+import random
 import sqlite3
 import logging
 import hashlib
@@ -17,7 +18,7 @@ from datetime import datetime
 from pathlib import Path
 from functools import wraps
 
-from flask import Flask, request, jsonify, send_from_directory, g
+from flask import Flask, request, jsonify, send_from_directory, g, Response, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
@@ -851,9 +852,8 @@ def upload_scan():
                 )
             else:
                 # Fallback to legacy inference
-                from ml.inference import predict_npk, generate_gradcam_heatmap
-                prediction = predict_npk(str(filepath), crop_id=ml_crop_id)
-                heatmap_base64 = generate_gradcam_heatmap(str(filepath), crop_id=ml_crop_id)
+                from ml.inference import predict_npk_with_heatmap
+                prediction, heatmap_base64 = predict_npk_with_heatmap(str(filepath), crop_id=ml_crop_id)
                 
                 if heatmap_base64 and isinstance(heatmap_base64, str) and heatmap_base64.startswith('data:image'):
                     try:
@@ -890,9 +890,8 @@ def upload_scan():
                 )
         else:
             # Legacy model
-            from ml.inference import predict_npk, generate_gradcam_heatmap
-            prediction = predict_npk(str(filepath), crop_id=ml_crop_id)
-            heatmap_base64 = generate_gradcam_heatmap(str(filepath), crop_id=ml_crop_id)
+            from ml.inference import predict_npk_with_heatmap
+            prediction, heatmap_base64 = predict_npk_with_heatmap(str(filepath), crop_id=ml_crop_id)
             
             if heatmap_base64 and isinstance(heatmap_base64, str) and heatmap_base64.startswith('data:image'):
                 try:
@@ -930,7 +929,6 @@ def upload_scan():
     except Exception as e:
         logger.exception("scan_inference_error scan_uuid=%s filename=%s error=%s", scan_uuid, filename, str(e))
         # Fallback to mock predictions
-        import random
         prediction = {
             'n_score': random.uniform(0.2, 0.9),
             'p_score': random.uniform(0.2, 0.9),
@@ -1709,6 +1707,68 @@ def chat():
         }), 500
 
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Streaming variant of /api/chat using Server-Sent Events.
+    
+    Takes the same request body as /api/chat. Each event's data is JSON:
+        {'delta': str}                 - next piece of the AI response
+        {'done': true, 'model': str}   - response complete
+        {'error': str, 'needs_connection': bool} - request failed
+    """
+    try:
+        from ml.ollama_client import chat_with_ollama_stream, OllamaError, OLLAMA_MODEL
+    except ImportError as e:
+        logger.error("ollama_import_failed error=%s", str(e))
+        return jsonify({
+            'success': False,
+            'error': 'AI module not available',
+            'needs_connection': True
+        }), 503
+    
+    data = request.json or {}
+    message = data.get('message', '').strip()
+    
+    if not message:
+        return jsonify({'error': 'Message is required', 'success': False}), 400
+    
+    chat_history = data.get('history', [])
+    context = data.get('context')
+    image_base64 = data.get('image')
+    language = data.get('language')
+    
+    logger.info("chat_stream_request message_length=%d history_count=%d has_context=%s has_image=%s",
+               len(message), len(chat_history), bool(context), bool(image_base64))
+    
+    def sse(payload):
+        return f"data: {json.dumps(payload)}\n\n"
+    
+    def generate():
+        try:
+            for delta in chat_with_ollama_stream(
+                message=message,
+                chat_history=chat_history,
+                context=context,
+                image_base64=image_base64,
+                language=language
+            ):
+                yield sse({'delta': delta})
+            yield sse({'done': True, 'model': OLLAMA_MODEL})
+        except OllamaError as e:
+            yield sse({'error': str(e), 'needs_connection': e.needs_connection})
+        except Exception as e:
+            # Timeouts and connection failures surface here mid-stream
+            logger.warning("chat_stream_error error=%s", str(e))
+            yield sse({'error': 'Cannot reach the AI server.', 'needs_connection': True})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/api/chat/status', methods=['GET'])
 def chat_status():
     """Check if AI chat service (Ollama) is available."""
@@ -2507,9 +2567,24 @@ if __name__ == '__main__':
     print("🌱 FasalVaidya API Server")
     print("=" * 60)
     
+    port = int(os.environ.get('PORT', 5000))
+    debug = os.environ.get('FLASK_DEBUG', 'true').lower() == 'true'
+    
     # Initialize database
     init_db()
     
+    # Load ML models up front so the first scan isn't a cold start
+    # (skipped in the debug reloader's watcher process, which never serves requests)
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        print("\n🧠 Loading ML models...")
+        try:
+            from ml.inference import init_ml
+            init_ml()
+            print("✓ ML models ready")
+        except Exception as e:
+            print(f"⚠️  ML warm-up failed: {e}")
+            print("   Models will be loaded on first request")
+    
     # Initialize Supabase Storage buckets
     print("\n📦 Initializing Supabase Storage...")
     try:
@@ -2552,9 +2627,6 @@ if __name__ == '__main__':
     print("")
     
     # Start server
-    port = int(os.environ.get('PORT', 5000))
-    debug = os.environ.get('FLASK_DEBUG', 'true').lower() == 'true'
-    
     print(f"🚀 Starting server on http://localhost:{port}")
     print(f"   Debug mode: {debug}")
     print("=" * 60 + "\n")
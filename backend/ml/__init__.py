@@ -7,19 +7,23 @@ NPK deficiency detection using deep learning.
 from .inference import (
     predict_npk,
     generate_gradcam_heatmap,
+    predict_npk_with_heatmap,
     get_model_info,
     get_severity,
     get_severity_color,
-    preprocess_image
+    preprocess_image,
+    init_ml
 )
 
 __all__ = [
     'predict_npk',
     'generate_gradcam_heatmap',
+    'predict_npk_with_heatmap',
     'get_model_info',
     'get_severity',
     'get_severity_color',
-    'preprocess_image'
+    'preprocess_image',
+    'init_ml'
 ]
 
 __version__ = '1.0.0'
@@ -0,0 +1,138 @@
+"""
+FasalVaidya Dynamic Request Batching
+====================================
+Collects concurrent single-image inference requests into one batched model
+call. Each request submits its (1, H, W, C) array and gets a Future that a
+background worker resolves with its row of the batch output.
+
+Every model gets its own worker thread, so different models (e.g. the leaf
+validator and the disease classifier) run in parallel while calls into any
+one model, including non-thread-safe TFLite interpreters, stay serialized.
+
+Configuration (environment):
+- FASALVAIDYA_DYNAMIC_BATCHING : '0' runs requests one at a time (default '1')
+- FASALVAIDYA_BATCH_MAX_SIZE   : max requests per batch (default 16)
+- FASALVAIDYA_BATCH_WINDOW_MS  : how long to wait for more requests (default 15)
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger('fasalvaidya.ml.batching')
+
+BATCHING_ENABLED = os.getenv('FASALVAIDYA_DYNAMIC_BATCHING', '1') != '0'
+BATCH_MAX_SIZE = int(os.getenv('FASALVAIDYA_BATCH_MAX_SIZE', '16'))
+BATCH_WINDOW_MS = float(os.getenv('FASALVAIDYA_BATCH_WINDOW_MS', '15'))
+BATCH_QUEUE_SIZE = 100
+BATCH_TIMEOUT_S = 30.0
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+class DynamicBatcher:
+    """Background worker that batches requests for a single model."""
+
+    def __init__(self, predict_batch_fn, name='model', max_batch_size=BATCH_MAX_SIZE,
+                 window_ms=BATCH_WINDOW_MS):
+        self._predict_batch_fn = predict_batch_fn
+        self.name = name
+        self.max_batch_size = max(1, max_batch_size)
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self._queue = queue.Queue(maxsize=BATCH_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._worker, name=f'batcher-{name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, img_array, timeout=BATCH_TIMEOUT_S):
+        """Queue a (1, H, W, C) array; the returned Future resolves to its prediction row.
+
+        The array is read when its batch runs, so callers must keep it intact until
+        the Future is done (per-thread preprocessing buffers are fine while waiting).
+        """
+        future = Future()
+        future.array = img_array
+        self._queue.put(future, timeout=timeout)
+        return future
+
+    def predict(self, img_array, timeout=BATCH_TIMEOUT_S):
+        """Submit a (1, H, W, C) array and block until its prediction row is ready."""
+        return self.submit(img_array, timeout).result(timeout)
+
+    def _collect(self):
+        """Block for one request, then gather more until the batch is full or the window closes."""
+        pending = [self._queue.get()]
+        deadline = time.monotonic() + self.window_s
+        while len(pending) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    pending.append(self._queue.get(timeout=remaining))
+                else:
+                    pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return pending
+
+    def _worker(self):
+        while True:
+            # Drop requests whose callers cancelled them while queued
+            pending = [f for f in self._collect() if f.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+            try:
+                batch = np.concatenate([future.array for future in pending], axis=0)
+                outputs = self._predict_batch_fn(batch)
+            except Exception as e:
+                logger.error("ml_batch_error model=%s size=%d error=%s", self.name, len(pending), str(e))
+                for future in pending:
+                    future.set_exception(e)
+                continue
+            if len(pending) > 1:
+                logger.debug("ml_batch_run model=%s size=%d", self.name, len(pending))
+            for i, future in enumerate(pending):
+                future.set_result(outputs[i])
+
+
+def submit_batched(model, img_array, predict_batch_fn, name='model', max_batch_size=None):
+    """
+    Queue a single-image prediction on the model's shared batcher.
+
+    Args:
+        model: Model object; one batcher (and worker thread) is kept per model
+        img_array: Preprocessed (1, H, W, C) input
+        predict_batch_fn: Callable mapping a (B, H, W, C) batch to B output rows
+        name: Label used for the worker thread and logs
+        max_batch_size: Largest batch the model accepts (e.g. 1 for fixed-batch
+            TFLite exports); caps BATCH_MAX_SIZE when the batcher is created
+
+    Returns:
+        Future resolving to the model output row for img_array (batch dimension removed)
+    """
+    key = id(model)
+    batcher = _batchers.get(key)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(key)
+            if batcher is None:
+                # With batching off the worker still runs the model off the caller's
+                # thread (one request at a time), so submitters can overlap models
+                limit = BATCH_MAX_SIZE if BATCHING_ENABLED else 1
+                if max_batch_size is not None:
+                    limit = min(limit, max_batch_size)
+                batcher = DynamicBatcher(predict_batch_fn, name=name, max_batch_size=limit)
+                _batchers[key] = batcher
+                logger.info("ml_batcher_started model=%s max_batch=%d window_ms=%.1f",
+                            name, batcher.max_batch_size, batcher.window_s * 1000)
+    return batcher.submit(img_array)
+
+
+def predict_batched(model, img_array, predict_batch_fn, name='model', timeout=BATCH_TIMEOUT_S,
+                    max_batch_size=None):
+    """Run a single-image prediction through the model's shared batcher and wait for it."""
+    return submit_batched(model, img_array, predict_batch_fn, name, max_batch_size).result(timeout)
@@ -0,0 +1,162 @@
+"""
+FasalVaidya V2 - TFLite Export Script
+
+Converts the EnhancedModel3 Keras models (disease classifier and leaf
+validator) into optimized TFLite files that inference_v2 picks up
+automatically:
+
+- <model>_int8.tflite : full-integer (INT8) quantization calibrated on a
+                        representative set of training images. Runs on
+                        XNNPACK, the TFLite interpreter's default CPU delegate.
+                        Outputs stay float32 unless --int8-output is given:
+                        an int8 softmax only resolves probabilities in 1/256
+                        steps, which is coarse for the weighted deficiencies.
+- <model>_fp16.tflite : float16 weights, half the size of the FP32 model with
+                        negligible accuracy loss. Used when no INT8 file exists.
+
+Usage:
+  python ml/export_v2_tflite.py --data-dir ml/unified_v2_dataset/train
+  python ml/export_v2_tflite.py --model disease --num-samples 200
+  python ml/export_v2_tflite.py --skip-int8
+  python ml/export_v2_tflite.py --int8-output
+"""
+
+import os
+import sys
+import argparse
+import random
+from pathlib import Path
+
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+
+import tensorflow as tf
+from tensorflow import keras
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ml.inference_v2 import (
+    DISEASE_MODEL_KERAS,
+    DISEASE_MODEL_TFLITE_FP16,
+    DISEASE_MODEL_TFLITE_INT8,
+    LEAF_VALIDATOR_KERAS,
+    LEAF_VALIDATOR_TFLITE_FP16,
+    LEAF_VALIDATOR_TFLITE_INT8,
+    preprocess_image,
+)
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / 'unified_v2_dataset' / 'train'
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+MODELS = {
+    'disease': {
+        'keras': DISEASE_MODEL_KERAS,
+        'int8': DISEASE_MODEL_TFLITE_INT8,
+        'fp16': DISEASE_MODEL_TFLITE_FP16,
+    },
+    'leaf': {
+        'keras': LEAF_VALIDATOR_KERAS,
+        'int8': LEAF_VALIDATOR_TFLITE_INT8,
+        'fp16': LEAF_VALIDATOR_TFLITE_FP16,
+    },
+}
+
+
+def find_calibration_images(data_dir, num_samples=100, seed=42):
+    """Pick a random sample of training images for INT8 calibration."""
+    images = [p for p in Path(data_dir).rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS]
+    random.Random(seed).shuffle(images)
+    return images[:num_samples]
+
+
+def representative_dataset(image_paths):
+    """Yield inputs preprocessed exactly like inference_v2 does at serving time."""
+    def gen():
+        for path in image_paths:
+            img_array, _ = preprocess_image(str(path))
+            # preprocess_image reuses its buffer, hand the converter a private copy
+            yield [img_array.copy()]
+    return gen
+
+
+def export_int8(model, output_path, image_paths, int8_output=False):
+    """Convert a Keras model to a full-integer TFLite model (per-channel conv weights)."""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset(image_paths)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    if int8_output:
+        # inference_v2 dequantizes int8 outputs with the tensor's own scale/zero point
+        converter.inference_output_type = tf.int8
+    tflite_model = converter.convert()
+
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    print(f"✅ INT8 TFLite saved: {output_path} ({len(tflite_model) / 1024 / 1024:.2f} MB)")
+
+
+def export_fp16(model, output_path):
+    """Convert a Keras model to a float16-weight TFLite model."""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    tflite_model = converter.convert()
+
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    print(f"✅ FP16 TFLite saved: {output_path} ({len(tflite_model) / 1024 / 1024:.2f} MB)")
+
+
+def export_model(name, data_dir, num_samples, skip_int8=False, int8_output=False):
+    paths = MODELS[name]
+    if not paths['keras'].exists():
+        print(f"❌ Keras model not found: {paths['keras']}")
+        return False
+
+    model = keras.models.load_model(str(paths['keras']), compile=False)
+    print(f"\n📦 Exporting {name} model ({paths['keras'].name})")
+
+    try:
+        export_fp16(model, paths['fp16'])
+    except Exception as e:
+        print(f"⚠️ FP16 conversion failed: {e}")
+        return False
+
+    if skip_int8:
+        return True
+
+    image_paths = find_calibration_images(data_dir, num_samples)
+    if not image_paths:
+        print(f"⚠️ No calibration images found in {data_dir}, skipping INT8 export")
+        return False
+    print(f"   Calibrating on {len(image_paths)} images from {data_dir}")
+
+    try:
+        export_int8(model, paths['int8'], image_paths, int8_output)
+    except Exception as e:
+        print(f"⚠️ INT8 conversion failed: {e}")
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export V2 models to optimized TFLite")
+    parser.add_argument('--model', choices=['disease', 'leaf', 'all'], default='all',
+                        help='Which model to export (default: all)')
+    parser.add_argument('--data-dir', type=str, default=str(DEFAULT_DATA_DIR),
+                        help='Training images used for INT8 calibration')
+    parser.add_argument('--num-samples', type=int, default=100,
+                        help='Number of calibration images (default: 100)')
+    parser.add_argument('--skip-int8', action='store_true',
+                        help='Only export the FP16 model (no calibration data needed)')
+    parser.add_argument('--int8-output', action='store_true',
+                        help='Also quantize the INT8 model output (default: float32 output)')
+    args = parser.parse_args()
+
+    names = list(MODELS) if args.model == 'all' else [args.model]
+    ok = all([export_model(name, args.data_dir, args.num_samples, args.skip_int8, args.int8_output) for name in names])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
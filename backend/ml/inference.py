@@ -14,8 +14,12 @@ import sys
 import json
 import base64
 import logging
+import threading
 import numpy as np
+from collections import defaultdict
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, Callable, Dict, Optional
 from io import BytesIO
 from PIL import Image
 
@@ -28,6 +32,8 @@ try:
 except Exception:
     cv2 = None
 
+from .batching import predict_batched
+
 # Try to import V2 inference module
 try:
     from . import inference_v2
@@ -113,10 +119,37 @@ SEVERITY_THRESHOLDS = {
     'healthy': 0.0      # < 40% deficiency score
 }
 
-# Global model cache (crop_id -> model)
-_crop_models = {}
-_default_model = None
-_default_model_path = None
+# XLA-compile the Grad-CAM forward/backward pass. Each call runs several times faster,
+# but the first compile per model can take a minute, so it is opt-in and warmed up in init_ml().
+GRADCAM_JIT_COMPILE = os.getenv('FASALVAIDYA_GRADCAM_XLA', '0') == '1'
+
+# Nutrient names in model output order (N, P, K, Mg)
+NUTRIENT_NAMES = ('nitrogen', 'phosphorus', 'potassium', 'magnesium')
+
+# ImageNet normalization constants used by the 'torch' preprocessing mode
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+@dataclass
+class MLState:
+    """Loaded models and per-model caches, filled lazily or by init_ml()."""
+    crop_models: Dict[str, tuple] = field(default_factory=dict)  # crop_id -> model tuple
+    crop_registry: Optional[Dict[str, Any]] = None
+    crop_registry_mtime: Optional[float] = None
+    inference_fns: Dict[int, Callable] = field(default_factory=dict)  # id(model) -> compiled forward pass
+    default_model: Any = None
+    default_model_path: Optional[str] = None
+    default_preprocess_fn: Optional[Callable] = None
+    preprocess_fns: Dict[tuple, Callable] = field(default_factory=dict)  # (backbone, builtin, size) -> preprocessing fn
+    tflite_interpreter: Any = None
+    grad_model_cache: Dict[int, tuple] = field(default_factory=dict)  # id(model) -> (last_conv_layer, compiled Grad-CAM fn)
+    # Serialize model loads so concurrent first requests don't each load the same model
+    default_model_lock: threading.Lock = field(default_factory=threading.Lock)
+    crop_model_locks: Dict[str, threading.Lock] = field(default_factory=lambda: defaultdict(threading.Lock))
+
+
+_state = MLState()
 
 logger = logging.getLogger('fasalvaidya.ml')
 
@@ -145,12 +178,56 @@ def _find_latest_model(crop_id):
     return candidates[0] if candidates else None
 
 
+def _preprocess_constants(backbone, has_builtin_preprocessing):
+    """Return (scale, bias) so that preprocessing is a single `x * scale + bias`."""
+    if has_builtin_preprocessing:
+        # ImageNetPreprocessing layer is baked into the model, feed raw 0-255 pixels
+        return [1.0, 1.0, 1.0], [0.0, 0.0, 0.0]
+    if backbone and 'efficientnet' in backbone.lower():
+        # 'torch' mode: (x / 255 - mean) / std
+        scale = [1.0 / (255.0 * s) for s in IMAGENET_STD]
+        bias = [-m / s for m, s in zip(IMAGENET_MEAN, IMAGENET_STD)]
+        return scale, bias
+    if backbone and 'mobilenet' in backbone.lower():
+        # 'tf' mode: scale to [-1, 1]
+        return [1.0 / 127.5] * 3, [-1.0] * 3
+    # Fallback: normalize to 0-1 range for generic models
+    return [1.0 / 255.0] * 3, [0.0, 0.0, 0.0]
+
+
+def _build_preprocess_fn(backbone, has_builtin_preprocessing, target_size=MODEL_CONFIG['input_size']):
+    """
+    Build a graph-compiled preprocessing function specialized for one model.
+
+    The backbone/builtin branching is resolved here, once per loaded model, so the
+    request path only runs resize + a folded scale/bias. XLA is not enabled because
+    upload resolutions vary and would trigger a recompile per input shape.
+    """
+    scale, bias = _preprocess_constants(backbone, has_builtin_preprocessing)
+    scale = tf.constant(scale, dtype=tf.float32)
+    bias = tf.constant(bias, dtype=tf.float32)
+
+    @tf.function(input_signature=[tf.TensorSpec([None, None, None, 3], tf.uint8)])
+    def preprocess_fn(images):
+        x = tf.image.resize(tf.cast(images, tf.float32), target_size, method='bilinear', antialias=True)
+        return x * scale + bias
+
+    return preprocess_fn
+
+
 def load_crop_registry():
-    """Load the crop model registry."""
-    if CROP_REGISTRY_PATH.exists():
+    """Load the crop model registry (re-parsed only when the file changes)."""
+    
+    try:
+        mtime = CROP_REGISTRY_PATH.stat().st_mtime
+    except OSError:
+        return {}
+    
+    if _state.crop_registry is None or mtime != _state.crop_registry_mtime:
         with open(CROP_REGISTRY_PATH) as f:
-            return json.load(f)
-    return {}
+            _state.crop_registry = json.load(f)
+        _state.crop_registry_mtime = mtime
+    return _state.crop_registry
 
 
 def get_crop_model(crop_id):
@@ -161,17 +238,36 @@ def get_crop_model(crop_id):
         crop_id: Crop identifier (e.g., 'rice', 'tomato', 'wheat')
     
     Returns:
-        tuple: (model, model_path, outputs, backbone, has_builtin_preprocessing) or (None, None, None, None, False)
+        tuple: (model, model_path, outputs, backbone, has_builtin_preprocessing, preprocess_fn)
+               or (None, None, None, None, False, None)
     """
-    global _crop_models
+    cached = _get_cached_crop_model(crop_id)
+    if cached is not None:
+        return cached
+    
+    with _state.crop_model_locks[crop_id]:
+        # Another request may have loaded it while we waited for the lock
+        cached = _get_cached_crop_model(crop_id)
+        if cached is not None:
+            return cached
+        return _load_crop_model(crop_id)
 
-    # Return cached model if path is still valid; otherwise drop cache so retrained models reload
-    if crop_id in _crop_models:
-        cached_model, cached_path, outputs, backbone, has_builtin = _crop_models[crop_id]
-        if cached_path and os.path.exists(cached_path):
-            return _crop_models[crop_id]
-        _crop_models.pop(crop_id, None)
-    
+
+def _get_cached_crop_model(crop_id):
+    """Return the cached crop model entry if its file still exists, dropping stale entries."""
+    entry = _state.crop_models.get(crop_id)
+    if entry is None:
+        return None
+    # Drop the cache when the file is gone so retrained models reload
+    cached_path = entry[1]
+    if cached_path and os.path.exists(cached_path):
+        return entry
+    _state.crop_models.pop(crop_id, None)
+    return None
+
+
+def _load_crop_model(crop_id):
+    """Load a crop model from the registry into the cache (caller holds the crop's lock)."""
     registry = load_crop_registry()
     
     if crop_id in registry:
@@ -204,12 +300,13 @@ def get_crop_model(crop_id):
                     for layer in model.layers
                 )
                 
-                _crop_models[crop_id] = (
+                _state.crop_models[crop_id] = (
                     model,
                     str(resolved_model_path),
                     outputs,
                     backbone,
                     has_builtin_preprocessing,
+                    _build_preprocess_fn(backbone, has_builtin_preprocessing),
                 )
                 logger.info(
                     "ml_crop_model_loaded crop=%s ok=true backbone=%s builtin_preproc=%s",
@@ -217,21 +314,25 @@ def get_crop_model(crop_id):
                     backbone,
                     has_builtin_preprocessing,
                 )
-                return _crop_models[crop_id]
+                return _state.crop_models[crop_id]
             except Exception as e:
                 logger.error("ml_crop_model_load_error crop=%s error=%s", crop_id, str(e))
     
     # Crop model not found
     logger.warning("ml_crop_model_not_found crop=%s", crop_id)
-    return None, None, None, None, False
+    return None, None, None, None, False, None
 
 
 def get_model():
     """Lazy load and cache the default (generic) model."""
-    global _default_model
-    global _default_model_path
     
-    if _default_model is None:
+    if _state.default_model is not None:
+        return _state.default_model
+    
+    with _state.default_model_lock:
+        if _state.default_model is not None:
+            return _state.default_model
+        
         # Allow explicit override
         override_path = os.getenv('FASALVAIDYA_MODEL_PATH')
         candidate_paths = [
@@ -249,93 +350,156 @@ def get_model():
 
         if chosen_path:
             logger.info("ml_model_loading path=%s", chosen_path)
-            _default_model = keras.models.load_model(chosen_path)
-            _default_model_path = chosen_path
+            model = keras.models.load_model(chosen_path)
+            # Publish the path before the model: readers skip the lock once the model is set
+            _state.default_model_path = chosen_path
+            _state.default_model = model
             logger.info("ml_model_loaded ok=true")
         else:
             logger.warning("ml_model_missing candidates=%s", candidate_paths)
-            _default_model = None
-            _default_model_path = None
+            _state.default_model = None
+            _state.default_model_path = None
+    
+    return _state.default_model
+
+
+def get_default_preprocess_fn():
+    """Preprocessing function for the default model (EfficientNetB0, no builtin layer)."""
+
+    if _state.default_preprocess_fn is None:
+        _state.default_preprocess_fn = _build_preprocess_fn('efficientnetb0', False)
+
+    return _state.default_preprocess_fn
+
+
+def _get_preprocess_fn(backbone, has_builtin_preprocessing, target_size):
+    """Preprocessing tf.function for a backbone/size, built once and cached."""
+    key = (backbone, has_builtin_preprocessing, tuple(target_size))
+    if key not in _state.preprocess_fns:
+        _state.preprocess_fns[key] = _build_preprocess_fn(backbone, has_builtin_preprocessing, target_size)
+    return _state.preprocess_fns[key]
+
+
+def get_inference_fn(model):
+    """
+    Compiled forward pass for a Keras model, built once and cached by id(model).
+    
+    Calling the model directly skips the per-call overhead of model.predict
+    (data adapter, callbacks, progress bar), which dominates at small batch sizes.
+    """
+    key = id(model)
+    if key not in _state.inference_fns:
+        _state.inference_fns[key] = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)],
+        )
+    return _state.inference_fns[key]
+
+
+def init_ml():
+    """
+    Eagerly load registries, labels and models at app startup so the first
+    scan doesn't pay for JSON parsing and model deserialization.
+    """
+    load_crop_registry()
+    model = get_model()
+    get_default_preprocess_fn()
+    
+    if GRADCAM_JIT_COMPILE and model is not None:
+        # Pay the XLA compile here rather than on the first heatmap request
+        _, gradcam_fn = _get_gradcam_fn(model)
+        if gradcam_fn is not None:
+            gradcam_fn(np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32), tf.constant(-1))
     
-    return _default_model
+    if V2_AVAILABLE and inference_v2 is not None:
+        inference_v2.init_v2()
+    
+    try:
+        from .unified_inference import load_unified_model
+        load_unified_model()
+    except Exception as e:
+        logger.warning("ml_init_unified_failed error=%s", str(e))
+    
+    logger.info("ml_init_complete default_model=%s v2=%s", _state.default_model_path, V2_AVAILABLE)
 
 
 def get_tflite_interpreter():
     """Get TFLite interpreter for mobile inference."""
-    global _tflite_interpreter
     
-    if _tflite_interpreter is None:
+    if _state.tflite_interpreter is None:
         tflite_path = MODEL_CONFIG['tflite_path']
         
         if os.path.exists(tflite_path):
-            _tflite_interpreter = tf.lite.Interpreter(model_path=tflite_path)
-            _tflite_interpreter.allocate_tensors()
+            _state.tflite_interpreter = tf.lite.Interpreter(model_path=tflite_path)
+            _state.tflite_interpreter.allocate_tensors()
     
-    return _tflite_interpreter
+    return _state.tflite_interpreter
 
 
-def preprocess_image(image_input, target_size=(224, 224), backbone='efficientnetb0', has_builtin_preprocessing=False):
+def load_image(image_input):
     """
-    Preprocess image for model inference.
+    Decode an image input into an RGB PIL Image.
     
     Args:
         image_input: Can be file path, PIL Image, numpy array, or file-like object
-        target_size: Target size for resize (default: 224x224)
-        backbone: Model backbone type for correct preprocessing (default: 'efficientnetb0')
-        has_builtin_preprocessing: If True, model has ImageNetPreprocessing layer baked in,
-                                   so we only scale to 0-255 range without further preprocessing
-    
-    Returns:
-        Preprocessed numpy array ready for model input
     """
-    # Import preprocessing helper that works in Keras 3.x
-    from keras.src.applications.imagenet_utils import preprocess_input as keras_preprocess
-    
-    # Handle different input types
     if isinstance(image_input, str):
         # File path
-        img = Image.open(image_input).convert('RGB')
+        return Image.open(image_input).convert('RGB')
     elif isinstance(image_input, np.ndarray):
         # Numpy array
         if image_input.dtype == np.uint8:
-            img = Image.fromarray(image_input)
-        else:
-            img = Image.fromarray((image_input * 255).astype(np.uint8))
+            return Image.fromarray(image_input)
+        return Image.fromarray((image_input * 255).astype(np.uint8))
     elif hasattr(image_input, 'read'):
         # File-like object (Flask upload)
-        img = Image.open(image_input).convert('RGB')
+        return Image.open(image_input).convert('RGB')
     elif isinstance(image_input, Image.Image):
         # PIL Image
-        img = image_input.convert('RGB')
-    else:
-        raise ValueError(f"Unsupported image input type: {type(image_input)}")
+        return image_input.convert('RGB')
+    raise ValueError(f"Unsupported image input type: {type(image_input)}")
+
+
+def load_image_array(image_input):
+    """
+    Decode an image input into an RGB uint8 numpy array.
     
-    # Resize
-    img = img.resize(target_size, Image.LANCZOS)
+    RGB uint8 arrays are returned as-is, skipping the PIL round-trip.
+    """
+    if isinstance(image_input, np.ndarray) and image_input.dtype == np.uint8 \
+            and image_input.ndim == 3 and image_input.shape[2] == 3:
+        return image_input
+    return np.asarray(load_image(image_input))
+
+
+def preprocess_image(image_input, target_size=(224, 224), backbone='efficientnetb0', has_builtin_preprocessing=False):
+    """
+    Preprocess image for model inference.
     
-    # Convert to numpy array (keep as float32 in 0-255 range)
-    img_array = np.array(img, dtype=np.float32)
+    Kept for callers of the ml package; predict_npk and the heatmap functions call
+    their model's preprocessing function directly. Both run the same compiled
+    resize + folded x * scale + bias, so they produce the same input.
     
-    if has_builtin_preprocessing:
-        # New models have ImageNetPreprocessing layer baked in
-        # They expect input in [0, 255] range
-        pass  # img_array already in 0-255 range
-    else:
-        # Old models need preprocessing applied here
-        # NOTE: Keras 3.x has a bug where tf.keras.applications.efficientnet.preprocess_input
-        # doesn't actually preprocess! Use keras.src.applications.imagenet_utils.preprocess_input instead.
-        if backbone and 'efficientnet' in backbone.lower():
-            # EfficientNet uses 'torch' mode: scale to [0,1] then normalize with ImageNet mean/std
-            img_array = keras_preprocess(img_array, mode='torch')
-        elif backbone and 'mobilenet' in backbone.lower():
-            # MobileNetV3 uses 'tf' mode: scale to [-1, 1]
-            img_array = keras_preprocess(img_array, mode='tf')
-        else:
-            # Fallback: normalize to 0-1 range for generic models
-            img_array = img_array / 255.0
+    Args:
+        image_input: Can be file path, PIL Image, numpy array, or file-like object
+        target_size: Target size for resize (default: 224x224)
+        backbone: Model backbone type for correct preprocessing (default: 'efficientnetb0')
+        has_builtin_preprocessing: If True, model has ImageNetPreprocessing layer baked in,
+                                   so we only scale to 0-255 range without further preprocessing
     
-    # Add batch dimension
-    img_array = np.expand_dims(img_array, axis=0)
+    Returns:
+        (img_array, resized PIL image); img_array is a new (1, H, W, 3) float32 array.
+    """
+    pixels = load_image_array(image_input)
+    
+    width, height = target_size
+    preprocess_fn = _get_preprocess_fn(backbone, has_builtin_preprocessing, (height, width))
+    img_array = preprocess_fn(pixels[np.newaxis]).numpy()
+    
+    # Undo the scale/bias to recover the resized pixels for the returned image
+    scale, bias = _preprocess_constants(backbone, has_builtin_preprocessing)
+    resized = (img_array[0] - np.asarray(bias, dtype=np.float32)) / np.asarray(scale, dtype=np.float32)
+    img = Image.fromarray(np.clip(np.rint(resized), 0, 255).astype(np.uint8))
     
     return img_array, img
 
@@ -394,29 +558,49 @@ def predict_npk(image_input, use_tflite=False, crop_id=None, use_v2=None):
             # Fall through to legacy inference
     
     # Legacy inference code
+    legacy_model = _resolve_legacy_model(crop_id)
+    preprocess_fn = legacy_model[5]
+    
+    # Preprocess image with the model's specialized preprocessing function
+    img_array = preprocess_fn(load_image_array(image_input)[np.newaxis]).numpy()
+    
+    return _predict_npk_from_preprocessed(img_array, legacy_model, crop_id, use_tflite)
+
+
+def _resolve_legacy_model(crop_id=None):
+    """
+    Pick the legacy model for a crop, falling back to the default model.
+    
+    Returns:
+        (model, model_path_used, outputs, backbone, has_builtin_preprocessing, preprocess_fn),
+        model is None when no trained model is available.
+    """
     model = None
     model_path_used = None
     outputs = ['N', 'P', 'K', 'Mg']  # Default outputs include Mg now
     backbone = 'efficientnetb0'  # Default backbone
     has_builtin_preprocessing = False  # Old models don't have it
     
+    preprocess_fn = None
+    
     # Try crop-specific model first
     if crop_id:
-        model, model_path_used, outputs, backbone, has_builtin_preprocessing = get_crop_model(crop_id)
+        model, model_path_used, outputs, backbone, has_builtin_preprocessing, preprocess_fn = get_crop_model(crop_id)
     
     # Fallback to default model
     if model is None:
         model = get_model()
-        model_path_used = _default_model_path
+        model_path_used = _state.default_model_path
         backbone = 'efficientnetb0'  # Default model uses EfficientNetB0
         has_builtin_preprocessing = False
+        preprocess_fn = get_default_preprocess_fn()
     
-    # Preprocess image with correct backbone preprocessing
-    img_array, original_img = preprocess_image(
-        image_input, 
-        backbone=backbone,
-        has_builtin_preprocessing=has_builtin_preprocessing
-    )
+    return model, model_path_used, outputs, backbone, has_builtin_preprocessing, preprocess_fn
+
+
+def _predict_npk_from_preprocessed(img_array, legacy_model, crop_id=None, use_tflite=False):
+    """Run legacy NPK+Mg prediction on an already preprocessed (1, H, W, C) array."""
+    model, model_path_used, outputs, backbone, has_builtin_preprocessing, _ = legacy_model
     
     # DEBUG: Log image array stats to verify preprocessing works
     img_mean = float(np.mean(img_array))
@@ -426,8 +610,13 @@ def predict_npk(image_input, use_tflite=False, crop_id=None, use_v2=None):
                 img_mean, img_std, img_hash, img_array.shape, backbone, has_builtin_preprocessing)
     
     if model is not None:
-        # Real model prediction
-        predictions = model.predict(img_array, verbose=0)[0]
+        # Real model prediction (concurrent requests are batched into one call)
+        predictions = predict_batched(
+            model,
+            img_array,
+            lambda batch: get_inference_fn(model)(batch).numpy(),
+            name=crop_id or 'default',
+        )
         
         # DEBUG: Log raw predictions
         logger.info("ml_raw_predictions raw=%s", predictions.tolist())
@@ -504,13 +693,11 @@ def generate_mock_predictions(img_array):
     Generate mock predictions based on image color analysis.
     Used when model is not yet trained.
     """
-    # Analyze color channels
-    img = img_array[0]  # Remove batch dimension
+    # Analyze color channels on a flat (pixels, 3) view of the image (batch dimension removed)
+    flat = img_array[0].reshape(-1, 3)
     
-    # Calculate mean RGB values
-    r_mean = np.mean(img[:, :, 0])
-    g_mean = np.mean(img[:, :, 1])
-    b_mean = np.mean(img[:, :, 2])
+    # Calculate mean RGB values in one reduction
+    r_mean, g_mean, b_mean = flat.mean(axis=0)
     
     # Simple heuristics based on leaf color
     # Yellow/light green = N deficiency
@@ -526,7 +713,7 @@ def generate_mock_predictions(img_array):
     p_score = max(0, min(1, 1 - brightness * 1.5))
     
     # Potassium: Brown edges (simulate with color variance)
-    k_score = max(0, min(1, np.std(img) * 2))
+    k_score = max(0, min(1, flat.std() * 2))
     
     # Magnesium: Interveinal chlorosis (yellow-green pattern)
     mg_score = max(0, min(1, abs(g_mean - r_mean) * 1.5))
@@ -552,23 +739,78 @@ def determine_overall_status(n_score, p_score, k_score, mg_score=0.0):
 
 def determine_detected_class(n_score, p_score, k_score, mg_score=0.0):
     """Determine the primary detected deficiency class."""
-    scores = {
-        'nitrogen': n_score, 
-        'phosphorus': p_score, 
-        'potassium': k_score,
-        'magnesium': mg_score,
-    }
+    scores = (n_score, p_score, k_score, mg_score)
     
-    # Find highest scoring deficiency
-    max_nutrient = max(scores, key=scores.get)
-    max_score = scores[max_nutrient]
+    # Find highest scoring deficiency (first one wins on ties)
+    max_idx = max(range(len(scores)), key=scores.__getitem__)
     
-    if max_score >= SEVERITY_THRESHOLDS['attention']:
-        return f"{max_nutrient}_deficiency"
+    if scores[max_idx] >= SEVERITY_THRESHOLDS['attention']:
+        return f"{NUTRIENT_NAMES[max_idx]}_deficiency"
     else:
         return 'healthy'
 
 
+def _get_gradcam_fn(model):
+    """
+    Resolve the last conv layer and build the Grad-CAM function once per model.
+    
+    Returns:
+        tuple: (last_conv_layer, gradcam_fn) or (None, None) if the model has no conv layer
+    """
+    key = id(model)
+    if key in _state.grad_model_cache:
+        return _state.grad_model_cache[key]
+    
+    # Find the last convolutional layer
+    last_conv_layer = None
+    for layer in reversed(model.layers):
+        if isinstance(layer, (keras.layers.Conv2D, keras.layers.DepthwiseConv2D)):
+            last_conv_layer = layer.name
+            break
+    
+    if last_conv_layer is None:
+        _state.grad_model_cache[key] = (None, None)
+        return _state.grad_model_cache[key]
+    
+    # Create gradient model
+    grad_model = keras.Model(
+        inputs=model.input,
+        outputs=[model.get_layer(last_conv_layer).output, model.output]
+    )
+    
+    @tf.function(
+        input_signature=[
+            tf.TensorSpec((1,) + tuple(model.input_shape[1:]), tf.float32),
+            tf.TensorSpec((), tf.int32),
+        ],
+        jit_compile=GRADCAM_JIT_COMPILE,
+    )
+    def gradcam_fn(img_array, target_class):
+        # Compute gradients
+        with tf.GradientTape() as tape:
+            conv_output, predictions = grad_model(img_array, training=False)
+            if target_class < 0:
+                target_class = tf.argmax(predictions[0], output_type=tf.int32)
+            loss = predictions[:, target_class]
+        
+        grads = tape.gradient(loss, conv_output)
+        
+        # Global average pooling of gradients
+        pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
+        
+        # Weight feature maps by gradients
+        heatmap = tf.squeeze(conv_output[0] @ pooled_grads[..., tf.newaxis])
+        
+        # Normalize heatmap to [0, 1]
+        heatmap = tf.maximum(heatmap, 0)
+        heatmap = tf.math.divide_no_nan(heatmap, tf.math.reduce_max(heatmap))
+        return heatmap, target_class
+    
+    _state.grad_model_cache[key] = (last_conv_layer, gradcam_fn)
+    logger.info("gradcam_model_built conv_layer=%s xla=%s", last_conv_layer, GRADCAM_JIT_COMPILE)
+    return _state.grad_model_cache[key]
+
+
 def generate_gradcam_heatmap(image_input, target_class=None, crop_id=None, use_v2=None):
     """
     Generate Grad-CAM heatmap for visual explanation.
@@ -592,20 +834,7 @@ def generate_gradcam_heatmap(image_input, target_class=None, crop_id=None, use_v
             return inference_v2.generate_gradcam_v2(image_input, target_class)
         except Exception as e:
             logger.error("ml_v2_gradcam_failed error=%s, falling back to legacy", str(e))
-    model = None
-    model_path_used = None
-    outputs = ['N', 'P', 'K', 'Mg']
-    backbone = 'efficientnetb0'
-    has_builtin_preprocessing = False
-    
-    # Try crop-specific model first
-    if crop_id:
-        model, model_path_used, outputs, backbone, has_builtin_preprocessing = get_crop_model(crop_id)
-    
-    # Fallback to default model
-    if model is None:
-        model = get_model()
-        model_path_used = _default_model_path
+    model, _, _, _, _, preprocess_fn = _resolve_legacy_model(crop_id)
     
     if model is None:
         logger.warning("gradcam_failed reason=no_model_available")
@@ -615,63 +844,53 @@ def generate_gradcam_heatmap(image_input, target_class=None, crop_id=None, use_v
         logger.warning("gradcam_failed reason=opencv_not_available")
         return None
     
-    # Preprocess image with correct backbone preprocessing
-    img_array, original_img = preprocess_image(
-        image_input,
-        backbone=backbone,
-        has_builtin_preprocessing=has_builtin_preprocessing
-    )
-    
-    # Get predictions to determine target class
-    predictions = model.predict(img_array, verbose=0)[0]
+    # Preprocess image with the model's specialized preprocessing function
+    original = load_image_array(image_input)
+    img_array = preprocess_fn(original[np.newaxis]).numpy()
     
-    if target_class is None:
-        target_class = np.argmax(predictions)
+    return _gradcam_from_preprocessed(model, img_array, original, target_class)
+
+
+def _gradcam_from_preprocessed(model, img_array, original, target_class=None):
+    """
+    Build the Grad-CAM overlay for an already preprocessed input.
     
-    # Find the last convolutional layer
-    last_conv_layer = None
-    for layer in reversed(model.layers):
-        if isinstance(layer, (keras.layers.Conv2D, keras.layers.DepthwiseConv2D)):
-            last_conv_layer = layer.name
-            break
+    Args:
+        model: Legacy Keras model
+        img_array: Preprocessed (1, H, W, C) model input
+        original: Decoded RGB uint8 array of the original image
+        target_class: Class index to explain (None = highest)
     
-    if last_conv_layer is None:
-        logger.warning("gradcam_failed reason=no_conv_layer_found")
+    Returns:
+        Base64 encoded heatmap overlay image at the model input size, or None on failure
+    """
+    if cv2 is None:
+        logger.warning("gradcam_failed reason=opencv_not_available")
         return None
     
     try:
-        # Create gradient model
-        grad_model = keras.Model(
-            inputs=model.input,
-            outputs=[model.get_layer(last_conv_layer).output, model.output]
-        )
-        
-        # Compute gradients
-        with tf.GradientTape() as tape:
-            conv_output, predictions_tensor = grad_model(img_array)
-            loss = predictions_tensor[:, target_class]
-        
-        grads = tape.gradient(loss, conv_output)
+        last_conv_layer, gradcam_fn = _get_gradcam_fn(model)
+        if gradcam_fn is None:
+            logger.warning("gradcam_failed reason=no_conv_layer_found")
+            return None
         
-        # Global average pooling of gradients
-        pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
-        
-        # Weight feature maps by gradients
-        conv_output = conv_output[0]
-        heatmap = conv_output @ pooled_grads[..., tf.newaxis]
-        heatmap = tf.squeeze(heatmap)
-        
-        # Normalize heatmap to [0, 1]
-        heatmap = tf.maximum(heatmap, 0)
-        if tf.math.reduce_max(heatmap) > 0:
-            heatmap = heatmap / tf.math.reduce_max(heatmap)
+        # Forward + backward pass in one compiled call; -1 means "use the top prediction"
+        heatmap, target_class = gradcam_fn(
+            img_array,
+            tf.constant(-1 if target_class is None else int(target_class), dtype=tf.int32),
+        )
         heatmap = heatmap.numpy()
+        target_class = int(target_class)
         
-        # Resize heatmap to original image size using high-quality interpolation
-        heatmap_resized = cv2.resize(heatmap, (original_img.width, original_img.height), interpolation=cv2.INTER_CUBIC)
+        # Draw the overlay at the model input size (224x224), not the upload's resolution
+        height, width = img_array.shape[1:3]
+        if original.shape[:2] != (height, width):
+            original = cv2.resize(original, (width, height), interpolation=cv2.INTER_AREA)
         
-        # Apply Gaussian blur for smoother visualization
-        heatmap_resized = cv2.GaussianBlur(heatmap_resized, (0, 0), sigmaX=10, sigmaY=10)
+        # Upscale the coarse conv grid with a cheap nearest-neighbour copy, then let a
+        # separable Gaussian blur (sigma 10 at 224px) smooth out the cell edges
+        heatmap_resized = cv2.resize(heatmap, (width, height), interpolation=cv2.INTER_NEAREST)
+        heatmap_resized = cv2.GaussianBlur(heatmap_resized, (0, 0), sigmaX=width * 10.0 / 224)
         
         # Convert to colormap (JET colormap: blue=low, red=high activation)
         heatmap_uint8 = np.uint8(255 * heatmap_resized)
@@ -680,33 +899,89 @@ def generate_gradcam_heatmap(image_input, target_class=None, crop_id=None, use_v
         
         # Overlay on original image with better blending
         # Use 0.5/0.5 for balanced visibility of both original and heatmap
-        original_array = np.array(original_img)
-        overlay = cv2.addWeighted(original_array, 0.5, heatmap_colored, 0.5, 0)
-        
-        # Convert to base64
-        overlay_img = Image.fromarray(overlay)
-        buffered = BytesIO()
-        overlay_img.save(buffered, format="JPEG", quality=90)
-        img_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
+        overlay = cv2.addWeighted(original, 0.5, heatmap_colored, 0.5, 0)
         
         logger.info("gradcam_generated target_class=%d conv_layer=%s", target_class, last_conv_layer)
-        return f"data:image/jpeg;base64,{img_base64}"
+        return encode_jpeg_data_uri(overlay, quality=90)
         
     except Exception as e:
         logger.error("gradcam_error error=%s", str(e), exc_info=True)
         return None
 
 
+def predict_npk_with_heatmap(image_input, crop_id=None, target_class=None, use_v2=None):
+    """
+    Run NPK+Mg prediction and Grad-CAM on one image, decoding it only once.
+    
+    Equivalent to calling predict_npk() and generate_gradcam_heatmap(), but the
+    legacy path also shares the preprocessed model input between the two.
+    
+    Args:
+        image_input: Image to analyze (path, PIL Image, numpy array, or file object)
+        crop_id: Optional crop identifier for crop-specific model
+        target_class: Class index to explain (None = highest)
+        use_v2: Force V2 inference (None = auto-detect)
+    
+    Returns:
+        (prediction dict, base64 heatmap overlay or None)
+    """
+    pixels = load_image_array(image_input)
+    
+    if use_v2 is None:
+        use_v2 = V2_AVAILABLE
+    
+    if use_v2 and inference_v2 is not None:
+        # V2 preprocesses decoded arrays directly, so the decode is what gets shared
+        prediction = predict_npk(pixels, crop_id=crop_id, use_v2=True)
+        heatmap = generate_gradcam_heatmap(pixels, target_class, crop_id=crop_id, use_v2=True)
+        return prediction, heatmap
+    
+    legacy_model = _resolve_legacy_model(crop_id)
+    model, preprocess_fn = legacy_model[0], legacy_model[5]
+    img_array = preprocess_fn(pixels[np.newaxis]).numpy()
+    
+    prediction = _predict_npk_from_preprocessed(img_array, legacy_model, crop_id)
+    if model is None:
+        logger.warning("gradcam_failed reason=no_model_available")
+        return prediction, None
+    return prediction, _gradcam_from_preprocessed(model, img_array, pixels, target_class)
+
+
+def encode_jpeg_data_uri(rgb_array, quality=90):
+    """Encode an RGB uint8 array as a base64 JPEG data URI."""
+    if cv2 is not None:
+        # OpenCV's libjpeg-turbo encoder is SIMD-accelerated
+        ok, buf = cv2.imencode(
+            '.jpg',
+            cv2.cvtColor(rgb_array, cv2.COLOR_RGB2BGR),
+            [int(cv2.IMWRITE_JPEG_QUALITY), quality],
+        )
+        if ok:
+            return f"data:image/jpeg;base64,{base64.b64encode(buf).decode('ascii')}"
+    
+    buffered = BytesIO()
+    Image.fromarray(rgb_array).save(buffered, format="JPEG", quality=quality)
+    img_base64 = base64.b64encode(buffered.getvalue()).decode('ascii')
+    return f"data:image/jpeg;base64,{img_base64}"
+
+
 def create_simple_overlay(original_img, predictions):
     """Create a simple colored overlay based on predictions."""
-    # Convert to numpy
-    img_array = np.array(original_img)
+    # Convert to numpy (decoded RGB arrays are used as-is, without a copy)
+    img_array = load_image_array(original_img)
 
-    def _blend(base, overlay, alpha):
-        base_f = base.astype(np.float32)
-        overlay_f = overlay.astype(np.float32)
-        out = (1.0 - alpha) * base_f + alpha * overlay_f
-        return np.clip(out, 0, 255).astype(np.uint8)
+    def _tint(base, color, alpha):
+        # Blend with a constant color: base * (1 - alpha) + color * alpha,
+        # applying the color as a per-channel scalar instead of a full-size overlay image
+        tint = np.asarray(color, dtype=np.float32) * np.float32(alpha)
+        if cv2 is not None:
+            out = cv2.convertScaleAbs(base, alpha=1.0 - alpha, beta=0)
+            cv2.add(out, (float(tint[0]), float(tint[1]), float(tint[2]), 0.0), dst=out)
+            return out
+        out = np.multiply(base, np.float32(1.0 - alpha), dtype=np.float32)
+        out += tint
+        np.clip(out, 0, 255, out=out)
+        return out.astype(np.uint8)
     
     # Determine color based on highest deficiency
     max_idx = np.argmax(predictions)
@@ -718,26 +993,12 @@ def create_simple_overlay(original_img, predictions):
     
     if predictions[max_idx] >= SEVERITY_THRESHOLDS['attention']:
         color = colors.get(max_idx, (128, 128, 128))
-        overlay = np.full_like(img_array, color, dtype=np.uint8)
-        if cv2 is not None:
-            blended = cv2.addWeighted(img_array, 0.7, overlay, 0.3, 0)
-        else:
-            blended = _blend(img_array, overlay, 0.3)
+        blended = _tint(img_array, color, 0.3)
     else:
         # Healthy - light green tint
-        overlay = np.full_like(img_array, (144, 238, 144), dtype=np.uint8)
-        if cv2 is not None:
-            blended = cv2.addWeighted(img_array, 0.8, overlay, 0.2, 0)
-        else:
-            blended = _blend(img_array, overlay, 0.2)
+        blended = _tint(img_array, (144, 238, 144), 0.2)
     
-    # Convert to base64
-    overlay_img = Image.fromarray(blended)
-    buffered = BytesIO()
-    overlay_img.save(buffered, format="JPEG", quality=85)
-    img_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
-    
-    return f"data:image/jpeg;base64,{img_base64}"
+    return encode_jpeg_data_uri(blended, quality=85)
 
 
 def get_model_info():
@@ -10,6 +10,8 @@ New architecture with:
 Model files expected:
 - EnhancedModel3/leaf_validator.tflite or leaf_validator.keras
 - EnhancedModel3/fasalvaidya_enhanced.tflite or disease_final.keras  
+  (<model>_int8.tflite, then <model>_fp16.tflite are preferred when
+  exported with export_v2_tflite.py)
 - EnhancedModel3/metadata.json
 - EnhancedModel3/labels.txt
 """
@@ -19,11 +21,16 @@ import sys
 import json
 import base64
 import logging
+import platform
+import threading
 import numpy as np
+from collections import namedtuple
+from dataclasses import dataclass, field
 from pathlib import Path
-from io import BytesIO
 from PIL import Image
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from .batching import BATCH_TIMEOUT_S, predict_batched, submit_batched
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
@@ -50,16 +57,43 @@ LEAF_VALIDATOR_KERAS = ENHANCED_MODEL_DIR / 'leaf_validator.keras'
 LEAF_VALIDATOR_TFLITE = ENHANCED_MODEL_DIR / 'leaf_validator.tflite'
 DISEASE_MODEL_KERAS = ENHANCED_MODEL_DIR / 'disease_final.keras'
 DISEASE_MODEL_TFLITE = ENHANCED_MODEL_DIR / 'fasalvaidya_enhanced.tflite'
+LEAF_VALIDATOR_TFLITE_INT8 = ENHANCED_MODEL_DIR / 'leaf_validator_int8.tflite'
+DISEASE_MODEL_TFLITE_INT8 = ENHANCED_MODEL_DIR / 'disease_final_int8.tflite'
+LEAF_VALIDATOR_TFLITE_FP16 = ENHANCED_MODEL_DIR / 'leaf_validator_fp16.tflite'
+DISEASE_MODEL_TFLITE_FP16 = ENHANCED_MODEL_DIR / 'disease_final_fp16.tflite'
 METADATA_PATH = ENHANCED_MODEL_DIR / 'metadata.json'
 LABELS_PATH = ENHANCED_MODEL_DIR / 'labels.txt'
 
 # Image settings
 IMG_SIZE = (224, 224)
 
+# TFLite CPU threads (XNNPACK is the interpreter's default CPU delegate).
+# The leaf validator and classifier run concurrently, so each gets half the cores.
+# On ARM big.LITTLE CPUs TFLite stops scaling past 4 threads (the slow cores gate
+# each op), so the count is capped there.
+def _default_tflite_threads() -> int:
+    threads = max(1, (os.cpu_count() or 2) // 2)
+    machine = platform.machine().lower()
+    if machine.startswith(('arm', 'aarch64')):
+        threads = min(threads, 4)
+    return threads
+
+
+TFLITE_NUM_THREADS = int(os.getenv('FASALVAIDYA_TFLITE_THREADS', '0')) or _default_tflite_threads()
+
+# Batch sizes the TFLite input is allocated for. A batch runs at the smallest
+# size that fits it (spare rows are ignored), so varying batcher output only
+# reallocates the interpreter when it crosses one of these.
+TFLITE_BATCH_SIZES = (1, 4, 8, 16)
+
 # Confidence thresholds (from training notebook)
 CONF_HIGH = 0.85
 CONF_LOW = 0.50
 
+# When the other classes share less than this of the probability mass, the weighted
+# deficiencies are within this amount of the top class's own, so that is used directly
+DOMINANT_CLASS_TOLERANCE = 0.001
+
 # Leaf validation threshold
 LEAF_THRESHOLD = 0.5
 
@@ -70,6 +104,9 @@ SEVERITY_THRESHOLDS = {
     'healthy': 0.0
 }
 
+# Nutrient keys in deficiency-vector order
+NUTRIENT_KEYS = ('n', 'p', 'k', 'mg')
+
 # ============================================
 # NUTRIENT MAPPING FROM CLASS NAMES
 # ============================================
@@ -174,77 +211,165 @@ def get_crop_from_class(class_name: str) -> str:
 # MODEL LOADING
 # ============================================
 
-_leaf_validator = None
-_disease_model = None
-_class_names = None
-_metadata = None
+@dataclass
+class MLState:
+    """Loaded V2 models, labels and derived lookup tables, filled lazily or by init_v2()."""
+    leaf_validator: Any = None
+    disease_model: Any = None
+    class_names: Optional[List[str]] = None
+    class_nutrients: Dict[str, np.ndarray] = field(default_factory=dict)  # class_name -> np.array([n, p, k, mg]) deficiency vector
+    class_nutrient_matrix: Optional[np.ndarray] = None  # (num_classes, 4) stack of the vectors above, in model output order
+    crop_masks: Dict[str, np.ndarray] = field(default_factory=dict)  # crop hint -> bool mask over model outputs of that crop's classes
+    metadata: Optional[Dict[str, Any]] = None
+    inference_fns: Dict[int, Callable] = field(default_factory=dict)  # id(model) -> compiled forward pass
+    grad_model_cache: Dict[int, tuple] = field(default_factory=dict)  # id(model) -> (last_conv_layer, compiled Grad-CAM fn)
+
+
+_state = MLState()
+
+# Loaded TFLite interpreter with its tensor indices resolved once at load time.
+# input_quant/output_quant are (scale, zero_point); scale is 0.0 for float tensors.
+# input_shape is the currently allocated input shape, a list updated in place on resize.
+# max_batch_size is 1 for models exported with a fixed batch dimension (never resized),
+# None when the batch dimension is dynamic.
+TFLiteModel = namedtuple(
+    'TFLiteModel',
+    ['interpreter', 'input_index', 'output_index', 'input_dtype', 'input_quant', 'output_quant',
+     'input_tensor', 'input_shape', 'max_batch_size'],
+)
+
+
+def _load_tflite_model(model_path: Path) -> TFLiteModel:
+    """Create an interpreter, allocate tensors and cache its input/output details."""
+    interpreter = tf.lite.Interpreter(model_path=str(model_path), num_threads=TFLITE_NUM_THREADS)
+    interpreter.allocate_tensors()
+    input_details = interpreter.get_input_details()[0]
+    output_details = interpreter.get_output_details()[0]
+    # -1 marks a dynamic batch dimension; anything else cannot be resized
+    fixed_batch = input_details.get('shape_signature', input_details['shape'])[0] != -1
+    if fixed_batch:
+        logger.info("v2_tflite_fixed_batch path=%s shape=%s", model_path.name, list(input_details['shape']))
+    return TFLiteModel(
+        interpreter=interpreter,
+        input_index=input_details['index'],
+        output_index=output_details['index'],
+        input_dtype=input_details['dtype'],
+        input_quant=input_details['quantization'],
+        output_quant=output_details['quantization'],
+        # Returns a NumPy view of the input buffer (re-fetched on each call, so it
+        # stays valid after the input is resized)
+        input_tensor=interpreter.tensor(input_details['index']),
+        input_shape=list(input_details['shape']),
+        max_batch_size=1 if fixed_batch else None,
+    )
 
 
 def load_metadata() -> Dict[str, Any]:
     """Load model metadata."""
-    global _metadata
     
-    if _metadata is not None:
-        return _metadata
+    if _state.metadata is not None:
+        return _state.metadata
     
     if METADATA_PATH.exists():
         with open(METADATA_PATH, 'r') as f:
-            _metadata = json.load(f)
+            _state.metadata = json.load(f)
         logger.info("v2_metadata_loaded classes=%d crops=%s", 
-                    _metadata.get('classes', 0), 
-                    _metadata.get('crops', []))
+                    _state.metadata.get('classes', 0), 
+                    _state.metadata.get('crops', []))
     else:
-        _metadata = {
+        _state.metadata = {
             'version': '2.0',
             'classes': 43,
             'thresholds': {'high': CONF_HIGH, 'low': CONF_LOW}
         }
         logger.warning("v2_metadata_missing using_defaults=true")
     
-    return _metadata
+    return _state.metadata
 
 
 def load_class_names() -> List[str]:
     """Load class names from labels.txt."""
-    global _class_names
     
-    if _class_names is not None:
-        return _class_names
+    if _state.class_names is not None:
+        return _state.class_names
     
     if LABELS_PATH.exists():
         with open(LABELS_PATH, 'r') as f:
-            _class_names = [line.strip() for line in f if line.strip()]
-        logger.info("v2_labels_loaded count=%d", len(_class_names))
+            _state.class_names = [line.strip() for line in f if line.strip()]
+        logger.info("v2_labels_loaded count=%d", len(_state.class_names))
     else:
-        _class_names = []
+        _state.class_names = []
         logger.warning("v2_labels_missing")
     
-    return _class_names
+    # Parse every label once so predictions only need a dict lookup
+    for class_name in _state.class_names:
+        get_class_nutrients(class_name)
+    
+    return _state.class_names
+
+
+def get_class_nutrients(class_name: str) -> np.ndarray:
+    """Deficiency vector [n, p, k, mg] for a class, parsed once and cached."""
+    vector = _state.class_nutrients.get(class_name)
+    if vector is None:
+        d = parse_class_to_nutrients(class_name)
+        vector = np.array([d['n'], d['p'], d['k'], d['mg']], dtype=np.float32)
+        _state.class_nutrients[class_name] = vector
+    return vector
+
+
+def get_nutrient_matrix(num_classes: int) -> np.ndarray:
+    """(num_classes, 4) matrix of [n, p, k, mg] deficiency vectors, one row per model output."""
+    
+    if _state.class_nutrient_matrix is None or len(_state.class_nutrient_matrix) != num_classes:
+        class_names = load_class_names()
+        rows = [
+            get_class_nutrients(class_names[i] if i < len(class_names) else f'class_{i}')
+            for i in range(num_classes)
+        ]
+        _state.class_nutrient_matrix = np.array(rows, dtype=np.float32).reshape(num_classes, 4)
+    return _state.class_nutrient_matrix
+
+
+def get_crop_mask(crop: str, num_classes: int) -> np.ndarray:
+    """Boolean mask of the model outputs whose class belongs to a crop (computed once per crop)."""
+    mask = _state.crop_masks.get(crop)
+    if mask is None or len(mask) != num_classes:
+        class_names = load_class_names()
+        prefix = crop + '_'
+        mask = np.array(
+            [i < len(class_names) and class_names[i].lower().startswith(prefix) for i in range(num_classes)],
+            dtype=bool,
+        )
+        _state.crop_masks[crop] = mask
+    return mask
 
 
 def load_leaf_validator():
     """Load the leaf validator model."""
-    global _leaf_validator
     
-    if _leaf_validator is not None:
-        return _leaf_validator
+    if _state.leaf_validator is not None:
+        return _state.leaf_validator
     
-    # Try TFLite first (more reliable with Keras 3.x compatibility issues)
-    if LEAF_VALIDATOR_TFLITE.exists():
+    # Try TFLite first (more reliable with Keras 3.x compatibility issues),
+    # preferring the INT8 and then FP16 exports when present
+    for tflite_path in (LEAF_VALIDATOR_TFLITE_INT8, LEAF_VALIDATOR_TFLITE_FP16, LEAF_VALIDATOR_TFLITE):
+        if not tflite_path.exists():
+            continue
         try:
-            _leaf_validator = tf.lite.Interpreter(model_path=str(LEAF_VALIDATOR_TFLITE))
-            _leaf_validator.allocate_tensors()
-            logger.info("v2_leaf_validator_loaded format=tflite path=%s", LEAF_VALIDATOR_TFLITE)
-            return _leaf_validator
+            _state.leaf_validator = _load_tflite_model(tflite_path)
+            logger.info("v2_leaf_validator_loaded format=tflite path=%s input_dtype=%s",
+                        tflite_path, np.dtype(_state.leaf_validator.input_dtype).name)
+            return _state.leaf_validator
         except Exception as e:
-            logger.warning("v2_leaf_validator_tflite_error error=%s", str(e))
+            logger.warning("v2_leaf_validator_tflite_error path=%s error=%s", tflite_path, str(e))
     
     # Try Keras model as fallback (may have compatibility issues with Keras 3.x)
     if LEAF_VALIDATOR_KERAS.exists():
         try:
-            _leaf_validator = keras.models.load_model(str(LEAF_VALIDATOR_KERAS), compile=False)
+            _state.leaf_validator = keras.models.load_model(str(LEAF_VALIDATOR_KERAS), compile=False)
             logger.info("v2_leaf_validator_loaded format=keras path=%s", LEAF_VALIDATOR_KERAS)
-            return _leaf_validator
+            return _state.leaf_validator
         except Exception as e:
             logger.debug("v2_leaf_validator_keras_skipped reason=keras3_compat error=%s", str(e))
     
@@ -254,27 +379,29 @@ def load_leaf_validator():
 
 def load_disease_model():
     """Load the disease classifier model."""
-    global _disease_model
     
-    if _disease_model is not None:
-        return _disease_model
+    if _state.disease_model is not None:
+        return _state.disease_model
     
-    # Try TFLite first (more reliable with Keras 3.x compatibility issues)
-    if DISEASE_MODEL_TFLITE.exists():
+    # Try TFLite first (more reliable with Keras 3.x compatibility issues),
+    # preferring the INT8 and then FP16 exports when present
+    for tflite_path in (DISEASE_MODEL_TFLITE_INT8, DISEASE_MODEL_TFLITE_FP16, DISEASE_MODEL_TFLITE):
+        if not tflite_path.exists():
+            continue
         try:
-            _disease_model = tf.lite.Interpreter(model_path=str(DISEASE_MODEL_TFLITE))
-            _disease_model.allocate_tensors()
-            logger.info("v2_disease_model_loaded format=tflite path=%s", DISEASE_MODEL_TFLITE)
-            return _disease_model
+            _state.disease_model = _load_tflite_model(tflite_path)
+            logger.info("v2_disease_model_loaded format=tflite path=%s input_dtype=%s",
+                        tflite_path, np.dtype(_state.disease_model.input_dtype).name)
+            return _state.disease_model
         except Exception as e:
-            logger.warning("v2_disease_model_tflite_error error=%s", str(e))
+            logger.warning("v2_disease_model_tflite_error path=%s error=%s", tflite_path, str(e))
     
     # Try Keras model as fallback (may have compatibility issues with Keras 3.x)
     if DISEASE_MODEL_KERAS.exists():
         try:
-            _disease_model = keras.models.load_model(str(DISEASE_MODEL_KERAS), compile=False)
+            _state.disease_model = keras.models.load_model(str(DISEASE_MODEL_KERAS), compile=False)
             logger.info("v2_disease_model_loaded format=keras path=%s", DISEASE_MODEL_KERAS)
-            return _disease_model
+            return _state.disease_model
         except Exception as e:
             logger.debug("v2_disease_model_keras_skipped reason=keras3_compat error=%s", str(e))
     
@@ -286,14 +413,35 @@ def load_disease_model():
 # PREPROCESSING
 # ============================================
 
-def preprocess_image(image_input, target_size=IMG_SIZE) -> Tuple[np.ndarray, Image.Image]:
+_preproc_local = threading.local()
+
+
+def _get_preproc_buffer(image_shape) -> np.ndarray:
+    """Return this thread's reusable (1, H, W, 3) float32 input buffer."""
+    buf = getattr(_preproc_local, 'buf', None)
+    if buf is None or buf.shape[1:] != image_shape:
+        buf = np.empty((1,) + tuple(image_shape), dtype=np.float32)
+        _preproc_local.buf = buf
+    return buf
+
+
+def preprocess_image(image_input, target_size=IMG_SIZE, keep_original: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
     """
     Preprocess image for MobileNetV2 inference.
     
-    MobileNetV2 preprocessing: scales to [-1, 1] range
+    MobileNetV2 preprocessing: scales to [-1, 1] range.
+    The returned array is a per-thread buffer reused by the next call.
+    The original comes back as the decoded RGB uint8 array (no copy), or None
+    with keep_original=False.
     """
+    img = None
+    
     # Handle different input types
-    if isinstance(image_input, str):
+    if isinstance(image_input, np.ndarray) and image_input.dtype == np.uint8 \
+            and image_input.ndim == 3 and image_input.shape[2] == 3:
+        # Already an RGB uint8 array: resize it directly without a PIL round-trip
+        pixels = image_input
+    elif isinstance(image_input, str):
         img = Image.open(image_input).convert('RGB')
     elif isinstance(image_input, np.ndarray):
         if image_input.dtype == np.uint8:
@@ -307,34 +455,126 @@ def preprocess_image(image_input, target_size=IMG_SIZE) -> Tuple[np.ndarray, Ima
     else:
         raise ValueError(f"Unsupported image input type: {type(image_input)}")
     
-    # Store original for heatmap generation
-    original_img = img.copy()
-    
-    # Resize
-    img = img.resize(target_size, Image.LANCZOS)
+    if img is not None:
+        pixels = np.asarray(img)
     
-    # Convert to numpy array
-    img_array = np.array(img, dtype=np.float32)
-    
-    # MobileNetV2 preprocessing: scale to [-1, 1]
-    img_array = tf.keras.applications.mobilenet_v2.preprocess_input(img_array)
+    # Resize (OpenCV INTER_AREA is SIMD-accelerated and suited to downscaling)
+    if cv2 is not None:
+        resized = cv2.resize(pixels, target_size, interpolation=cv2.INTER_AREA)
+    else:
+        resized = np.asarray((img or Image.fromarray(pixels)).resize(target_size, Image.LANCZOS))
     
-    # Add batch dimension
-    img_array = np.expand_dims(img_array, axis=0)
+    # MobileNetV2 preprocessing: scale to [-1, 1], fused into a single pass
+    # over the batched float32 buffer
+    img_array = _get_preproc_buffer(resized.shape)
+    np.multiply(resized, np.float32(1.0 / 127.5), out=img_array[0], casting='unsafe')
+    np.subtract(img_array[0], np.float32(1.0), out=img_array[0])
     
-    return img_array, original_img
+    # Original (full-size) pixels for heatmap generation
+    return img_array, (pixels if keep_original else None)
 
 
-def run_tflite_inference(interpreter, img_array: np.ndarray) -> np.ndarray:
-    """Run inference using TFLite interpreter."""
-    input_details = interpreter.get_input_details()
-    output_details = interpreter.get_output_details()
+def run_tflite_inference(tflite_model: TFLiteModel, img_array: np.ndarray) -> np.ndarray:
+    """Run inference using a cached TFLite interpreter."""
+    return run_tflite_batch(tflite_model, img_array)[0]
+
+
+def run_tflite_batch(tflite_model: TFLiteModel, img_array: np.ndarray) -> np.ndarray:
+    """
+    Run a (B, H, W, 3) batch at the smallest of TFLITE_BATCH_SIZES that fits it.
     
-    interpreter.set_tensor(input_details[0]['index'], img_array.astype(np.float32))
+    The interpreter input is only resized when that padded size changes. Models with
+    a fixed batch dimension are never resized; their batcher sends one image at a time.
+    The batch may be float [-1, 1] or already quantized to the model's input dtype.
+    """
+    interpreter = tflite_model.interpreter
+    batch_size = len(img_array)
+    
+    if tflite_model.max_batch_size is None:
+        padded_shape = [
+            next((size for size in TFLITE_BATCH_SIZES if size >= batch_size), batch_size),
+            *img_array.shape[1:],
+        ]
+        if tflite_model.input_shape != padded_shape:
+            interpreter.resize_tensor_input(tflite_model.input_index, padded_shape)
+            interpreter.allocate_tensors()
+            tflite_model.input_shape[:] = padded_shape
+    
+    # Write straight into the interpreter's input buffer instead of set_tensor's extra copy;
+    # padding rows keep whatever they held, their outputs are dropped below
+    input_view = tflite_model.input_tensor()
+    np.copyto(input_view[:batch_size], _quantize_input(tflite_model, img_array, cast=False),
+              casting='unsafe')
+    # The interpreter refuses to run while views into its buffers are alive
+    del input_view
     interpreter.invoke()
     
-    output = interpreter.get_tensor(output_details[0]['index'])
-    return output[0]
+    output = interpreter.get_tensor(tflite_model.output_index)[:batch_size]
+    out_scale, out_zero_point = tflite_model.output_quant
+    if out_scale:
+        output = (output.astype(np.float32) - out_zero_point) * out_scale
+    return output
+
+
+def _quantize_input(tflite_model: TFLiteModel, img_array: np.ndarray, cast: bool = True) -> np.ndarray:
+    """
+    Quantize a [-1, 1] float input for a full-integer model with the model's own params.
+    
+    Inputs that are already in the model's input dtype are returned unchanged. With
+    cast=False the rounded values are left in float32 for the caller to cast.
+    """
+    in_scale, in_zero_point = tflite_model.input_quant
+    if not in_scale or img_array.dtype == tflite_model.input_dtype:
+        return img_array
+    info = np.iinfo(tflite_model.input_dtype)
+    quantized = img_array / in_scale
+    quantized += in_zero_point
+    np.rint(quantized, out=quantized)
+    np.clip(quantized, info.min, info.max, out=quantized)
+    return quantized.astype(tflite_model.input_dtype) if cast else quantized
+
+
+def _model_input(model, img_array: np.ndarray) -> np.ndarray:
+    """Cast a preprocessed input to the model's input format (int8 for full-integer TFLite)."""
+    if isinstance(model, TFLiteModel):
+        return _quantize_input(model, img_array)
+    return img_array
+
+
+def _get_inference_fn(model):
+    """Compiled forward pass for a Keras model (avoids model.predict overhead on small batches)."""
+    key = id(model)
+    if key not in _state.inference_fns:
+        _state.inference_fns[key] = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)],
+        )
+    return _state.inference_fns[key]
+
+
+def _batch_fn(model):
+    """Callable running a (B, H, W, 3) batch through a TFLite or Keras model."""
+    if isinstance(model, TFLiteModel):
+        return lambda batch: run_tflite_batch(model, batch)
+    return lambda batch: _get_inference_fn(model)(batch).numpy()
+
+
+def _max_batch_size(model) -> Optional[int]:
+    """Largest batch a model can run (None when only the batcher's own limit applies)."""
+    return model.max_batch_size if isinstance(model, TFLiteModel) else None
+
+
+def _predict_row(model, img_array: np.ndarray, name: str) -> np.ndarray:
+    """Run one preprocessed image through a model via its shared batcher."""
+    # Quantize here, on the request's thread, so the shared worker only concatenates and runs
+    return predict_batched(model, _model_input(model, img_array), _batch_fn(model), name=name,
+                           max_batch_size=_max_batch_size(model))
+
+
+def _submit_row(model, img_array: np.ndarray, name: str):
+    """Queue one preprocessed image on a model's batcher without waiting (returns a Future)."""
+    return submit_batched(model, _model_input(model, img_array), _batch_fn(model), name=name,
+                          max_batch_size=_max_batch_size(model))
 
 
 # ============================================
@@ -345,9 +585,23 @@ def validate_leaf(image_input) -> Tuple[bool, float]:
     """
     Validate if the image contains a leaf.
     
+    Args:
+        image_input: Image to validate
+    
     Returns:
         (is_leaf, confidence)
     """
+    if load_leaf_validator() is None:
+        # No validator available, assume valid (and skip preprocessing)
+        logger.warning("v2_leaf_validation_skipped reason=no_model")
+        return True, 1.0
+    
+    img_array, _ = preprocess_image(image_input, keep_original=False)
+    return _validate_leaf_from_array(img_array)
+
+
+def _validate_leaf_from_array(img_array: np.ndarray) -> Tuple[bool, float]:
+    """Leaf validation on an already preprocessed (1, H, W, 3) input."""
     validator = load_leaf_validator()
     
     if validator is None:
@@ -355,33 +609,20 @@ def validate_leaf(image_input) -> Tuple[bool, float]:
         logger.warning("v2_leaf_validation_skipped reason=no_model")
         return True, 1.0
     
-    img_array, _ = preprocess_image(image_input)
+    return _interpret_leaf_output(_predict_row(validator, img_array, name='v2_leaf_validator'))
+
+
+def _interpret_leaf_output(prediction: np.ndarray) -> Tuple[bool, float]:
+    """Turn a leaf validator output row into (is_leaf, leaf_confidence)."""
+    logger.debug("v2_leaf_validator_raw_output shape=%s values=%s", prediction.shape, prediction)
     
-    if isinstance(validator, tf.lite.Interpreter):
-        prediction = run_tflite_inference(validator, img_array)
-        logger.debug("v2_leaf_validator_raw_output shape=%s values=%s", prediction.shape, prediction)
-        
-        # Handle different output formats
-        if len(prediction) == 2:
-            # Binary classification: [prob_non_leaf, prob_leaf]
-            confidence = float(prediction[1])  # Use prob_leaf
-        elif len(prediction) == 1:
-            # Single sigmoid output
-            confidence = float(prediction[0])
-        else:
-            # Fallback: use first value
-            confidence = float(prediction[0])
+    # Handle different output formats
+    if len(prediction) == 2:
+        # Binary classification: [prob_non_leaf, prob_leaf]
+        confidence = float(prediction[1])  # Use prob_leaf
     else:
-        prediction = validator.predict(img_array, verbose=0)
-        logger.debug("v2_leaf_validator_raw_output shape=%s values=%s", prediction.shape, prediction[0])
-        
-        # Handle different output formats
-        if prediction.shape[-1] == 2:
-            # Binary classification: [prob_non_leaf, prob_leaf]
-            confidence = float(prediction[0][1])  # Use prob_leaf
-        else:
-            # Single sigmoid output
-            confidence = float(prediction[0][0])
+        # Single sigmoid output
+        confidence = float(prediction[0])
     
     # IMPORTANT: Training used folders ['leaf', 'non_leaf'] with label_mode='binary'
     # This means: class 0 = leaf (sigmoid → 0), class 1 = non_leaf (sigmoid → 1)
@@ -413,6 +654,65 @@ def predict_v2(image_input, validate_leaf_first: bool = True, crop_hint: str = N
     Returns:
         dict with predictions, confidence scores, severity, and metadata
     """
+    # Preprocess once; the leaf validator and the classifier share the same input
+    img_array, _ = preprocess_image(image_input, keep_original=False)
+    
+    disease_future, leaf_future = _submit_v2(img_array, validate_leaf_first)
+    return _finish_v2(image_input, disease_future, leaf_future, crop_hint)
+
+
+def predict_v2_batch(images: List[Any], validate_leaf_first: bool = True, crop_hint: str = None) -> List[Dict[str, Any]]:
+    """
+    Run V2 Enhanced prediction on several images at once.
+    
+    All images are queued before any result is awaited, so the model batchers
+    run them through each model in as few batched calls as possible.
+    
+    Args:
+        images: Images to analyze (each a path, PIL Image, numpy array, or file object)
+        validate_leaf_first: Whether to run leaf validation first
+        crop_hint: Optional crop hint for filtering predictions (applies to all images)
+    
+    Returns:
+        List of result dicts in the same order as images (see predict_v2)
+    """
+    pending = []
+    for image_input in images:
+        img_array, _ = preprocess_image(image_input, keep_original=False)
+        # preprocess_image reuses a per-thread buffer; each queued image needs its own copy
+        pending.append((image_input, _submit_v2(img_array.copy(), validate_leaf_first)))
+    
+    return [
+        _finish_v2(image_input, disease_future, leaf_future, crop_hint)
+        for image_input, (disease_future, leaf_future) in pending
+    ]
+
+
+def _submit_v2(img_array: np.ndarray, validate_leaf_first: bool):
+    """
+    Queue one preprocessed image on the classifier and (optionally) leaf validator batchers.
+    
+    Returns:
+        (disease_future, leaf_future), either None when that model is unavailable or skipped
+    """
+    # Queue the classifier right away so it runs concurrently with leaf validation
+    model = load_disease_model()
+    disease_future = _submit_row(model, img_array, name='v2_disease_model') if model is not None else None
+    
+    leaf_future = None
+    if validate_leaf_first:
+        validator = load_leaf_validator()
+        if validator is not None:
+            leaf_future = _submit_row(validator, img_array, name='v2_leaf_validator')
+        else:
+            # No validator available, assume valid
+            logger.warning("v2_leaf_validation_skipped reason=no_model")
+    
+    return disease_future, leaf_future
+
+
+def _finish_v2(image_input, disease_future, leaf_future, crop_hint: str = None) -> Dict[str, Any]:
+    """Wait for one image's queued model outputs and build its prediction result."""
     result = {
         'version': '2.0',
         'inference_method': 'v2_enhanced',
@@ -421,12 +721,15 @@ def predict_v2(image_input, validate_leaf_first: bool = True, crop_hint: str = N
     }
     
     # Step 1: Validate leaf (optional)
-    if validate_leaf_first:
-        is_leaf, leaf_conf = validate_leaf(image_input)
+    if leaf_future is not None:
+        is_leaf, leaf_conf = _interpret_leaf_output(leaf_future.result(BATCH_TIMEOUT_S))
         result['is_valid_leaf'] = is_leaf
         result['leaf_confidence'] = round(leaf_conf, 3)
         
         if not is_leaf:
+            if disease_future is not None:
+                # Classification result is not needed; drop it if it hasn't started yet
+                disease_future.cancel()
             logger.warning("v2_prediction_rejected reason=not_a_leaf confidence=%.3f", leaf_conf)
             result['error'] = 'Image does not appear to contain a valid leaf'
             result['n_score'] = 0.0
@@ -445,45 +748,38 @@ def predict_v2(image_input, validate_leaf_first: bool = True, crop_hint: str = N
             result['detected_class'] = 'non_leaf'
             return result
     
-    # Step 2: Run disease classification
-    model = load_disease_model()
+    # Step 2: Collect disease classification
     class_names = load_class_names()
     metadata = load_metadata()
     
-    if model is None:
+    if disease_future is None:
         logger.error("v2_prediction_failed reason=no_model")
         result['error'] = 'Disease classifier model not available'
         result['inference_method'] = 'v2_mock'
         # Return mock predictions
         return _generate_mock_result(image_input, result)
     
-    # Preprocess
-    img_array, original_img = preprocess_image(image_input)
-    
-    # Run inference
-    if isinstance(model, tf.lite.Interpreter):
-        predictions = run_tflite_inference(model, img_array)
-    else:
-        predictions = model.predict(img_array, verbose=0)[0]
+    # Concurrent requests are batched into one call by the model's batcher
+    predictions = disease_future.result(BATCH_TIMEOUT_S)
     
     # Filter predictions by crop_hint if provided
     # This ensures we only consider classes matching the user's selected crop
     if crop_hint:
         crop_hint_lower = crop_hint.lower()
-        # Find indices of classes that match the crop
-        crop_indices = [i for i, name in enumerate(class_names) if name.lower().startswith(crop_hint_lower + '_')]
+        # Mask of the classes that match the crop
+        crop_mask = get_crop_mask(crop_hint_lower, len(predictions))
+        num_crop_classes = int(np.count_nonzero(crop_mask))
         
-        if crop_indices:
-            # Create filtered predictions (only crop-specific classes)
-            filtered_predictions = np.zeros_like(predictions)
-            for i in crop_indices:
-                filtered_predictions[i] = predictions[i]
+        if num_crop_classes:
+            # Create filtered predictions (only crop-specific classes) in one pass,
+            # without a zeroed buffer and gathered copy
+            filtered_predictions = predictions * crop_mask
             
             # Normalize within crop classes
-            crop_sum = sum(filtered_predictions)
+            crop_sum = float(filtered_predictions.sum())
             if crop_sum > 0:
                 # Use filtered predictions
-                logger.info("v2_crop_filter applied crop=%s matching_classes=%d", crop_hint_lower, len(crop_indices))
+                logger.info("v2_crop_filter applied crop=%s matching_classes=%d", crop_hint_lower, num_crop_classes)
                 predictions_to_use = filtered_predictions
             else:
                 # No confidence in any crop class, use original
@@ -497,8 +793,10 @@ def predict_v2(image_input, validate_leaf_first: bool = True, crop_hint: str = N
         predictions_to_use = predictions
     
     # Get top predictions from filtered set
-    top_k = 3
-    top_indices = np.argsort(predictions_to_use)[::-1][:top_k]
+    # (partial selection of the top k, then sort just those instead of all classes)
+    top_k = min(3, len(predictions_to_use))
+    top_part = np.argpartition(predictions_to_use, -top_k)[-top_k:]
+    top_indices = top_part[np.argsort(-predictions_to_use[top_part])]
     top_classes = [(class_names[i] if i < len(class_names) else f'class_{i}', float(predictions[i])) 
                    for i in top_indices]
     
@@ -521,37 +819,31 @@ def predict_v2(image_input, validate_leaf_first: bool = True, crop_hint: str = N
     # IMPROVED: Calculate WEIGHTED deficiency scores across ALL classes
     # This accounts for model uncertainty - if model is unsure between healthy and deficient,
     # the weighted score will reflect that uncertainty
-    weighted_deficiencies = {'n': 0.0, 'p': 0.0, 'k': 0.0, 'mg': 0.0}
-    total_weight = 0.0
-    
-    for i, prob in enumerate(predictions_to_use):
-        if prob > 0.001:  # Only consider classes with >0.1% probability
-            class_name = class_names[i] if i < len(class_names) else f'class_{i}'
-            class_deficiencies = parse_class_to_nutrients(class_name)
-            
-            for nutrient in ['n', 'p', 'k', 'mg']:
-                weighted_deficiencies[nutrient] += prob * class_deficiencies[nutrient]
-            total_weight += prob
-    
-    # Normalize by total weight (should be close to 1.0 for softmax, but normalize anyway)
-    if total_weight > 0:
-        for nutrient in weighted_deficiencies:
-            weighted_deficiencies[nutrient] = float(weighted_deficiencies[nutrient] / total_weight)
+    # Only consider classes with >0.1% probability
+    weights = np.where(predictions_to_use > 0.001, predictions_to_use, 0.0).astype(np.float32)
+    total_weight = float(weights.sum())
+    if total_weight > 0 and weights[primary_idx] >= total_weight * (1.0 - DOMINANT_CLASS_TOLERANCE):
+        # One class holds practically all the weight: skip the sum over every class
+        weighted = get_class_nutrients(primary_class).astype(np.float64)
+    else:
+        weighted = weights @ get_nutrient_matrix(len(weights))
+        
+        # Normalize by total weight (should be close to 1.0 for softmax, but normalize anyway)
+        if total_weight > 0:
+            weighted /= total_weight
+        weighted = weighted.astype(np.float64)
+    weighted_deficiencies = dict(zip(NUTRIENT_KEYS, weighted.tolist()))
     
-    # Also get the primary class deficiency for reference
-    primary_deficiencies = parse_class_to_nutrients(primary_class)
     detected_crop = get_crop_from_class(primary_class)
     
     # Use weighted deficiencies for health scores
     # This means: if model is 50% sure it's healthy (deficiency=0) and 50% sure it's N-deficient (deficiency=0.75),
     # the weighted deficiency will be 0.375, giving health of 62.5% (attention level)
     # Convert to Python float to ensure JSON serialization works
-    health_scores = {
-        'n': float(1.0 - weighted_deficiencies['n']),
-        'p': float(1.0 - weighted_deficiencies['p']),
-        'k': float(1.0 - weighted_deficiencies['k']),
-        'mg': float(1.0 - weighted_deficiencies['mg']),
-    }
+    health_scores = dict(zip(NUTRIENT_KEYS, (1.0 - weighted).tolist()))
+    
+    # Confidence only for nutrients with a meaningful weighted deficiency
+    confidences = dict(zip(NUTRIENT_KEYS, np.where(weighted > 0.1, round(primary_confidence, 2), 0.0).tolist()))
     
     logger.info("v2_weighted_deficiencies n=%.3f p=%.3f k=%.3f mg=%.3f", 
                 weighted_deficiencies['n'], weighted_deficiencies['p'], 
@@ -587,10 +879,10 @@ def predict_v2(image_input, validate_leaf_first: bool = True, crop_hint: str = N
         'mg_percentage': round(health_scores['mg'] * 100, 1),
         
         # Confidence scores (based on weighted deficiencies)
-        'n_confidence': round(primary_confidence, 2) if weighted_deficiencies['n'] > 0.1 else 0.0,
-        'p_confidence': round(primary_confidence, 2) if weighted_deficiencies['p'] > 0.1 else 0.0,
-        'k_confidence': round(primary_confidence, 2) if weighted_deficiencies['k'] > 0.1 else 0.0,
-        'mg_confidence': round(primary_confidence, 2) if weighted_deficiencies['mg'] > 0.1 else 0.0,
+        'n_confidence': confidences['n'],
+        'p_confidence': confidences['p'],
+        'k_confidence': confidences['k'],
+        'mg_confidence': confidences['mg'],
         
         # Severity levels (based on health scores, not deficiency)
         'n_severity': _get_severity_from_health(health_scores['n']),
@@ -639,13 +931,8 @@ def _get_severity_from_health(health_score: float) -> str:
 
 def _generate_mock_result(image_input, base_result: Dict) -> Dict:
     """Generate mock predictions when model is unavailable."""
-    import random
-    
-    # Generate somewhat realistic mock data
-    n = random.uniform(0.1, 0.6)
-    p = random.uniform(0.1, 0.5)
-    k = random.uniform(0.1, 0.5)
-    mg = random.uniform(0.0, 0.3)
+    # Generate somewhat realistic mock data (one vectorized draw for all four nutrients)
+    n, p, k, mg = np.random.default_rng().uniform([0.1, 0.1, 0.1, 0.0], [0.6, 0.5, 0.5, 0.3]).tolist()
     
     base_result.update({
         'n_score': round(n, 2),
@@ -688,13 +975,16 @@ def _generate_synthetic_heatmap(img_array: np.ndarray) -> np.ndarray:
     h, w, _ = img_array.shape[1:]
     center_x, center_y = w // 2, h // 2
     
-    y, x = np.ogrid[:h, :w]
-    dist_from_center = np.sqrt((x - center_x)**2 + (y - center_y)**2)
+    # Normalized squared distances per row and per column; broadcasting them
+    # builds the (h, w) distance field in a single float32 pass
+    max_dist_sq = np.float32(center_x**2 + center_y**2)
+    yy = (np.arange(h, dtype=np.float32) - center_y) ** 2 / max_dist_sq
+    xx = (np.arange(w, dtype=np.float32) - center_x) ** 2 / max_dist_sq
     
-    max_dist = np.sqrt(center_x**2 + center_y**2)
     # Invert the heatmap logic: 1.0 at center, 0.0 at edges
-    heatmap = 1 - (dist_from_center / max_dist)
-    heatmap = np.clip(heatmap, 0, 1)
+    heatmap = np.sqrt(yy[:, np.newaxis] + xx[np.newaxis, :])
+    np.subtract(1.0, heatmap, out=heatmap)
+    np.clip(heatmap, 0, 1, out=heatmap)
     
     # Apply a gentle blur to make it look more organic
     if cv2:
@@ -713,8 +1003,13 @@ def save_and_superimpose_heatmap(
     """
     Saves a superimposed heatmap image with correct color mapping.
     """
-    img = keras.preprocessing.image.load_img(img_path)
-    img = keras.preprocessing.image.img_to_array(img)
+    # Decode straight to uint8 with OpenCV (ignoring EXIF rotation, like PIL/Keras loaders);
+    # fall back to PIL for formats this OpenCV build cannot read
+    img = cv2.imread(str(img_path), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+    if img is None:
+        img = np.asarray(Image.open(img_path).convert('RGB'))
+    else:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
     heatmap = np.uint8(255 * heatmap)
     
@@ -722,9 +1017,8 @@ def save_and_superimpose_heatmap(
     colormap = cv2.applyColorMap(heatmap, cv2.COLORMAP_JET)
     jet_rgb = cv2.cvtColor(colormap, cv2.COLOR_BGR2RGB)
 
-    # Superimpose the heatmap on the original image
-    superimposed_img = jet_rgb * alpha + img * (1 - alpha)
-    superimposed_img = np.clip(superimposed_img, 0, 255).astype(np.uint8)
+    # Superimpose the heatmap on the original image (one saturating uint8 pass)
+    superimposed_img = cv2.addWeighted(jet_rgb, alpha, img, 1.0 - alpha, 0.0)
 
     Image.fromarray(superimposed_img).save(output_path)
     logger.debug("v2_heatmap_saved path=%s", output_path)
@@ -735,6 +1029,79 @@ def save_and_superimpose_heatmap(
 # GRAD-CAM HEATMAP
 # ============================================
 
+def _get_gradcam_fn(model):
+    """
+    Resolve the last conv layer and build the Grad-CAM function once per model.
+    
+    Returns:
+        (last_conv_layer, gradcam_fn) or (None, None) if the model has no conv layer
+    """
+    key = id(model)
+    if key in _state.grad_model_cache:
+        return _state.grad_model_cache[key]
+    
+    # Find last conv layer in MobileNetV2
+    last_conv_layer = None
+    for layer in reversed(model.layers):
+        if isinstance(layer, keras.layers.Conv2D):
+            last_conv_layer = layer.name
+            break
+        # Check inside base model if it's a Sequential with MobileNetV2
+        if hasattr(layer, 'layers'):
+            for sublayer in reversed(layer.layers):
+                if isinstance(sublayer, keras.layers.Conv2D):
+                    last_conv_layer = f"{layer.name}/{sublayer.name}"
+                    break
+            if last_conv_layer:
+                break
+    
+    if last_conv_layer is None:
+        _state.grad_model_cache[key] = (None, None)
+        return _state.grad_model_cache[key]
+    
+    # Get the actual layer (handling nested models)
+    if '/' in last_conv_layer:
+        base_name, sublayer_name = last_conv_layer.split('/')
+        base_layer = model.get_layer(base_name)
+        conv_layer = base_layer.get_layer(sublayer_name)
+        conv_output = conv_layer.output
+    else:
+        conv_output = model.get_layer(last_conv_layer).output
+    
+    # Create gradient model
+    grad_model = keras.Model(
+        inputs=model.input,
+        outputs=[conv_output, model.output]
+    )
+    
+    @tf.function(input_signature=[
+        tf.TensorSpec((1,) + tuple(model.input_shape[1:]), tf.float32),
+        tf.TensorSpec((), tf.int32),
+    ])
+    def gradcam_fn(img_array, target_class):
+        # Compute gradients
+        with tf.GradientTape() as tape:
+            conv_out, preds = grad_model(img_array, training=False)
+            if target_class < 0:
+                target_class = tf.argmax(preds[0], output_type=tf.int32)
+            loss = preds[:, target_class]
+        
+        grads = tape.gradient(loss, conv_out)
+        pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
+        
+        # Weight feature maps
+        heatmap = tf.squeeze(conv_out[0] @ pooled_grads[..., tf.newaxis])
+        
+        # Normalize
+        heatmap = tf.maximum(heatmap, 0)
+        heatmap = tf.math.divide_no_nan(heatmap, tf.math.reduce_max(heatmap))
+        return heatmap, target_class
+    
+    _state.grad_model_cache[key] = (last_conv_layer, gradcam_fn)
+    logger.info("v2_gradcam_model_built conv_layer=%s", last_conv_layer)
+    return _state.grad_model_cache[key]
+
+
 def generate_gradcam_v2(image_input, target_class: int = None) -> Optional[str]:
     """
     Generate Grad-CAM heatmap for V2 model.
@@ -750,7 +1117,7 @@ def generate_gradcam_v2(image_input, target_class: int = None) -> Optional[str]:
     model = load_disease_model()
     
     # If using TFLite or no model, generate synthetic heatmap based on color analysis
-    if model is None or isinstance(model, tf.lite.Interpreter):
+    if model is None or isinstance(model, TFLiteModel):
         logger.info("v2_gradcam_using_synthetic reason=tflite_model")
         return _generate_synthetic_heatmap(image_input)
     
@@ -759,86 +1126,46 @@ def generate_gradcam_v2(image_input, target_class: int = None) -> Optional[str]:
         return None
     
     try:
-        img_array, original_img = preprocess_image(image_input)
-        
-        # Get prediction if target_class not specified
-        if target_class is None:
-            predictions = model.predict(img_array, verbose=0)[0]
-            target_class = int(np.argmax(predictions))
-        
-        # Find last conv layer in MobileNetV2
-        last_conv_layer = None
-        for layer in reversed(model.layers):
-            if isinstance(layer, keras.layers.Conv2D):
-                last_conv_layer = layer.name
-                break
-            # Check inside base model if it's a Sequential with MobileNetV2
-            if hasattr(layer, 'layers'):
-                for sublayer in reversed(layer.layers):
-                    if isinstance(sublayer, keras.layers.Conv2D):
-                        last_conv_layer = f"{layer.name}/{sublayer.name}"
-                        break
-                if last_conv_layer:
-                    break
+        img_array, original = preprocess_image(image_input)
         
-        if last_conv_layer is None:
+        last_conv_layer, gradcam_fn = _get_gradcam_fn(model)
+        if gradcam_fn is None:
             logger.warning("v2_gradcam_failed reason=no_conv_layer")
             return None
         
-        # Get the actual layer (handling nested models)
-        if '/' in last_conv_layer:
-            base_name, sublayer_name = last_conv_layer.split('/')
-            base_layer = model.get_layer(base_name)
-            conv_layer = base_layer.get_layer(sublayer_name)
-            conv_output = conv_layer.output
-        else:
-            conv_output = model.get_layer(last_conv_layer).output
-        
-        # Create gradient model
-        grad_model = keras.Model(
-            inputs=model.input,
-            outputs=[conv_output, model.output]
+        # Forward + backward pass in one compiled call; -1 means "use the top prediction"
+        heatmap, target_class = gradcam_fn(
+            img_array,
+            tf.constant(-1 if target_class is None else int(target_class), dtype=tf.int32),
         )
-        
-        # Compute gradients
-        with tf.GradientTape() as tape:
-            conv_out, preds = grad_model(img_array)
-            loss = preds[:, target_class]
-        
-        grads = tape.gradient(loss, conv_out)
-        pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
-        
-        # Weight feature maps
-        conv_out = conv_out[0]
-        heatmap = conv_out @ pooled_grads[..., tf.newaxis]
-        heatmap = tf.squeeze(heatmap)
-        
-        # Normalize
-        heatmap = tf.maximum(heatmap, 0)
-        if tf.math.reduce_max(heatmap) > 0:
-            heatmap = heatmap / tf.math.reduce_max(heatmap)
         heatmap = heatmap.numpy()
+        target_class = int(target_class)
         
         # Resize and apply colormap
-        heatmap_resized = cv2.resize(heatmap, (original_img.width, original_img.height), 
-                                      interpolation=cv2.INTER_CUBIC)
+        height, width = original.shape[:2]
+        # (the wide blur dominates, so bilinear upsampling looks the same as bicubic)
+        heatmap_resized = cv2.resize(heatmap, (width, height), interpolation=cv2.INTER_LINEAR)
         heatmap_resized = cv2.GaussianBlur(heatmap_resized, (0, 0), sigmaX=10, sigmaY=10)
         
-        heatmap_uint8 = np.uint8(255 * heatmap_resized)
-        # Invert the colormap: JET_r maps high values (unhealthy areas) to cool colors (blue)
+        # Invert the colormap: reversed JET maps high values (unhealthy areas) to cool colors (blue)
         # and low values (healthy areas) to warm colors (red), which is the desired effect.
-        heatmap_colored = cv2.applyColorMap(heatmap_uint8, cv2.COLORMAP_JET_r)
+        # OpenCV has no reversed JET, so scale to 255 * (1 - h) while converting to uint8.
+        heatmap_uint8 = cv2.convertScaleAbs(heatmap_resized, alpha=-255.0, beta=255.0)
+        heatmap_colored = cv2.applyColorMap(heatmap_uint8, cv2.COLORMAP_JET)
         heatmap_colored = cv2.cvtColor(heatmap_colored, cv2.COLOR_BGR2RGB)
         
         # Overlay
-        original_array = np.array(original_img)
-        overlay = cv2.addWeighted(original_array, 0.5, heatmap_colored, 0.5, 0)
+        overlay = cv2.addWeighted(original, 0.5, heatmap_colored, 0.5, 0)
         
-        # Convert to base64
-        overlay_img = Image.fromarray(overlay)
-        buffered = BytesIO()
-        overlay_img.save(buffered, format="JPEG", quality=90)
-        img_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
+        # Convert to base64 (OpenCV's libjpeg-turbo encoder is SIMD-accelerated)
+        ok, buf = cv2.imencode(
+            '.jpg',
+            cv2.cvtColor(overlay, cv2.COLOR_RGB2BGR),
+            [int(cv2.IMWRITE_JPEG_QUALITY), 90],
+        )
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        img_base64 = base64.b64encode(buf).decode('utf-8')
         
         logger.info("v2_gradcam_generated target_class=%d", target_class)
         return f"data:image/jpeg;base64,{img_base64}"
@@ -882,7 +1209,20 @@ def get_model_info_v2() -> Dict[str, Any]:
 
 def is_v2_available() -> bool:
     """Check if V2 models are available."""
-    return (DISEASE_MODEL_KERAS.exists() or DISEASE_MODEL_TFLITE.exists())
+    return any(path.exists() for path in (
+        DISEASE_MODEL_KERAS,
+        DISEASE_MODEL_TFLITE,
+        DISEASE_MODEL_TFLITE_INT8,
+        DISEASE_MODEL_TFLITE_FP16,
+    ))
+
+
+def init_v2():
+    """Load metadata, labels and both V2 models up front (called at app startup)."""
+    load_metadata()
+    load_class_names()
+    load_leaf_validator()
+    load_disease_model()
 
 
 # ============================================
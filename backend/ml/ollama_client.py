@@ -5,12 +5,23 @@ Provides AI-powered crop analysis using Ollama with vision models.
 Supports image analysis for leaf deficiency detection insights.
 """
 
+import io
 import os
+import json
+import atexit
+import time
 import base64
+import hashlib
 import logging
+import threading
 import requests
-from typing import Optional, List, Dict, Any
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
+from typing import Optional, List, Dict, Any, Iterator, Union, BinaryIO
 from pathlib import Path
+from PIL import Image, ImageOps
 
 logger = logging.getLogger('fasalvaidya.ollama')
 
@@ -18,22 +29,77 @@ logger = logging.getLogger('fasalvaidya.ollama')
 OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
 OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llava:7b')  # Vision-capable model
 OLLAMA_TIMEOUT = int(os.getenv('OLLAMA_TIMEOUT', '30'))  # Aggressive 30s timeout for speed
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')  # Keep the model loaded between chat turns
 
-# System prompt for agricultural expert (ultra-optimized for speed)
+# System prompt for agricultural expert (ultra-optimized for speed).
+# Sent byte-for-byte the same on every turn, ahead of anything request-specific,
+# so Ollama can reuse the already-evaluated prompt prefix.
 SYSTEM_PROMPT = """FasalVaidya AI: Give ONE SHORT answer (20-30 words). State problem → solution. Be direct."""
 
+# Text answers are a single short paragraph; stop generating as soon as one
+# ends. Not used for image turns, whose analyses span several blocks.
+CHAT_STOP = ['\n\n', 'User:', '###']
+
 CONTEXT_TEMPLATE = """Crop: {crop_name} | N:{n_score}% P:{p_score}% K:{k_score}% | Status: {overall_status}"""
 
+# Shared session: keeps the connection to the Ollama server alive across
+# requests instead of opening a new socket for every status check and chat turn
+_SESSION = requests.Session()
+_SESSION.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+atexit.register(_SESSION.close)
+
+# A successful availability check is reused for this many seconds, so chat
+# turns don't each pay a GET /api/tags round-trip before the real request
+_AVAILABILITY_TTL = 30.0
+_AVAILABILITY_CACHE = {'ts': 0.0, 'value': None}
+
+# Identical chat requests already on their way to Ollama, keyed by _request_key
+_INFLIGHT: Dict[str, Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+# Successful answers to fresh questions (no chat history), reused for repeated
+# questions and re-analyses of the same photo. Least recently used entries are
+# evicted past _RESP_CACHE_MAX; entries expire after _RESP_CACHE_TTL seconds.
+_RESP_CACHE: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+_RESP_CACHE_MAX = 256
+_RESP_CACHE_TTL = 1800.0
+_RESP_CACHE_LOCK = threading.Lock()
+
+
+def _invalidate_availability() -> None:
+    """Forget the cached availability so the next check probes the server."""
+    _AVAILABILITY_CACHE['ts'] = 0.0
+    _AVAILABILITY_CACHE['value'] = None
+
 
 def check_ollama_available() -> Dict[str, Any]:
     """
     Check if Ollama server is available and which models are installed.
     
+    Successful results are cached for _AVAILABILITY_TTL seconds; failures
+    are never cached, so an unavailable server is re-probed on the next call.
+    
     Returns:
         dict with 'available' (bool), 'models' (list), 'error' (str if any)
     """
+    cached = _AVAILABILITY_CACHE['value']
+    if cached is not None and time.monotonic() - _AVAILABILITY_CACHE['ts'] < _AVAILABILITY_TTL:
+        return dict(cached)
+    
+    status = _probe_ollama()
+    if status['available']:
+        _AVAILABILITY_CACHE['value'] = status
+        _AVAILABILITY_CACHE['ts'] = time.monotonic()
+    else:
+        _invalidate_availability()
+    return dict(status)
+
+
+def _probe_ollama() -> Dict[str, Any]:
+    """Query GET /api/tags for server availability and installed models."""
     try:
-        response = requests.get(
+        response = _SESSION.get(
             f"{OLLAMA_BASE_URL}/api/tags",
             timeout=5
         )
@@ -87,10 +153,77 @@ def build_context_message(scan_data: Optional[Dict] = None, history: Optional[Li
     )
 
 
+# Read size for base64 encoding; a multiple of 3 so chunks encode without padding
+_BASE64_CHUNK_SIZE = 3 * 256 * 1024
+
+# Vision models resize to a few hundred pixels internally, so larger images are
+# downscaled to this bounding box and re-encoded before upload. Images at or
+# below the pass-through size are sent as they are.
+VISION_MAX_SIDE = 672
+VISION_JPEG_QUALITY = 85
+VISION_PASSTHROUGH_BYTES = 512 * 1024
+
+
+def _downscale_for_vision(source: Union[str, BinaryIO]) -> Optional[bytes]:
+    """JPEG re-encode of an image fit within VISION_MAX_SIDE (None if it can't be decoded)."""
+    try:
+        with Image.open(source) as img:
+            # Let the JPEG decoder downscale while decoding (no-op for other formats)
+            img.draft('RGB', (VISION_MAX_SIDE, VISION_MAX_SIDE))
+            # Re-encoding drops EXIF, so apply its orientation to the pixels
+            img = ImageOps.exif_transpose(img).convert('RGB')
+            img.thumbnail((VISION_MAX_SIDE, VISION_MAX_SIDE), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, format='JPEG', quality=VISION_JPEG_QUALITY, optimize=True)
+            return out.getvalue()
+    except Exception:
+        logger.warning("image_downscale_failed", exc_info=True)
+        return None
+
+
+def prepare_image_base64(image_base64: str) -> str:
+    """Downscale a base64 image for the vision model unless it is already small."""
+    if len(image_base64) <= VISION_PASSTHROUGH_BYTES * 4 // 3:
+        return image_base64
+    try:
+        raw = base64.b64decode(image_base64, validate=True)
+    except ValueError:
+        return image_base64
+    downscaled = _downscale_for_vision(io.BytesIO(raw))
+    if downscaled is None or len(downscaled) >= len(raw):
+        return image_base64
+    return base64.b64encode(downscaled).decode('ascii')
+
+
+@lru_cache(maxsize=64)
+def _encode_file_base64(path: str, mtime_ns: int, size: int) -> str:
+    """
+    Base64 of an image file for the vision model; mtime/size key the cache to the file's version.
+    
+    Files over VISION_PASSTHROUGH_BYTES are downscaled first; others are
+    encoded chunk by chunk as they are.
+    """
+    if size > VISION_PASSTHROUGH_BYTES:
+        downscaled = _downscale_for_vision(path)
+        if downscaled is not None and len(downscaled) < size:
+            return base64.b64encode(downscaled).decode('ascii')
+    
+    encoded = bytearray()
+    with open(path, 'rb') as f:
+        while chunk := f.read(_BASE64_CHUNK_SIZE):
+            encoded += base64.b64encode(chunk)
+    return encoded.decode('ascii')
+
+
 def encode_image_to_base64(image_path: str) -> Optional[str]:
     """
     Encode an image file to base64 for Ollama vision models.
     
+    Large images are downscaled to VISION_MAX_SIDE and re-encoded as JPEG;
+    smaller files are encoded in chunks rather than read whole. The result
+    is memoized per (path, mtime, size), so asking about the same image
+    again in a conversation skips the work.
+    
     Args:
         image_path: Path to the image file
         
@@ -102,14 +235,148 @@ def encode_image_to_base64(image_path: str) -> Optional[str]:
         if not path.exists():
             logger.warning("image_not_found path=%s", image_path)
             return None
-            
-        with open(path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+        
+        st = path.stat()
+        return _encode_file_base64(str(path.resolve()), st.st_mtime_ns, st.st_size)
     except Exception as e:
         logger.exception("image_encode_failed path=%s", image_path)
         return None
 
 
+class OllamaError(Exception):
+    """A chat request Ollama could not serve (server down, error reply, ...)."""
+    
+    def __init__(self, message: str, needs_connection: bool = False):
+        super().__init__(message)
+        self.needs_connection = needs_connection
+
+
+def _build_messages(
+    message: str,
+    chat_history: Optional[List[Dict[str, str]]] = None,
+    context: Optional[Dict] = None,
+    image_base64: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Assemble the /api/chat messages array (system prompts, context, history, message).
+    
+    The fixed system prompts come first and scan data goes in its own later
+    message, so the start of the prompt is identical across requests.
+    """
+    messages = [{'role': 'system', 'content': SYSTEM_PROMPT}]
+
+    # Enforce English and extreme brevity
+    messages.append({'role': 'system', 'content': '20-30 words ONLY.'})
+    
+    # Add context if available (compact format)
+    if context:
+        context_msg = build_context_message(context)
+        if context_msg:
+            messages.append({'role': 'system', 'content': context_msg})
+    
+    # Add recent chat history only (last 4 messages for speed)
+    if chat_history:
+        for msg in chat_history[-4:]:
+            messages.append({
+                'role': msg.get('role', 'user'),
+                'content': msg.get('content', '')
+            })
+    
+    # Add current message with optional image
+    messages.append({'role': 'user', 'content': message})
+    if image_base64:
+        _attach_image(messages, image_base64)
+    return messages
+
+
+def _attach_image(messages: List[Dict[str, Any]], image_base64: str) -> None:
+    """Attach an image, prepared for the vision model, to the last (user) message."""
+    messages[-1]['images'] = [prepare_image_base64(image_base64)]
+
+
+def _stream_chat(model: str, messages: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    POST a streaming /api/chat request and yield each decoded NDJSON chunk.
+    
+    Raises OllamaError for error replies and requests exceptions for
+    connection problems and timeouts.
+    """
+    status = check_ollama_available()
+    if not status['available']:
+        raise OllamaError(status.get('error', 'Ollama is not available'), needs_connection=True)
+    
+    has_image = any('images' in m for m in messages)
+    logger.info("ollama_chat_request model=%s messages=%d has_image=%s", 
+                model, len(messages), has_image)
+    
+    options = {
+        'temperature': 0.1,        # Very low = fastest, most focused
+        'num_predict': 160 if has_image else 64,  # 20-30 word answers; image analyses run longer
+        'top_k': 10,               # Faster sampling
+        'top_p': 0.9,              # High = faster decisions
+        'num_ctx': 1024,           # Smaller context window = faster (kept fixed: changing it reloads the model)
+    }
+    if not has_image:
+        options['stop'] = CHAT_STOP
+    
+    # The read timeout bounds the wait for each chunk, not the whole reply
+    with _SESSION.post(
+        f"{OLLAMA_BASE_URL}/api/chat",
+        json={
+            'model': model,
+            'messages': messages,
+            'stream': True,
+            'keep_alive': OLLAMA_KEEP_ALIVE,
+            'options': options
+        },
+        stream=True,
+        timeout=(5, OLLAMA_TIMEOUT)
+    ) as response:
+        if response.status_code != 200:
+            error_msg = f"Ollama returned status {response.status_code}"
+            try:
+                error_msg = response.json().get('error', error_msg)
+            except ValueError:
+                pass
+            logger.warning("ollama_chat_failed status=%d error=%s", 
+                          response.status_code, error_msg)
+            _invalidate_availability()
+            raise OllamaError(error_msg)
+        
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if 'error' in chunk:
+                raise OllamaError(chunk['error'])
+            yield chunk
+            if chunk.get('done'):
+                break
+
+
+def chat_with_ollama_stream(
+    message: str,
+    chat_history: Optional[List[Dict[str, str]]] = None,
+    context: Optional[Dict] = None,
+    image_base64: Optional[str] = None,
+    model: Optional[str] = None,
+    language: Optional[str] = None
+) -> Iterator[str]:
+    """
+    Send a chat message to Ollama and yield the response text as it is generated.
+    
+    Takes the same arguments as chat_with_ollama. Raises OllamaError when the
+    server is unavailable or returns an error, and requests exceptions for
+    connection failures and timeouts.
+    """
+    model = model or OLLAMA_MODEL
+    messages = _build_messages(message, chat_history, context, image_base64)
+    for chunk in _stream_chat(model, messages):
+        content = chunk.get('message', {}).get('content', '')
+        if content:
+            yield content
+
+
 def chat_with_ollama(
     message: str,
     chat_history: Optional[List[Dict[str, str]]] = None,
@@ -133,95 +400,138 @@ def chat_with_ollama(
     """
     model = model or OLLAMA_MODEL
     
-    # Check availability first
-    status = check_ollama_available()
-    if not status['available']:
+    try:
+        # The image is attached only on a cache miss; keying on the raw
+        # upload lets a hit skip decoding and resizing it
+        messages = _build_messages(message, chat_history, context)
+    except Exception as e:
+        logger.exception("ollama_chat_error")
         return {
             'success': False,
-            'error': status.get('error', 'Ollama is not available'),
-            'needs_connection': True
+            'error': str(e)
         }
     
+    key = _request_key(model, messages, image_base64)
+    # Answers that depend on earlier turns are not reused
+    cacheable = not chat_history
+    if cacheable:
+        cached = _cached_response(key)
+        if cached is not None:
+            logger.info("ollama_chat_cache_hit model=%s key=%s", model, key)
+            return cached
+    
+    # Callers get their own copy of a result that may be shared
+    result = dict(_coalesced(key, lambda: _chat_once(model, messages, image_base64)))
+    # A blank reply is a failed generation as far as the user is concerned
+    if cacheable and result['success'] and result['response'].strip():
+        _store_response(key, result)
+    return result
+
+
+def _cached_response(key: str) -> Optional[Dict[str, Any]]:
+    """Copy of a cached, unexpired chat result, or None."""
+    with _RESP_CACHE_LOCK:
+        entry = _RESP_CACHE.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry['ts'] >= _RESP_CACHE_TTL:
+            del _RESP_CACHE[key]
+            return None
+        _RESP_CACHE.move_to_end(key)
+        return dict(entry['value'])
+
+
+def _store_response(key: str, result: Dict[str, Any]) -> None:
+    """Cache a successful chat result, evicting the least recently used beyond the limit."""
+    with _RESP_CACHE_LOCK:
+        _RESP_CACHE[key] = {'ts': time.monotonic(), 'value': dict(result)}
+        _RESP_CACHE.move_to_end(key)
+        while len(_RESP_CACHE) > _RESP_CACHE_MAX:
+            _RESP_CACHE.popitem(last=False)
+
+
+def _request_key(
+    model: str,
+    messages: List[Dict[str, Any]],
+    image_base64: Optional[str] = None
+) -> str:
+    """Digest identifying a chat request by its model, text messages and raw image."""
+    payload = json.dumps([model, messages], sort_keys=True, separators=(',', ':'))
+    digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=16)
+    if image_base64:
+        digest.update(hashlib.blake2b(image_base64.encode('ascii', 'replace')).digest())
+    return digest.hexdigest()
+
+
+def _coalesced(key: str, fn):
+    """
+    Run fn() once for all concurrent callers with the same key.
+    
+    The first caller makes the request; callers arriving while it is in
+    flight (double submits, UI retries) wait for and share its result
+    instead of queueing another generation on the Ollama server.
+    """
+    with _INFLIGHT_LOCK:
+        future = _INFLIGHT.get(key)
+        leader = future is None
+        if leader:
+            future = _INFLIGHT[key] = Future()
+    if not leader:
+        logger.info("ollama_chat_coalesced key=%s", key)
+        return future.result()
+    
     try:
-        # Build messages array
-        messages = [{'role': 'system', 'content': SYSTEM_PROMPT}]
+        result = fn()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _INFLIGHT_LOCK:
+            _INFLIGHT.pop(key, None)
 
-        # Enforce English and extreme brevity
-        messages.append({'role': 'system', 'content': '20-30 words ONLY.'})
-        
-        # Add context if available (compact format)
-        if context:
-            context_msg = build_context_message(context)
-            if context_msg:
-                messages.append({'role': 'system', 'content': context_msg})
-        
-        # Add recent chat history only (last 4 messages for speed)
-        if chat_history:
-            for msg in chat_history[-4:]:
-                messages.append({
-                    'role': msg.get('role', 'user'),
-                    'content': msg.get('content', '')
-                })
-        
-        # Add current message with optional image
-        current_message = {'role': 'user', 'content': message}
+
+def _chat_once(
+    model: str,
+    messages: List[Dict[str, Any]],
+    image_base64: Optional[str] = None
+) -> Dict[str, Any]:
+    """Send one chat request and return the result dict (errors included)."""
+    try:
         if image_base64:
-            current_message['images'] = [image_base64]
-        messages.append(current_message)
+            _attach_image(messages, image_base64)
         
-        # Call Ollama API
-        logger.info("ollama_chat_request model=%s messages=%d has_image=%s", 
-                    model, len(messages), bool(image_base64))
+        # Collect the streamed reply; the last chunk carries the timing stats
+        parts = []
+        final = {}
+        for chunk in _stream_chat(model, messages):
+            parts.append(chunk.get('message', {}).get('content', ''))
+            final = chunk
+        assistant_message = ''.join(parts)
         
-        response = requests.post(
-            f"{OLLAMA_BASE_URL}/api/chat",
-            json={
-                'model': model,
-                'messages': messages,
-                'stream': False,
-                'options': {
-                    'temperature': 0.1,        # Very low = fastest, most focused
-                    'num_predict': 100,        # Very short responses (2-3 sentences max)
-                    'top_k': 10,               # Faster sampling
-                    'top_p': 0.9,              # High = faster decisions
-                    'num_ctx': 1024,           # Smaller context window = faster
-                }
-            },
-            timeout=OLLAMA_TIMEOUT
-        )
+        logger.info("ollama_chat_success model=%s response_length=%d", 
+                   model, len(assistant_message))
         
-        if response.status_code == 200:
-            data = response.json()
-            assistant_message = data.get('message', {}).get('content', '')
-            
-            logger.info("ollama_chat_success model=%s response_length=%d", 
-                       model, len(assistant_message))
-            
-            return {
-                'success': True,
-                'response': assistant_message,
-                'model': model,
-                'total_duration': data.get('total_duration'),
-                'eval_count': data.get('eval_count')
-            }
-        else:
-            error_msg = f"Ollama returned status {response.status_code}"
-            try:
-                error_data = response.json()
-                error_msg = error_data.get('error', error_msg)
-            except:
-                pass
-            
-            logger.warning("ollama_chat_failed status=%d error=%s", 
-                          response.status_code, error_msg)
-            
-            return {
-                'success': False,
-                'error': error_msg
-            }
+        return {
+            'success': True,
+            'response': assistant_message,
+            'model': model,
+            'total_duration': final.get('total_duration'),
+            'eval_count': final.get('eval_count')
+        }
             
+    except OllamaError as e:
+        result = {
+            'success': False,
+            'error': str(e)
+        }
+        if e.needs_connection:
+            result['needs_connection'] = True
+        return result
     except requests.exceptions.Timeout:
         logger.warning("ollama_chat_timeout model=%s", model)
+        _invalidate_availability()
         return {
             'success': False,
             'error': 'Request timed out. The AI is taking too long to respond.',
@@ -229,6 +539,7 @@ def chat_with_ollama(
         }
     except requests.exceptions.ConnectionError:
         logger.warning("ollama_connection_failed")
+        _invalidate_availability()
         return {
             'success': False,
             'error': 'Cannot connect to AI server.',
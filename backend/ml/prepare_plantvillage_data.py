@@ -22,6 +22,8 @@ import sys
 import json
 import zipfile
 import requests
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tqdm import tqdm
 import shutil
@@ -32,6 +34,17 @@ PLANTVILLAGE_KAGGLE_DATASET = "emmarex/plantdisease"
 PLANTVILLAGE_URL = "https://www.kaggle.com/datasets/emmarex/plantdisease/download"
 DATA_DIR = Path(__file__).parent.parent.parent / "plantvillage_dataset"
 PROCESSED_DIR = Path(__file__).parent / "models" / "plantvillage_processed"
+IMAGE_EXTENSIONS = frozenset(('.jpg', '.jpeg', '.png'))
+NUM_WORKERS = min(multiprocessing.cpu_count(), 16)
+
+
+def count_images(folder):
+    """Number of image files directly inside folder, from a single directory scan."""
+    with os.scandir(folder) as entries:
+        return sum(
+            1 for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file()
+        )
 
 
 def download_from_kaggle():
@@ -147,16 +160,13 @@ def analyze_dataset_structure():
     classes = {}
     total_images = 0
     
-    for class_folder in sorted(dataset_root.iterdir()):
-        if not class_folder.is_dir():
-            continue
-        
-        image_files = list(class_folder.glob("*.jpg")) + \
-                     list(class_folder.glob("*.jpeg")) + \
-                     list(class_folder.glob("*.png")) + \
-                     list(class_folder.glob("*.JPG"))
-        
-        num_images = len(image_files)
+    class_folders = [folder for folder in sorted(dataset_root.iterdir()) if folder.is_dir()]
+    
+    # Scan the class folders concurrently (directory listing is I/O bound)
+    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
+        folder_counts = list(executor.map(count_images, class_folders))
+    
+    for class_folder, num_images in zip(class_folders, folder_counts):
         if num_images > 0:
             classes[class_folder.name] = num_images
             total_images += num_images
@@ -168,8 +178,8 @@ def analyze_dataset_structure():
     
     sorted_classes = sorted(classes.items(), key=lambda x: x[1], reverse=True)
     for i, (class_name, count) in enumerate(sorted_classes[:15], 1):
-        crop = class_name.split('___')[0] if '___' in class_name else class_name
-        disease = class_name.split('___')[1] if '___' in class_name else 'N/A'
+        crop, sep, disease = class_name.partition('___')
+        disease = disease.split('___')[0] if sep else 'N/A'
         print(f"   {i:2d}. {crop:20s} | {disease:30s} | {count:5,} images")
     
     if len(sorted_classes) > 15:
@@ -279,13 +289,39 @@ def map_plantvillage_to_npk():
     return mapping
 
 
-def create_symlink_dataset():
+def link_image(img_file, target_path):
+    """
+    Point target_path at img_file without copying bytes where possible:
+    a hardlink, else a symlink, else a plain byte copy (no metadata).
+    """
+    if target_path.exists():
+        return
+    # A hardlink on the same volume is one directory entry, needs no admin
+    # rights on Windows (NTFS) and keeps working if the source tree moves
+    try:
+        os.link(img_file, target_path)
+        return
+    except OSError:
+        pass
+    # Different volume: a symlink still avoids the copy (Windows needs
+    # admin or developer mode for these, otherwise this fails too)
+    try:
+        os.symlink(img_file, target_path)
+        return
+    except OSError:
+        pass
+    # Fallback to copy (links not supported)
+    if not target_path.exists():
+        shutil.copyfile(img_file, target_path)
+
+
+def create_linked_dataset():
     """
-    Create a reorganized dataset using symlinks for efficient training.
+    Create a reorganized dataset using hardlinks (or symlinks) for efficient training.
     This avoids duplicating ~2 GB of images.
     """
     print("\n" + "=" * 70)
-    print("🔗 CREATING SYMLINKED DATASET STRUCTURE")
+    print("🔗 CREATING LINKED DATASET STRUCTURE")
     print("=" * 70)
     
     # Load metadata and mapping
@@ -303,47 +339,41 @@ def create_symlink_dataset():
         mapping = json.load(f)
     
     dataset_root = Path(metadata['dataset_root'])
-    symlink_root = PROCESSED_DIR / "symlinked_dataset"
+    # Directory name kept: train_npk_model_transfer.py reads from it
+    link_root = PROCESSED_DIR / "symlinked_dataset"
     
-    # Create symlinked structure
-    print(f"\n📁 Creating symlinks in: {symlink_root}")
+    # Create linked structure
+    print(f"\n📁 Linking images into: {link_root}")
     
     for category, class_list in mapping.items():
-        category_dir = symlink_root / category
+        category_dir = link_root / category
         category_dir.mkdir(parents=True, exist_ok=True)
         
+        sources = []
+        targets = []
         for class_name in class_list:
             source_dir = dataset_root / class_name
             
             if not source_dir.exists():
                 continue
             
-            # Create symlinks for all images
+            # Link all images
             for img_file in source_dir.glob("*.jpg"):
-                target_name = f"{class_name}___{img_file.name}"
-                target_path = category_dir / target_name
-                
-                # Create symlink
-                try:
-                    if not target_path.exists():
-                        if os.name == 'nt':  # Windows
-                            # Windows requires admin for symlinks, use copy instead
-                            shutil.copy2(img_file, target_path)
-                        else:  # Linux/Mac
-                            os.symlink(img_file, target_path)
-                except Exception as e:
-                    # Fallback to copy if symlink fails
-                    if not target_path.exists():
-                        shutil.copy2(img_file, target_path)
+                sources.append(img_file)
+                targets.append(category_dir / f"{class_name}___{img_file.name}")
+        
+        # File creation is I/O bound; list() re-raises the first worker error
+        with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
+            list(executor.map(link_image, sources, targets))
     
     print("\n✅ Dataset reorganization complete!")
     print(f"\n📊 New structure:")
-    for category_dir in symlink_root.iterdir():
+    for category_dir in link_root.iterdir():
         if category_dir.is_dir():
-            count = len(list(category_dir.glob("*.jpg")))
+            count = count_images(category_dir)
             print(f"   • {category_dir.name:20s}: {count:6,} images")
     
-    return symlink_root
+    return link_root
 
 
 def main():
@@ -369,25 +399,30 @@ def main():
         help='Map PlantVillage classes to NPK categories'
     )
     parser.add_argument(
-        '--create-symlinks',
+        '--create-links', '--create-symlinks',
+        dest='create_links',
         action='store_true',
-        help='Create reorganized dataset with symlinks'
+        help='Create reorganized dataset with hardlinks '
+             '(--create-symlinks is a deprecated alias)'
     )
     parser.add_argument(
         '--all',
         action='store_true',
-        help='Run all steps (download, analyze, map, create symlinks)'
+        help='Run all steps (download, analyze, map, create links)'
     )
     
     args = parser.parse_args()
     
+    if '--create-symlinks' in sys.argv[1:]:
+        print("⚠️  --create-symlinks is deprecated, use --create-links")
+    
     if args.all:
         args.download = True
         args.analyze = True
         args.map = True
-        args.create_symlinks = True
+        args.create_links = True
     
-    if not any([args.download, args.analyze, args.map, args.create_symlinks]):
+    if not any([args.download, args.analyze, args.map, args.create_links]):
         parser.print_help()
         return
     
@@ -400,8 +435,8 @@ def main():
     if args.map:
         map_plantvillage_to_npk()
     
-    if args.create_symlinks:
-        create_symlink_dataset()
+    if args.create_links:
+        create_linked_dataset()
     
     print("\n" + "=" * 70)
     print("✅ PLANTVILLAGE PREPARATION COMPLETE!")
@@ -9,12 +9,26 @@ Skipping: Tomato, Ridgegourd, Cucumber (insufficient/imbalanced data)
 """
 
 import os
-import shutil
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from sklearn.model_selection import train_test_split
 import json
 from collections import defaultdict
 
+# Buffer for the portable copy path (shutil's default is 64 KiB)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+IMAGE_EXTENSIONS = frozenset(('.jpg', '.jpeg', '.png'))
+
+# Hard-link images into the output instead of copying them (--copy turns this off).
+# A hard link IS the source file: editing, cleaning or overwriting an image in
+# the unified dataset in place changes the original dataset too.
+USE_HARDLINKS = True
+
+# Linking/copying is syscall-bound and releases the GIL, so threads overlap it
+NUM_WORKERS = min(multiprocessing.cpu_count(), 16)
+
 # Dataset configuration
 CROPS_CONFIG = {
     'banana': {
@@ -162,7 +176,121 @@ def get_class_name(crop_name, original_class, config):
     return f"{config['prefix']}{class_name}"
 
 
-def create_splits(source_path, output_path, classes, prefix, rename_map, val_split=0.2):
+def list_images(class_path):
+    """
+    List the images in one class folder, sorted by name.
+
+    os.scandir hands back names and file types from the directory read itself,
+    so unlike globbing once per extension case this needs one pass, no stat per
+    entry, and never returns a file twice on case-insensitive filesystems.
+    """
+    images = []
+    with os.scandir(class_path) as entries:
+        for entry in entries:
+            if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                images.append(Path(entry.path))
+    images.sort(key=lambda p: p.name)
+    return images
+
+
+def _copy_fd(src_fd, dst_fd, size):
+    """Copy size bytes between descriptors, in the kernel when the OS allows it."""
+    if hasattr(os, 'copy_file_range'):
+        try:
+            copied = 0
+            while copied < size:
+                n = os.copy_file_range(src_fd, dst_fd, size - copied)
+                if n == 0:
+                    break
+                copied += n
+            return
+        except OSError:
+            # Older kernels refuse cross-filesystem copies; start over below
+            os.lseek(src_fd, 0, os.SEEK_SET)
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+            os.ftruncate(dst_fd, 0)
+
+    if hasattr(os, 'sendfile'):
+        try:
+            copied = 0
+            while copied < size:
+                n = os.sendfile(dst_fd, src_fd, copied, size - copied)
+                if n == 0:
+                    break
+                copied += n
+            return
+        except OSError:
+            # macOS only sends to sockets
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+            os.ftruncate(dst_fd, 0)
+
+    while True:
+        chunk = os.read(src_fd, COPY_BUFFER_SIZE)
+        if not chunk:
+            break
+        os.write(dst_fd, chunk)
+
+
+def copy_image(src, dest):
+    """
+    Copy a single image file, keeping its timestamps.
+
+    Unlike shutil.copy2 this skips the 64 KiB read/write loop and the chmod:
+    copy_file_range/sendfile let the kernel move the bytes (or clone them on
+    CoW filesystems), with a 1 MiB buffered copy as the portable fallback.
+    """
+    binary = getattr(os, 'O_BINARY', 0)
+    src_fd = os.open(src, os.O_RDONLY | binary)
+    try:
+        st = os.fstat(src_fd)
+        dst_fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | binary, 0o644)
+        try:
+            _copy_fd(src_fd, dst_fd, st.st_size)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    os.utime(dest, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def place_image(src, dest):
+    """
+    Put an image into the unified dataset, hard-linking it when USE_HARDLINKS is set.
+
+    Training only reads these files, so a link costs one directory entry
+    instead of a copy of the image. Linked files share their data with the
+    source, so in-place edits to the unified dataset propagate to it.
+    Falls back to copy_image when the output is on another filesystem or the
+    filesystem has no hard links.
+    """
+    try:
+        os.unlink(dest)
+    except FileNotFoundError:
+        pass
+    if USE_HARDLINKS:
+        try:
+            os.link(src, dest)
+            return
+        except OSError:
+            pass
+    copy_image(src, dest)
+
+
+def add_images(images, dest_dir, class_name, split, index=None):
+    """
+    Place images under dest_dir, or with an index (split -> list of
+    (path, class) pairs) only record where they already are.
+    """
+    if index is not None:
+        index[split].extend((str(img), class_name) for img in images)
+        return
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
+        # list() re-raises the first worker error
+        list(executor.map(place_image, images, [dest_dir / img.name for img in images]))
+
+
+def create_splits(source_path, output_path, classes, prefix, rename_map, val_split=0.2, index=None):
     """
     Create train/val splits for crops without existing splits
     """
@@ -175,9 +303,7 @@ def create_splits(source_path, output_path, classes, prefix, rename_map, val_spl
             continue
         
         # Get all images
-        images = []
-        for ext in ['*.jpg', '*.jpeg', '*.png', '*.JPG', '*.JPEG', '*.PNG']:
-            images.extend(list(class_path.glob(ext)))
+        images = list_images(class_path)
         
         if len(images) == 0:
             print(f"  ⚠️  No images found in {original_class}, skipping")
@@ -193,15 +319,8 @@ def create_splits(source_path, output_path, classes, prefix, rename_map, val_spl
         final_class_name = f"{prefix}{class_name}"
         
         # Copy to output structure
-        train_out = output_path / 'train' / final_class_name
-        val_out = output_path / 'val' / final_class_name
-        train_out.mkdir(parents=True, exist_ok=True)
-        val_out.mkdir(parents=True, exist_ok=True)
-        
-        for img in train_imgs:
-            shutil.copy2(img, train_out / img.name)
-        for img in val_imgs:
-            shutil.copy2(img, val_out / img.name)
+        add_images(train_imgs, output_path / 'train' / final_class_name, final_class_name, 'train', index)
+        add_images(val_imgs, output_path / 'val' / final_class_name, final_class_name, 'val', index)
         
         stats[final_class_name]['train'] = len(train_imgs)
         stats[final_class_name]['val'] = len(val_imgs)
@@ -211,7 +330,7 @@ def create_splits(source_path, output_path, classes, prefix, rename_map, val_spl
     return stats
 
 
-def copy_existing_splits(source_path, output_path, classes, prefix, rename_map):
+def copy_existing_splits(source_path, output_path, classes, prefix, rename_map, index=None):
     """
     Copy crops that already have train/val/test splits with renaming
     """
@@ -231,27 +350,42 @@ def copy_existing_splits(source_path, output_path, classes, prefix, rename_map):
             class_name = rename_map.get(original_class, original_class)
             final_class_name = f"{prefix}{class_name}"
             
-            # Copy to output
-            dest_class_path = output_path / split / final_class_name
-            dest_class_path.mkdir(parents=True, exist_ok=True)
+            # Copy all images to output
+            images = list_images(src_class_path)
+            add_images(images, output_path / split / final_class_name, final_class_name, split, index)
             
-            # Copy all images
-            count = 0
-            for ext in ['*.jpg', '*.jpeg', '*.png', '*.JPG', '*.JPEG', '*.PNG']:
-                for img in src_class_path.glob(ext):
-                    shutil.copy2(img, dest_class_path / img.name)
-                    count += 1
-            
-            stats[final_class_name][split] = count
+            stats[final_class_name][split] = len(images)
         
         print(f"  ✅ Copied {split} split")
     
     return stats
 
 
-def prepare_dataset(base_path, output_path, val_split=0.2):
+def load_split_index(dataset_path, split):
+    """
+    Read one split of an index-only dataset.
+    
+    Returns:
+        (paths, labels): image paths and class indices into labels.txt, ready
+        for tf.data.Dataset.from_tensor_slices
+    """
+    dataset_path = Path(dataset_path)
+    with open(dataset_path / 'labels.txt') as f:
+        class_to_idx = {name.strip(): i for i, name in enumerate(f) if name.strip()}
+    with open(dataset_path / 'index.json') as f:
+        entries = json.load(f).get(split, [])
+    paths = [path for path, _ in entries]
+    labels = [class_to_idx[class_name] for _, class_name in entries]
+    return paths, labels
+
+
+def prepare_dataset(base_path, output_path, val_split=0.2, index_only=False):
     """
     Prepare unified dataset with train/val splits
+    
+    With index_only, no images are placed under output_path; index.json
+    records each split's (source path, class) pairs instead (see
+    load_split_index).
     """
     base_path = Path(base_path)
     output_path = Path(output_path)
@@ -263,7 +397,12 @@ def prepare_dataset(base_path, output_path, val_split=0.2):
     # Create output directory
     output_path.mkdir(parents=True, exist_ok=True)
     
+    if USE_HARDLINKS and not index_only:
+        print("ℹ️  Images are hard-linked: editing them in the unified dataset also edits")
+        print("   the source datasets. Run with --copy for an independent copy.\n")
+    
     all_stats = {}
+    index = defaultdict(list) if index_only else None
     total_images = {'train': 0, 'val': 0, 'test': 0}
     
     for crop_name, config in CROPS_CONFIG.items():
@@ -284,7 +423,8 @@ def prepare_dataset(base_path, output_path, val_split=0.2):
                 output_path,
                 config['classes'],
                 config['prefix'],
-                config.get('rename_classes', {})
+                config.get('rename_classes', {}),
+                index=index
             )
         else:
             # Create train/val splits from direct class folders
@@ -294,7 +434,8 @@ def prepare_dataset(base_path, output_path, val_split=0.2):
                 config['classes'],
                 config['prefix'],
                 config.get('rename_classes', {}),
-                val_split
+                val_split,
+                index=index
             )
         
         all_stats[crop_name] = stats
@@ -347,6 +488,12 @@ def prepare_dataset(base_path, output_path, val_split=0.2):
     
     print(f"✅ Class labels saved to: {labels_file}")
     
+    if index is not None:
+        index_file = output_path / 'index.json'
+        with open(index_file, 'w') as f:
+            json.dump(index, f)
+        print(f"✅ Image index saved to: {index_file} (images left in place)")
+    
     print(f"\n📁 Dataset ready at: {output_path}")
     print("\n🚀 Next step: Run training script (train_unified_v2.py)")
     
@@ -354,18 +501,26 @@ def prepare_dataset(base_path, output_path, val_split=0.2):
 if __name__ == '__main__':
     import sys
     
-    if len(sys.argv) > 1:
-        base_path = sys.argv[1]
+    # --index-only writes index.json instead of linking/copying the images
+    index_only = '--index-only' in sys.argv
+    # --copy writes independent copies, safe to edit without touching the sources
+    if '--copy' in sys.argv:
+        USE_HARDLINKS = False
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    
+    if len(args) > 0:
+        base_path = args[0]
     else:
         base_path = 'B:/FasalVaidya'
     
-    if len(sys.argv) > 2:
-        output_path = sys.argv[2]
+    if len(args) > 1:
+        output_path = args[1]
     else:
         output_path = 'B:/FasalVaidya/backend/ml/unified_v2_dataset'
     
     prepare_dataset(
         base_path=base_path,
         output_path=output_path,
-        val_split=0.2
+        val_split=0.2,
+        index_only=index_only
     )
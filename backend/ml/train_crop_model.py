@@ -25,6 +25,7 @@ Usage:
 import os
 import sys
 import json
+import hashlib
 import argparse
 import numpy as np
 from pathlib import Path
@@ -33,6 +34,7 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import multiprocessing
 from tqdm import tqdm
 import random
+from collections import Counter
 
 # TensorFlow setup
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
@@ -40,21 +42,29 @@ import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau, LearningRateScheduler
-from sklearn.model_selection import train_test_split
-from sklearn.utils.class_weight import compute_sample_weight
 from PIL import Image, ImageEnhance, ImageFilter
 
 # Threading config
 NUM_WORKERS = min(multiprocessing.cpu_count(), 16)
 
+def gpu_precision_policy(gpus):
+    """bfloat16 on Ampere and newer (float32 range, no loss scaling), float16 on older GPUs."""
+    for gpu in gpus:
+        capability = tf.config.experimental.get_device_details(gpu).get('compute_capability')
+        if not capability or capability < (8, 0):
+            return 'mixed_float16'
+    return 'mixed_bfloat16'
+
+
 # Mixed precision only on GPU
 try:
     gpus = tf.config.list_physical_devices('GPU')
     if gpus:
         for gpu in gpus:
             tf.config.experimental.set_memory_growth(gpu, True)
-        tf.keras.mixed_precision.set_global_policy('mixed_float16')
-        print(f"⚡ Mixed precision enabled ({len(gpus)} GPU(s))")
+        policy = gpu_precision_policy(gpus)
+        tf.keras.mixed_precision.set_global_policy(policy)
+        print(f"⚡ Mixed precision enabled: {policy} ({len(gpus)} GPU(s))")
     else:
         tf.keras.mixed_precision.set_global_policy('float32')
         print("ℹ️ CPU mode: using float32")
@@ -70,6 +80,9 @@ np.random.seed(SEED)
 tf.random.set_seed(SEED)
 random.seed(SEED)
 
+# Image files picked up from the crop class folders (case-insensitive)
+IMAGE_EXTENSIONS = frozenset(('.jpg', '.jpeg', '.png'))
+
 # Memory management - limit samples for large datasets
 MAX_SAMPLES_PER_CLASS = 2000  # Prevent memory overflow
 MAX_TOTAL_SAMPLES = 8000      # Absolute max
@@ -631,7 +644,10 @@ CROP_TRAINING_OVERRIDES = {
 def load_and_preprocess_image(image_path, target_size=(224, 224), augment=False):
     """Load and preprocess a single image with optional augmentation."""
     try:
-        img = Image.open(image_path).convert('RGB')
+        img = Image.open(image_path)
+        # Let the JPEG decoder downscale by 1/2-1/8 while decoding (no-op for PNG)
+        img.draft('RGB', target_size)
+        img = img.convert('RGB')
         img = img.resize(target_size, Image.LANCZOS)
         img_array = np.array(img, dtype=np.float32) / 255.0
         
@@ -673,20 +689,119 @@ def apply_crop_overrides(crop_id: str, base_config: dict) -> dict:
     return cfg
 
 
-def create_augmented_samples(images, labels, augment_factor=2):
-    """Create additional augmented samples for training."""
-    augmented_images = []
-    augmented_labels = []
+def stratified_split(strat_key, val_fraction, test_fraction, seed=SEED):
+    """
+    Split sample indices into train/val/test in one pass, stratified by strat_key.
+
+    Every class is shuffled and cut in the same proportions, so val and test
+    both keep the label mix (a class with a single sample goes to train).
+    Returning indices lets the caller copy each image array exactly once.
+    """
+    rng = np.random.default_rng(seed)
+    order = np.argsort(strat_key, kind='stable')
+    _, starts = np.unique(strat_key[order], return_index=True)
     
-    print(f"🔄 Creating {augment_factor}x augmented samples...")
+    train_idx, val_idx, test_idx = [], [], []
+    for members in np.split(order, starts[1:]):
+        rng.shuffle(members)
+        n_test = int(round(len(members) * test_fraction))
+        n_val = int(round(len(members) * val_fraction))
+        test_idx.append(members[:n_test])
+        val_idx.append(members[n_test:n_test + n_val])
+        train_idx.append(members[n_test + n_val:])
+    
+    train_idx = np.concatenate(train_idx)
+    rng.shuffle(train_idx)
+    return train_idx, np.concatenate(val_idx), np.concatenate(test_idx)
+
+
+def decode_images(image_tasks, target_size):
+    """Load (path, label, folder) tasks in parallel; returns (images, labels, class_info).
+    
+    Workers write straight into one preallocated array in task order, so the
+    decoded images are never held twice (a list of arrays plus the stacked copy).
+    """
+    width, height = target_size
+    images = np.empty((len(image_tasks), height, width, 3), dtype=np.float32)
+    loaded = np.zeros(len(image_tasks), dtype=bool)
     
-    for _ in range(augment_factor):
-        for img, lbl in zip(images, labels):
-            aug_img = advanced_augment_image(img)
-            augmented_images.append(aug_img)
-            augmented_labels.append(lbl)
+    def load_into(i, img_path):
+        result = load_and_preprocess_image(img_path, target_size)
+        if result is not None:
+            images[i] = result
+            loaded[i] = True
     
-    return np.array(augmented_images), np.array(augmented_labels)
+    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
+        futures = [
+            executor.submit(load_into, i, img_path)
+            for i, (img_path, _label, _folder) in enumerate(image_tasks)
+        ]
+        # Advance the bar in steps of 128 rather than re-rendering per image
+        with tqdm(total=len(futures), desc="📷 Loading", unit="img", colour='green') as pbar:
+            for done, future in enumerate(as_completed(futures), 1):
+                future.result()
+                if done % 128 == 0:
+                    pbar.update(128)
+            pbar.update(len(futures) % 128)
+    
+    labels = np.array([label for _path, label, _folder in image_tasks])
+    class_info = [{'folder': folder} for (_path, _label, folder), ok in zip(image_tasks, loaded) if ok]
+    if not loaded.all():
+        # Drop failed decodes (one compacting copy, only when something failed)
+        images, labels = images[loaded], labels[loaded]
+    return images, labels, class_info
+
+
+def dataset_cache_path(crop_id, image_tasks, target_size):
+    """
+    Cache file for one decoded sample of a crop dataset.
+    
+    The key covers the image size and every sampled file's path, size and
+    mtime, so adding, removing or editing an image starts a fresh cache.
+    """
+    digest = hashlib.sha1(repr(tuple(target_size)).encode())
+    for img_path, label, folder in image_tasks:
+        st = os.stat(img_path)
+        digest.update(f"{img_path}|{st.st_size}|{st.st_mtime_ns}|{label}|{folder}\n".encode())
+    return MODEL_ROOT / crop_id / 'dataset_cache' / f"{digest.hexdigest()[:16]}.npz"
+
+
+def save_dataset_cache(cache_path, images, labels, class_info, chunk=256):
+    """Store decoded images as uint8 (exact, since they were loaded as uint8 / 255)."""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    images_u8 = np.empty(images.shape, dtype=np.uint8)
+    for start in range(0, len(images), chunk):
+        np.rint(images[start:start + chunk] * 255.0, out=images_u8[start:start + chunk], casting='unsafe')
+    
+    tmp_path = cache_path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, images=images_u8, labels=labels,
+                 folders=np.array([info['folder'] for info in class_info]))
+    os.replace(tmp_path, cache_path)
+    
+    # Caches run to gigabytes; keep only the newest one per crop
+    for stale in cache_path.parent.glob('*.npz'):
+        if stale != cache_path:
+            stale.unlink()
+
+
+def load_dataset_cache(cache_path):
+    """Inverse of save_dataset_cache: (float32 images in [0, 1], labels, class_info)."""
+    with np.load(cache_path) as cached:
+        images = np.divide(cached['images'], 255.0, dtype=np.float32)
+        labels = cached['labels']
+        class_info = [{'folder': str(folder)} for folder in cached['folders']]
+    return images, labels, class_info
+
+
+def list_folder_images(folder_path):
+    """Image files directly inside folder_path, from a single directory scan, sorted by name."""
+    with os.scandir(folder_path) as entries:
+        paths = [
+            Path(entry.path) for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file()
+        ]
+    return sorted(paths)
 
 
 def load_crop_dataset(crop_id, config=None):
@@ -721,12 +836,7 @@ def load_crop_dataset(crop_id, config=None):
         
         # Include all 4 nutrient outputs: N, P, K, Mg
         label = [labels.get('N', 0), labels.get('P', 0), labels.get('K', 0), labels.get('Mg', 0)]
-        folder_images = []
-        
-        extensions = ('*.jpg', '*.jpeg', '*.png', '*.JPG', '*.JPEG', '*.PNG')
-        for ext in extensions:
-            for img_path in folder_path.glob(ext):
-                folder_images.append((img_path, label, folder_name))
+        folder_images = [(img_path, label, folder_name) for img_path in list_folder_images(folder_path)]
         
         if folder_images:
             class_images[folder_name] = folder_images
@@ -742,57 +852,52 @@ def load_crop_dataset(crop_id, config=None):
     if total_available > MAX_TOTAL_SAMPLES:
         print(f"\n⚠️ Large dataset ({total_available} images). Sampling {MAX_TOTAL_SAMPLES} to fit in memory...")
         
+        # Sampled indices come from one vectorized draw each instead of
+        # shuffling the full task lists in Python
+        rng = np.random.default_rng(SEED)
+        
         # Sample proportionally but with caps per class
         for folder_name, folder_images in class_images.items():
-            # Shuffle for random sampling
-            random.shuffle(folder_images)
-            
-            # Take up to MAX_SAMPLES_PER_CLASS per folder
+            # Take up to MAX_SAMPLES_PER_CLASS per folder, in random order
             sample_size = min(len(folder_images), MAX_SAMPLES_PER_CLASS)
-            image_tasks.extend(folder_images[:sample_size])
+            picks = rng.choice(len(folder_images), size=sample_size, replace=False)
+            image_tasks.extend(folder_images[i] for i in picks)
         
         # If still too many, random sample to MAX_TOTAL_SAMPLES
         if len(image_tasks) > MAX_TOTAL_SAMPLES:
-            random.shuffle(image_tasks)
-            image_tasks = image_tasks[:MAX_TOTAL_SAMPLES]
+            picks = rng.choice(len(image_tasks), size=MAX_TOTAL_SAMPLES, replace=False)
+            image_tasks = [image_tasks[i] for i in picks]
         
         print(f"  📊 Sampled {len(image_tasks)} images from {total_available} available")
     else:
         for folder_images in class_images.values():
             image_tasks.extend(folder_images)
     
-    print(f"\n🔄 Loading {len(image_tasks)} images...")
+    target_size = (config or DEFAULT_CONFIG).get('image_size', (224, 224))
     
-    images, labels, class_info = [], [], []
-    folder_counts = {}
+    cache_path = None
+    if (config or {}).get('cache_dataset'):
+        cache_path = dataset_cache_path(crop_id, image_tasks, target_size)
     
-    target_size = (config or DEFAULT_CONFIG).get('image_size', (224, 224))
+    if cache_path is not None and cache_path.exists():
+        print(f"\n💾 Loading {len(image_tasks)} decoded images from cache: {cache_path}")
+        images, labels, class_info = load_dataset_cache(cache_path)
+    else:
+        print(f"\n🔄 Loading {len(image_tasks)} images...")
+        images, labels, class_info = decode_images(image_tasks, target_size)
+        if cache_path is not None:
+            save_dataset_cache(cache_path, images, labels, class_info)
+            print(f"💾 Cached decoded images: {cache_path}")
     
-    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
-        futures = {}
-        for img_path, label, folder in image_tasks:
-            future = executor.submit(load_and_preprocess_image, img_path, target_size)
-            futures[future] = (label, folder)
-        
-        with tqdm(total=len(futures), desc="📷 Loading", unit="img", colour='green') as pbar:
-            for future in as_completed(futures):
-                result = future.result()
-                label, folder = futures[future]
-                if result is not None:
-                    images.append(result)
-                    labels.append(label)
-                    class_info.append({'folder': folder})
-                    folder_counts[folder] = folder_counts.get(folder, 0) + 1
-                pbar.update(1)
+    folder_counts = Counter(info['folder'] for info in class_info)
     
     print("\n📊 Final Dataset Summary:")
     print("-" * 40)
-    for folder, count in sorted(folder_counts.items()):
-        print(f"  {folder}: {count} images")
+    print("\n".join(f"  {folder}: {count} images" for folder, count in sorted(folder_counts.items())))
     print(f"  TOTAL: {len(images)} images")
     print("-" * 40)
     
-    return np.array(images), np.array(labels), class_info, crop_cfg
+    return images, labels, class_info, crop_cfg
 
 
 # ============================================
@@ -826,31 +931,43 @@ class SqueezeExcite(layers.Layer):
         return config
 
 
+def create_augmentation():
+    """Strong data augmentation pipeline (operates on 0-255 range images).
+    
+    Applied to training batches in tf.data rather than inside the model: the
+    image transform layers have no XLA kernels, and keeping them out of the
+    model lets the train step be XLA-compiled. Kept in float32 under mixed
+    precision so MixUp can blend the batches afterwards.
+    """
+    return keras.Sequential([
+        layers.RandomFlip("horizontal_and_vertical", dtype='float32'),
+        layers.RandomRotation(0.3, fill_mode='reflect', dtype='float32'),
+        layers.RandomZoom((-0.2, 0.2), fill_mode='reflect', dtype='float32'),
+        layers.RandomTranslation(0.1, 0.1, fill_mode='reflect', dtype='float32'),
+        layers.RandomBrightness(0.3, dtype='float32'),
+        layers.RandomContrast(0.3, dtype='float32'),
+    ], name='augmentation')
+
+
 def create_model(input_shape=(224, 224, 3), num_outputs=3, *, backbone: str = 'efficientnetb0', dropout_rate=0.5):
     """Create optimized NPK model with deeper classification head.
     
     NOTE: This model expects input in [0, 255] range. The ImageNetPreprocessing layer
     handles normalization internally and is properly serialized with the model.
+    Training augmentation lives in the input pipeline (see create_augmentation).
     """
     base_model, preprocess_mode, canonical = resolve_backbone(backbone, input_shape)
     base_model.trainable = False
     
     inputs = keras.Input(shape=input_shape)
     
-    # Strong data augmentation pipeline (operates on 0-255 range images)
-    x = layers.RandomFlip("horizontal_and_vertical")(inputs)
-    x = layers.RandomRotation(0.3, fill_mode='reflect')(x)
-    x = layers.RandomZoom((-0.2, 0.2), fill_mode='reflect')(x)
-    x = layers.RandomTranslation(0.1, 0.1, fill_mode='reflect')(x)
-    x = layers.RandomBrightness(0.3)(x)
-    x = layers.RandomContrast(0.3)(x)
-    
     # Preprocessing for backbone - using our SERIALIZABLE custom layer
     # This ensures preprocessing is saved with the model and works during inference
-    x = ImageNetPreprocessing(mode=preprocess_mode, name='imagenet_preprocessing')(x)
+    x = ImageNetPreprocessing(mode=preprocess_mode, name='imagenet_preprocessing')(inputs)
     
-    # Feature extraction
+    # Feature extraction (named so the head can be trained on cached features)
     features = base_model(x, training=False)
+    features = layers.Identity(name='backbone_features')(features)
     
     # Deep classification head with residual connections
     # Block 1
@@ -895,18 +1012,38 @@ def create_model(input_shape=(224, 224, 3), num_outputs=3, *, backbone: str = 'e
     return model, base_model
 
 
-def compile_model(model, learning_rate=0.0001, use_focal_loss=True, label_smoothing=0.1, focal_gamma=2.0):
-    """Compile model with categorical cross-entropy for multi-class classification."""
+def create_optimizer(learning_rate=0.0001):
+    """AdamW with decoupled weight decay and gradient clipping."""
+    return keras.optimizers.AdamW(
+        learning_rate=learning_rate,
+        weight_decay=1e-5,
+        clipnorm=1.0
+    )
+
+
+def compile_model(model, learning_rate=0.0001, use_focal_loss=True, label_smoothing=0.1, focal_gamma=2.0,
+                  jit_compile=True, optimizer=None):
+    """Compile model with categorical cross-entropy for multi-class classification.
+    
+    jit_compile=True XLA-compiles the train step, fusing the classification head
+    (and much of the backbone) into a few kernels. Keras falls back to a plain
+    graph with a warning if the model contains a layer XLA cannot compile.
+    
+    Pass an existing optimizer to recompile (e.g. for a new training phase)
+    without allocating fresh optimizer state; its learning rate is reset to
+    learning_rate.
+    """
     # Use categorical cross-entropy since this is a MULTI-CLASS problem (each image has exactly one deficiency)
     # NOT a multi-label problem (where images could have multiple deficiencies)
     loss = keras.losses.CategoricalCrossentropy(label_smoothing=label_smoothing)
     
+    if optimizer is None:
+        optimizer = create_optimizer(learning_rate)
+    else:
+        optimizer.learning_rate.assign(learning_rate)
+    
     model.compile(
-        optimizer=keras.optimizers.AdamW(
-            learning_rate=learning_rate,
-            weight_decay=1e-5,
-            clipnorm=1.0
-        ),
+        optimizer=optimizer,
         loss=loss,
         metrics=[
             'accuracy',
@@ -914,7 +1051,8 @@ def compile_model(model, learning_rate=0.0001, use_focal_loss=True, label_smooth
             keras.metrics.Recall(name='recall', class_id=None),
             keras.metrics.AUC(name='auc', multi_label=False),
             keras.metrics.F1Score(name='f1', average='macro'),
-        ]
+        ],
+        jit_compile=jit_compile
     )
     return model
 
@@ -971,40 +1109,61 @@ class WarmupCosineDecay(keras.callbacks.Callback):
 def compute_class_weights(labels):
     """Compute sample weights for imbalanced multi-label data."""
     # For multi-label, compute weights based on positive sample frequency
+    labels = np.asarray(labels, dtype=np.float64)
     n_samples = len(labels)
-    n_classes = labels.shape[1]
     
-    weights = np.ones(n_samples)
+    pos_count = labels.sum(axis=0)
+    neg_count = n_samples - pos_count
+    # Only outputs with both positives and negatives contribute
+    usable = (pos_count > 0) & (neg_count > 0)
     
-    for i in range(n_classes):
-        pos_count = labels[:, i].sum()
-        neg_count = n_samples - pos_count
-        
-        if pos_count > 0 and neg_count > 0:
-            # Weight rare class higher
-            pos_weight = n_samples / (2 * pos_count)
-            neg_weight = n_samples / (2 * neg_count)
-            
-            weights += labels[:, i] * pos_weight + (1 - labels[:, i]) * neg_weight
+    # Weight rare class higher
+    pos_weight = n_samples / (2 * pos_count[usable])
+    neg_weight = n_samples / (2 * neg_count[usable])
+    
+    # Per-class terms summed in one matrix product per polarity
+    usable_labels = labels[:, usable]
+    weights = 1.0 + usable_labels @ pos_weight + (1 - usable_labels) @ neg_weight
     
     # Normalize
     weights = weights / weights.mean()
     return weights
 
 
-def test_time_augmentation(model, images, num_augmentations=5):
-    """Apply test-time augmentation for better predictions."""
+def test_time_augmentation(model, images, num_augmentations=5, batch_size=32, return_original=False):
+    """Apply test-time augmentation for better predictions.
+    
+    With return_original=True the un-augmented round is returned as well, so
+    callers can report plain (no-TTA) metrics without another forward pass.
+    """
+    # One XLA-compiled forward pass shared by every TTA round, instead of a
+    # model.predict() per round with its own data adapter and callbacks
+    predict_fn = tf.function(
+        lambda x: model(x, training=False),
+        input_signature=[tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)],
+        jit_compile=True,
+    )
+    
+    def predict(batch_images):
+        batch_images = np.asarray(batch_images, dtype=np.float32)
+        return np.concatenate([
+            predict_fn(batch_images[i:i + batch_size]).numpy()
+            for i in range(0, len(batch_images), batch_size)
+        ])
+    
     predictions = []
     
     # Original prediction
-    predictions.append(model.predict(images, verbose=0))
+    predictions.append(predict(images))
     
     # Augmented predictions
     for _ in range(num_augmentations - 1):
         aug_images = np.array([advanced_augment_image(img) for img in images])
-        predictions.append(model.predict(aug_images, verbose=0))
+        predictions.append(predict(aug_images))
     
     # Average predictions
+    if return_original:
+        return np.mean(predictions, axis=0), predictions[0]
     return np.mean(predictions, axis=0)
 
 
@@ -1012,6 +1171,19 @@ def test_time_augmentation(model, images, num_augmentations=5):
 # TRAINING (OPTIMIZED)
 # ============================================
 
+def dataset_options(deterministic=True):
+    """tf.data options for the in-memory training pipelines."""
+    options = tf.data.Options()
+    # Training batches are shuffled anyway, so let slow elements be overtaken
+    options.deterministic = deterministic
+    options.experimental_optimization.map_and_batch_fusion = True
+    options.experimental_optimization.map_fusion = True
+    options.experimental_optimization.parallel_batch = True
+    options.threading.private_threadpool_size = NUM_WORKERS
+    options.threading.max_intra_op_parallelism = 1
+    return options
+
+
 def train_crop_model(crop_id, config=None, disable_early_stopping=False):
     """Train optimized model for a specific crop."""
     config = {**DEFAULT_CONFIG, **(config or {})}
@@ -1062,31 +1234,24 @@ def train_crop_model(crop_id, config=None, disable_early_stopping=False):
     # Compute sample weights for imbalanced data
     sample_weights = compute_class_weights(y)
     
-    # Split data with stratification
-    try:
-        # Create stratification key from multi-label (handle 4 outputs)
-        # Use binary encoding: N*8 + P*4 + K*2 + Mg*1
-        strat_key = sum(y[:, i] * (2 ** (num_outputs - 1 - i)) for i in range(num_outputs)).astype(int)
-        X_train, X_temp, y_train, y_temp, sw_train, sw_temp = train_test_split(
-            X, y, sample_weights, test_size=0.25, random_state=SEED, stratify=strat_key
-        )
-    except ValueError:
-        X_train, X_temp, y_train, y_temp, sw_train, sw_temp = train_test_split(
-            X, y, sample_weights, test_size=0.25, random_state=SEED
-        )
-    
-    X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.4, random_state=SEED)
+    # Split data with stratification: 75% train, 15% val, 10% test
+    # Stratification key from multi-label (handle 4 outputs)
+    # Use binary encoding: N*8 + P*4 + K*2 + Mg*1
+    strat_key = sum(y[:, i] * (2 ** (num_outputs - 1 - i)) for i in range(num_outputs)).astype(int)
+    train_idx, val_idx, test_idx = stratified_split(strat_key, val_fraction=0.15, test_fraction=0.10)
+    X_train, y_train, sw_train = X[train_idx], y[train_idx], sample_weights[train_idx]
+    X_val, y_val = X[val_idx], y[val_idx]
+    X_test, y_test = X[test_idx], y[test_idx]
     
     print(f"📊 Data Split: Train={len(X_train)}, Val={len(X_val)}, Test={len(X_test)}")
     
-    # Create offline augmented samples for training (2x more data)
+    # Small datasets see extra augmented passes per epoch (2-3x more data),
+    # drawn fresh by the augmentation layers in the input pipeline
+    train_repeats = 1
     if len(X_train) < 500:
         aug_factor = 3 if len(X_train) < 200 else 2
-        X_aug, y_aug = create_augmented_samples(X_train, y_train, augment_factor=aug_factor)
-        X_train = np.concatenate([X_train, X_aug])
-        y_train = np.concatenate([y_train, y_aug])
-        sw_train = np.concatenate([sw_train, np.ones(len(X_aug))])
-        print(f"📈 Augmented training set: {len(X_train)} samples")
+        train_repeats += aug_factor
+        print(f"📈 Augmented training set: {len(X_train) * train_repeats} samples per epoch")
     
     # Create model output directory
     model_dir = MODEL_ROOT / crop_id
@@ -1102,25 +1267,42 @@ def train_crop_model(crop_id, config=None, disable_early_stopping=False):
         backbone=config.get('backbone', 'efficientnetb0'),
         dropout_rate=0.5
     )
-    compile_model(
-        model,
-        config['learning_rate'],
-        use_focal_loss=True,
-        label_smoothing=config.get('label_smoothing', 0.1),
-        focal_gamma=config.get('focal_gamma', 2.0)
-    )
+    # One optimizer for every phase: recompiling after (un)freezing keeps the
+    # head's AdamW moments instead of allocating fresh slots and re-warming
+    # them at each phase boundary. Keras optimizers cannot adopt variables
+    # after they are built, so build it over everything any phase trains.
+    optimizer = create_optimizer(config['learning_rate'])
+    base_model.trainable = True
+    optimizer.build(model.trainable_variables)
+    base_model.trainable = False
+    
+    def compile_phase(target, learning_rate, label_smoothing=config.get('label_smoothing', 0.1)):
+        compile_model(
+            target,
+            learning_rate,
+            use_focal_loss=True,
+            label_smoothing=label_smoothing,
+            focal_gamma=config.get('focal_gamma', 2.0),
+            optimizer=optimizer
+        )
+    
+    compile_phase(model, config['learning_rate'])
     
     model.summary()
     
     # Create tf.data datasets with MixUp/CutMix
-    def create_train_dataset(X, y, weights, batch_size, use_mixup=True):
-        ds = tf.data.Dataset.from_tensor_slices((X, y, weights))
-        ds = ds.shuffle(len(X), reshuffle_each_iteration=True)
-        ds = ds.map(
-            lambda x, y, w: (tf.cast(x, tf.float32), tf.cast(y, tf.float32), tf.cast(w, tf.float32)),
-            num_parallel_calls=tf.data.AUTOTUNE
-        )
+    # Cast once up front instead of in a per-element map that re-runs every
+    # epoch of all three phases (images are already float32)
+    def as_float32(a):
+        return np.asarray(a, dtype=np.float32)
+    
+    def create_train_dataset(X, y, weights, batch_size, use_mixup=True, repeats=1):
+        augmentation = create_augmentation()
+        ds = tf.data.Dataset.from_tensor_slices((as_float32(X), as_float32(y), as_float32(weights)))
+        ds = ds.shuffle(len(X), reshuffle_each_iteration=True).repeat(repeats)
         ds = ds.batch(batch_size, drop_remainder=True)
+        ds = ds.map(lambda x, y, w: (augmentation(x, training=True), y, w),
+                    num_parallel_calls=tf.data.AUTOTUNE)
         
         if use_mixup:
             def apply_mixup(images, labels, weights):
@@ -1132,15 +1314,18 @@ def train_crop_model(crop_id, config=None, disable_early_stopping=False):
         
         # Return only images and labels for training
         ds = ds.map(lambda x, y, w: (x, y), num_parallel_calls=tf.data.AUTOTUNE)
-        return ds.prefetch(tf.data.AUTOTUNE)
+        ds = ds.prefetch(tf.data.AUTOTUNE).with_options(dataset_options(deterministic=False))
+        if tf.config.list_physical_devices('GPU'):
+            # Stage the next batches in GPU memory so the host-to-device copy
+            # overlaps the current step (must be the last transformation)
+            ds = ds.apply(tf.data.experimental.prefetch_to_device('/GPU:0', buffer_size=2))
+        return ds
     
-    train_ds = create_train_dataset(X_train, y_train, sw_train, config['batch_size'], use_mixup=True)
+    train_ds = create_train_dataset(X_train, y_train, sw_train, config['batch_size'], use_mixup=True,
+                                    repeats=train_repeats)
     
-    val_ds = tf.data.Dataset.from_tensor_slices((X_val, y_val))
-    val_ds = val_ds.map(
-        lambda x, y: (tf.cast(x, tf.float32), tf.cast(y, tf.float32)),
-        num_parallel_calls=tf.data.AUTOTUNE
-    ).batch(config['batch_size']).prefetch(tf.data.AUTOTUNE)
+    val_ds = tf.data.Dataset.from_tensor_slices((as_float32(X_val), as_float32(y_val)))
+    val_ds = val_ds.batch(config['batch_size']).prefetch(tf.data.AUTOTUNE).with_options(dataset_options())
     
     # PHASE 1: Train with frozen backbone
     warmup_epochs = config.get('warmup_epochs', 5)
@@ -1151,11 +1336,39 @@ def train_crop_model(crop_id, config=None, disable_early_stopping=False):
     monitor_metric = 'val_loss'
     monitor_mode = 'min'
     
+    # In-training checkpoints are weights only (no config or optimizer state);
+    # the full best.keras is written once after training
+    best_weights = model_dir / 'best.weights.h5'
+    
+    # Optionally train the phase 1 head on cached backbone features: the
+    # backbone is frozen, so its outputs only need computing once. The head
+    # model shares its layers with `model`, so nothing has to be copied back.
+    # Phase 1 then sees un-augmented images (no pipeline augmentation/MixUp).
+    cache_features = config.get('cache_features', False)
+    phase1_model, phase1_train, phase1_val = model, train_ds, val_ds
+    if cache_features:
+        print("\n🧊 Caching frozen backbone features for Phase 1...")
+        features = model.get_layer('backbone_features').output
+        extractor = keras.Model(model.input, features)
+        train_feats = extractor.predict(as_float32(X_train), batch_size=config['batch_size'], verbose=0)
+        val_feats = extractor.predict(as_float32(X_val), batch_size=config['batch_size'], verbose=0)
+        print(f"   Features: train {train_feats.shape}, val {val_feats.shape}")
+        
+        phase1_model = keras.Model(features, model.output, name='classifier_head')
+        compile_phase(phase1_model, config['learning_rate'])
+        phase1_train = tf.data.Dataset.from_tensor_slices((train_feats, as_float32(y_train)))
+        phase1_train = phase1_train.shuffle(len(train_feats), reshuffle_each_iteration=True)
+        phase1_train = phase1_train.batch(config['batch_size']).prefetch(tf.data.AUTOTUNE)
+        phase1_val = tf.data.Dataset.from_tensor_slices((val_feats, as_float32(y_val)))
+        phase1_val = phase1_val.batch(config['batch_size']).prefetch(tf.data.AUTOTUNE)
+    # Head-only checkpoints have a different layout; converted after phase 1
+    phase1_weights = model_dir / 'best_head.weights.h5' if cache_features else best_weights
+    
     callbacks_p1 = [
         ModelCheckpoint(
-            str(model_dir / 'best.keras'),
+            str(phase1_weights),
             monitor=monitor_metric, mode=monitor_mode,
-            save_best_only=True, verbose=0
+            save_best_only=True, save_weights_only=True, verbose=0
         ),
         WarmupCosineDecay(
             total_epochs=phase1_epochs,
@@ -1172,14 +1385,23 @@ def train_crop_model(crop_id, config=None, disable_early_stopping=False):
         ))
     
     print(f"\n🚀 Phase 1: Training classifier head ({phase1_epochs} epochs, warmup={warmup_epochs})...")
-    history1 = model.fit(
-        train_ds,
-        validation_data=val_ds,
+    history1 = phase1_model.fit(
+        phase1_train,
+        validation_data=phase1_val,
         epochs=phase1_epochs,
         callbacks=callbacks_p1,
         verbose=0
     )
     
+    if cache_features and phase1_weights.exists():
+        # Rewrite the best head checkpoint as full-model weights, keeping the
+        # head's current weights for phase 2
+        current = phase1_model.get_weights()
+        phase1_model.load_weights(phase1_weights)
+        model.save_weights(best_weights)
+        phase1_model.set_weights(current)
+        phase1_weights.unlink()
+    
     # PHASE 2: Gradual unfreezing + fine-tuning
     print("\n\n🔓 Unfreezing backbone layers for fine-tuning...")
     base_model.trainable = True
@@ -1194,22 +1416,16 @@ def train_crop_model(crop_id, config=None, disable_early_stopping=False):
     print(f"   Unfrozen {trainable_count}/{total_layers} backbone layers")
     
     # Recompile with lower learning rate
-    compile_model(
-        model,
-        config['learning_rate'] / 10,
-        use_focal_loss=True,
-        label_smoothing=config.get('label_smoothing', 0.1),
-        focal_gamma=config.get('focal_gamma', 2.0)
-    )
+    compile_phase(model, config['learning_rate'] / 10)
     
     phase2_epochs = config['epochs'] - phase1_epochs
     initial_epoch = len(history1.history['loss'])
     
     callbacks_p2 = [
         ModelCheckpoint(
-            str(model_dir / 'best.keras'),
+            str(best_weights),
             monitor=monitor_metric, mode=monitor_mode,
-            save_best_only=True, verbose=0
+            save_best_only=True, save_weights_only=True, verbose=0
         ),
         WarmupCosineDecay(
             total_epochs=phase2_epochs,
@@ -1244,12 +1460,10 @@ def train_crop_model(crop_id, config=None, disable_early_stopping=False):
         print("\n\n🎯 Phase 3: Full fine-tuning refinement...")
         base_model.trainable = True  # Unfreeze all
         
-        compile_model(
+        compile_phase(
             model,
             config['learning_rate'] / 100,
-            use_focal_loss=True,
-            label_smoothing=config.get('label_smoothing', 0.1) * 0.5,  # Less smoothing
-            focal_gamma=config.get('focal_gamma', 2.0)
+            label_smoothing=config.get('label_smoothing', 0.1) * 0.5  # Less smoothing
         )
         
         phase3_epochs = min(20, config['epochs'] // 5)
@@ -1257,9 +1471,9 @@ def train_crop_model(crop_id, config=None, disable_early_stopping=False):
         
         callbacks_p3 = [
             ModelCheckpoint(
-                str(model_dir / 'best.keras'),
+                str(best_weights),
                 monitor=monitor_metric, mode=monitor_mode,
-                save_best_only=True, verbose=0
+                save_best_only=True, save_weights_only=True, verbose=0
             ),
             EarlyStopping(
                 monitor=monitor_metric, mode=monitor_mode,
@@ -1277,67 +1491,72 @@ def train_crop_model(crop_id, config=None, disable_early_stopping=False):
             verbose=0
         )
     
-    # Load best model for evaluation
+    # Restore the best checkpoint for evaluation and save it as the full model
     print("\n\n📊 Loading best model for evaluation...")
-    model = keras.models.load_model(
-        model_dir / 'best.keras',
-        custom_objects={'BinaryFocalLoss': BinaryFocalLoss}
-    )
+    if best_weights.exists():
+        model.load_weights(best_weights)
+    model.save(model_dir / 'best.keras')
+    best_weights.unlink(missing_ok=True)
     
     # Evaluate with Test-Time Augmentation
     print("🔄 Evaluating with Test-Time Augmentation (TTA)...")
-    y_pred_tta = test_time_augmentation(model, X_test, num_augmentations=5)
+    y_pred_tta, y_pred_plain = test_time_augmentation(model, X_test, num_augmentations=5, return_original=True)
     
     # For MULTI-CLASS classification with softmax, use argmax to get predictions
-    # Convert softmax probabilities to one-hot encoded predictions
     y_pred_class = np.argmax(y_pred_tta, axis=1)  # Get predicted class index
     y_true_class = np.argmax(y_test, axis=1)      # Get true class index
-    y_pred_binary = np.eye(3)[y_pred_class]       # Convert back to one-hot for per-class metrics
+    
+    # Confusion matrix (rows = true, cols = predicted); every per-class count below derives from it
+    num_classes = len(crop_cfg['outputs'])
+    cm = np.zeros((num_classes, num_classes), dtype=np.int64)
+    np.add.at(cm, (y_true_class, y_pred_class), 1)
+    true_counts = cm.sum(axis=1)
+    pred_counts = cm.sum(axis=0)
     
     # DEBUG: Print prediction distribution
     print("\n📊 Prediction Analysis:")
     print(f"   Raw pred range: [{y_pred_tta.min():.4f}, {y_pred_tta.max():.4f}]")
     print(f"   Raw pred mean per class: N={y_pred_tta[:, 0].mean():.4f}, P={y_pred_tta[:, 1].mean():.4f}, K={y_pred_tta[:, 2].mean():.4f}")
-    print(f"   Predictions per class: N={y_pred_binary[:, 0].sum():.0f}, P={y_pred_binary[:, 1].sum():.0f}, K={y_pred_binary[:, 2].sum():.0f}")
-    print(f"   True labels per class: N={y_test[:, 0].sum():.0f}, P={y_test[:, 1].sum():.0f}, K={y_test[:, 2].sum():.0f}")
+    print(f"   Predictions per class: N={pred_counts[0]}, P={pred_counts[1]}, K={pred_counts[2]}")
+    print(f"   True labels per class: N={true_counts[0]}, P={true_counts[1]}, K={true_counts[2]}")
     print(f"   Test set size: {len(y_test)}")
+    print(f"   Confusion matrix (rows=true, cols=pred):")
+    for name, row in zip(crop_cfg['outputs'], cm):
+        print(f"     {name:>12}: {' '.join(f'{v:6d}' for v in row)}")
+    
+    # Per-class (one-vs-rest) metrics
+    from sklearn.metrics import roc_auc_score
+    n_test = len(y_true_class)
+    tp = cm.diagonal()
+    fp = pred_counts - tp
+    fn = true_counts - tp
+    class_acc = (n_test - fp - fn) / max(n_test, 1)
+    f1_denom = 2 * tp + fp + fn
+    class_f1 = np.divide(2 * tp, f1_denom, out=np.zeros(num_classes), where=f1_denom > 0)
     
-    # Per-class metrics
     per_class_acc = {}
     per_class_f1 = {}
     per_class_auc = {}
     
     for i, name in enumerate(crop_cfg['outputs']):
         # Check if this output has variation in test set
-        unique_true = np.unique(y_test[:, i])
-        unique_pred = np.unique(y_pred_binary[:, i])
-        
-        if len(unique_true) < 2:
-            print(f"  {name}: SKIPPED (no variation in test set - all {'positive' if unique_true[0] == 1 else 'negative'})")
+        if true_counts[i] in (0, n_test):
+            print(f"  {name}: SKIPPED (no variation in test set - all {'positive' if true_counts[i] else 'negative'})")
             per_class_acc[name] = float('nan')
             per_class_f1[name] = float('nan')
             per_class_auc[name] = float('nan')
         else:
-            acc = (y_pred_binary[:, i] == y_test[:, i]).mean()
-            per_class_acc[name] = float(acc)
-            
-            # F1 score
-            from sklearn.metrics import f1_score as sklearn_f1
-            try:
-                f1_class = sklearn_f1(y_test[:, i], y_pred_binary[:, i], zero_division=0)
-                per_class_f1[name] = float(f1_class)
-            except:
-                per_class_f1[name] = float('nan')
+            per_class_acc[name] = float(class_acc[i])
+            per_class_f1[name] = float(class_f1[i])
             
             # AUC
             try:
-                from sklearn.metrics import roc_auc_score
                 auc_class = roc_auc_score(y_test[:, i], y_pred_tta[:, i])
                 per_class_auc[name] = float(auc_class)
             except:
                 per_class_auc[name] = float('nan')
             
-            print(f"  {name}: Acc={acc:.4f}, F1={per_class_f1[name]:.4f}, AUC={per_class_auc[name]:.4f}")
+            print(f"  {name}: Acc={per_class_acc[name]:.4f}, F1={per_class_f1[name]:.4f}, AUC={per_class_auc[name]:.4f}")
     
     # Overall metrics for multi-class classification
     from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
@@ -1361,13 +1580,16 @@ def train_crop_model(crop_id, config=None, disable_early_stopping=False):
     print(f"  Macro F1 Score:   {f1:.4f}")
     print(f"  Macro AUC:        {auc:.4f}")
     
-    # Standard evaluation (without TTA) for comparison
-    results = model.evaluate(X_test, y_test, verbose=0)
+    # Standard evaluation (without TTA) for comparison, from the un-augmented
+    # TTA round rather than a separate model.evaluate() pass over the test set
+    test_loss = float(model.loss(y_test, y_pred_plain))
+    test_acc = float(np.mean(np.argmax(y_pred_plain, axis=1) == y_true_class))
+    auc_metric = keras.metrics.AUC(multi_label=False)
+    auc_metric.update_state(y_test, y_pred_plain)
+    test_auc = float(auc_metric.result())
     print(f"\n📊 Standard Evaluation (no TTA):")
-    print(f"  Test Loss:     {results[0]:.4f}")
-    print(f"  Test Accuracy: {results[1]:.4f}")
-    # AUC is at index 4, but may vary - use safe access
-    test_auc = results[4] if len(results) > 4 else 0.5
+    print(f"  Test Loss:     {test_loss:.4f}")
+    print(f"  Test Accuracy: {test_acc:.4f}")
     print(f"  Test AUC:      {test_auc:.4f}")
     
     # Save final model and metadata
@@ -1483,6 +1705,11 @@ Examples:
     parser.add_argument('--batch-size', type=int, help='Batch size (overrides preset)')
     parser.add_argument('--learning-rate', type=float, help='Learning rate (overrides preset)')
     parser.add_argument('--disable-early-stopping', action='store_true', help='Train full epochs')
+    parser.add_argument('--cache-dataset', action='store_true',
+                        help='Keep decoded images in models/<crop>/dataset_cache to skip decoding on later runs')
+    parser.add_argument('--cache-features', action='store_true',
+                        help='Run the frozen backbone once and train the Phase 1 head on cached features '
+                             '(faster, but Phase 1 sees no augmentation)')
     parser.add_argument('--smoke-test', action='store_true', help='Only build+compile the model')
     args = parser.parse_args()
     
@@ -1514,6 +1741,10 @@ Examples:
         config['batch_size'] = args.batch_size
     if args.learning_rate:
         config['learning_rate'] = args.learning_rate
+    if args.cache_dataset:
+        config['cache_dataset'] = True
+    if args.cache_features:
+        config['cache_features'] = True
     
     print(f"\n🔧 Training Configuration:")
     print(f"   Quality Preset: {args.quality}")
@@ -42,13 +42,24 @@ from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLRO
 from sklearn.model_selection import train_test_split
 from PIL import Image
 
+
+def gpu_precision_policy(gpus):
+    """bfloat16 on Ampere and newer (float32 range, no loss scaling), float16 on older GPUs."""
+    for gpu in gpus:
+        capability = tf.config.experimental.get_device_details(gpu).get('compute_capability')
+        if not capability or capability < (8, 0):
+            return 'mixed_float16'
+    return 'mixed_bfloat16'
+
+
 # Enable mixed precision only when a GPU is available.
 # Mixed precision on CPU often slows down and can destabilize training (NaNs).
 try:
     gpus = tf.config.list_physical_devices('GPU')
     if gpus:
-        tf.keras.mixed_precision.set_global_policy('mixed_float16')
-        print(f"⚡ Mixed precision (float16) enabled on GPU ({len(gpus)} detected)")
+        policy = gpu_precision_policy(gpus)
+        tf.keras.mixed_precision.set_global_policy(policy)
+        print(f"⚡ Mixed precision enabled: {policy} ({len(gpus)} GPU(s))")
     else:
         tf.keras.mixed_precision.set_global_policy('float32')
         print("ℹ️ No GPU detected; using float32 for numerical stability")
@@ -129,18 +140,29 @@ CLASSES = {
 
 
 def load_and_preprocess_image(image_path, target_size=(224, 224)):
-    """Load and preprocess a single image."""
+    """
+    Load and resize a single image, kept as uint8 (0-255).
+    
+    A quarter of the memory of float32; the training pipeline scales
+    batches to [0, 1] (see to_model_input).
+    """
     try:
-        img = Image.open(image_path).convert('RGB')
+        img = Image.open(image_path)
+        # Let the JPEG decoder downscale by 1/2-1/8 while decoding (no-op for PNG)
+        img.draft('RGB', target_size)
+        img = img.convert('RGB')
         img = img.resize(target_size, Image.LANCZOS)
-        img_array = np.array(img, dtype=np.float32)
-        img_array = img_array / 255.0  # Normalize to [0, 1]
-        return img_array
+        return np.asarray(img, dtype=np.uint8)
     except Exception as e:
         print(f"Error loading image {image_path}: {e}")
         return None
 
 
+def to_model_input(images):
+    """Scale uint8 images to the float32 [0, 1] range the model expects."""
+    return np.divide(images, 255.0, dtype=np.float32)
+
+
 def parse_deficiency_label(filename, folder_name):
     """
     Parse deficiency labels from filename and folder.
@@ -232,10 +254,13 @@ def load_dataset():
     # Collect all image paths first
     image_tasks = []
     
-    for folder_name in os.listdir(dataset_path):
+    # scandir reports entry types from the directory listing itself, so telling
+    # folders from files needs no extra stat per entry (slow on network/NTFS drives)
+    with os.scandir(dataset_path) as entries:
+        folder_names = [entry.name for entry in entries if entry.is_dir()]
+    
+    for folder_name in folder_names:
         folder_path = dataset_path / folder_name
-        if not folder_path.is_dir():
-            continue
             
         # Skip micronutrient folders for MVP (focus on NPK)
         if folder_name not in npk_folders:
@@ -259,14 +284,17 @@ def load_dataset():
         
         with tqdm(total=len(image_tasks), desc="📷 Loading images", unit="img", 
                   bar_format='{l_bar}{bar:30}{r_bar}{bar:-10b}', colour='green') as pbar:
-            for future in as_completed(futures):
+            # Advance the bar in steps of 128 rather than re-rendering per image
+            for done, future in enumerate(as_completed(futures), 1):
                 result = future.result()
                 if result is not None:
                     images.append(result['image'])
                     labels.append(result['label'])
                     class_info.append(result['info'])
                     folder_counts[result['info']['folder']] += 1
-                pbar.update(1)
+                if done % 128 == 0:
+                    pbar.update(128)
+            pbar.update(len(futures) % 128)
     
     print("\n📊 Dataset Summary:")
     print("-" * 40)
@@ -278,11 +306,27 @@ def load_dataset():
     return np.array(images), np.array(labels), class_info
 
 
+def create_augmentation():
+    """Training augmentation, applied to batches in tf.data.
+    
+    Kept out of the model because the image transform layers have no XLA
+    kernels; with them gone the train step can be XLA-compiled.
+    """
+    return keras.Sequential([
+        layers.RandomFlip("horizontal", dtype='float32'),
+        layers.RandomRotation(0.2, dtype='float32'),
+        layers.RandomZoom(0.2, dtype='float32'),
+        layers.RandomBrightness(0.2, dtype='float32'),
+        layers.RandomContrast(0.2, dtype='float32'),
+    ], name='augmentation')
+
+
 def create_model(input_shape=(224, 224, 3), num_outputs=3, *, backbone: str | None = None):
     """
     Create NPK deficiency detection model.
     
     Architecture:
+    - Training augmentation lives in the input pipeline (see create_augmentation)
     - MobileNetV3Large (pretrained on ImageNet) as feature extractor
     - Global Average Pooling
     - Dense layers with dropout for regularization
@@ -296,15 +340,8 @@ def create_model(input_shape=(224, 224, 3), num_outputs=3, *, backbone: str | No
     # Build model
     inputs = keras.Input(shape=input_shape)
     
-    # Data augmentation layers (applied during training)
-    x = layers.RandomFlip("horizontal")(inputs)
-    x = layers.RandomRotation(0.2)(x)
-    x = layers.RandomZoom(0.2)(x)
-    x = layers.RandomBrightness(0.2)(x)
-    x = layers.RandomContrast(0.2)(x)
-    
     # Backbone-specific preprocessing
-    x = preprocess_fn(x)
+    x = preprocess_fn(inputs)
     
     # Feature extraction
     x = base_model(x, training=False)
@@ -327,8 +364,12 @@ def create_model(input_shape=(224, 224, 3), num_outputs=3, *, backbone: str | No
     return model, base_model
 
 
-def compile_model(model, learning_rate=0.001):
-    """Compile model with appropriate loss and metrics for multi-label classification."""
+def compile_model(model, learning_rate=0.001, jit_compile=True):
+    """Compile model with appropriate loss and metrics for multi-label classification.
+    
+    jit_compile=True XLA-compiles the train step, fusing the backbone's
+    conv/BN/activation chains and the head into fewer kernels.
+    """
     model.compile(
         # Gradient clipping prevents exploding gradients -> NaN loss.
         optimizer=keras.optimizers.Adam(learning_rate=learning_rate, clipnorm=1.0),
@@ -338,7 +379,8 @@ def compile_model(model, learning_rate=0.001):
             keras.metrics.Precision(name='precision'),
             keras.metrics.Recall(name='recall'),
             keras.metrics.AUC(name='auc', multi_label=True)
-        ]
+        ],
+        jit_compile=jit_compile,
     )
     return model
 
@@ -366,6 +408,18 @@ class TqdmCallback(keras.callbacks.Callback):
         self.epoch_bar.close()
 
 
+def dataset_options():
+    """
+    Run the input pipeline on its own NUM_WORKERS-thread pool with
+    single-threaded ops, so batching and scaling don't compete with the
+    training step for TensorFlow's intra-op threads.
+    """
+    options = tf.data.Options()
+    options.threading.private_threadpool_size = NUM_WORKERS
+    options.threading.max_intra_op_parallelism = 1
+    return options
+
+
 def train_model(
     model,
     base_model,
@@ -422,22 +476,28 @@ def train_model(
     print("=" * 60)
     
     # Create tf.data datasets for efficient data pipeline
+    # Images stay uint8 until batched; cast+scale is one op per batch
+    def scale_batch(x, y):
+        return tf.cast(x, tf.float32) / 255.0, tf.cast(y, tf.float32)
+    
     train_dataset = tf.data.Dataset.from_tensor_slices((X_train, y_train))
     train_dataset = train_dataset.shuffle(buffer_size=len(X_train))
+    train_dataset = train_dataset.batch(CONFIG['batch_size'], num_parallel_calls=tf.data.AUTOTUNE)
+    train_dataset = train_dataset.map(scale_batch, num_parallel_calls=tf.data.AUTOTUNE)
+    augmentation = create_augmentation()
     train_dataset = train_dataset.map(
-        lambda x, y: (tf.cast(x, tf.float32), tf.cast(y, tf.float32)),
-        num_parallel_calls=tf.data.AUTOTUNE,
+        lambda x, y: (augmentation(x, training=True), y), num_parallel_calls=tf.data.AUTOTUNE
     )
-    train_dataset = train_dataset.batch(CONFIG['batch_size'])
-    train_dataset = train_dataset.prefetch(CONFIG['prefetch_buffer'])
+    train_dataset = train_dataset.prefetch(CONFIG['prefetch_buffer']).with_options(dataset_options())
+    if tf.config.list_physical_devices('GPU'):
+        # Stage the next batches in GPU memory so the host-to-device copy
+        # overlaps the current step (must be the last transformation)
+        train_dataset = train_dataset.apply(tf.data.experimental.prefetch_to_device('/GPU:0', buffer_size=2))
     
     val_dataset = tf.data.Dataset.from_tensor_slices((X_val, y_val))
-    val_dataset = val_dataset.map(
-        lambda x, y: (tf.cast(x, tf.float32), tf.cast(y, tf.float32)),
-        num_parallel_calls=tf.data.AUTOTUNE,
-    )
-    val_dataset = val_dataset.batch(CONFIG['batch_size'])
-    val_dataset = val_dataset.prefetch(CONFIG['prefetch_buffer'])
+    val_dataset = val_dataset.batch(CONFIG['batch_size'], num_parallel_calls=tf.data.AUTOTUNE)
+    val_dataset = val_dataset.map(scale_batch, num_parallel_calls=tf.data.AUTOTUNE)
+    val_dataset = val_dataset.prefetch(CONFIG['prefetch_buffer']).with_options(dataset_options())
     
     # Phase 1: Train with frozen base
     history1 = model.fit(
@@ -530,7 +590,21 @@ def evaluate_model(model, X_test, y_test):
     print("\n📊 Evaluating on Test Set...")
     print("=" * 60)
     
-    results = model.evaluate(X_test, y_test, verbose=0)
+    X_test = to_model_input(X_test)
+    
+    # Single forward pass; the compiled loss and metrics are recomputed from
+    # the predictions instead of running model.evaluate() over the same data.
+    predictions = model.predict(X_test, verbose=0)
+    
+    results = [float(keras.losses.BinaryCrossentropy()(y_test, predictions))]
+    for metric in [
+        keras.metrics.CategoricalAccuracy(),  # what compile() resolves "accuracy" to
+        keras.metrics.Precision(),
+        keras.metrics.Recall(),
+        keras.metrics.AUC(multi_label=True),
+    ]:
+        metric.update_state(y_test, predictions)
+        results.append(float(metric.result()))
     
     print(f"  Test Loss: {results[0]:.4f}")
     print(f"  Test Accuracy: {results[1]:.4f}")
@@ -538,9 +612,6 @@ def evaluate_model(model, X_test, y_test):
     print(f"  Test Recall: {results[3]:.4f}")
     print(f"  Test AUC: {results[4]:.4f}")
     
-    # Per-class predictions
-    predictions = model.predict(X_test, verbose=0)
-    
     print("\n📈 Per-Nutrient Metrics:")
     print("-" * 40)
     
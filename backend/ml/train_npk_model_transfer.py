@@ -28,6 +28,7 @@ Usage:
 import os
 import sys
 import json
+import hashlib
 import numpy as np
 from pathlib import Path
 from datetime import datetime
@@ -49,12 +50,22 @@ from PIL import Image
 NUM_WORKERS = min(multiprocessing.cpu_count(), 16)
 print(f"🔧 Using {NUM_WORKERS} worker threads")
 
+def gpu_precision_policy(gpus):
+    """bfloat16 on Ampere and newer (float32 range, no loss scaling), float16 on older GPUs."""
+    for gpu in gpus:
+        capability = tf.config.experimental.get_device_details(gpu).get('compute_capability')
+        if not capability or capability < (8, 0):
+            return 'mixed_float16'
+    return 'mixed_bfloat16'
+
+
 # Enable mixed precision on GPU
 try:
     gpus = tf.config.list_physical_devices('GPU')
     if gpus:
-        tf.keras.mixed_precision.set_global_policy('mixed_float16')
-        print(f"⚡ Mixed precision enabled on GPU ({len(gpus)} detected)")
+        policy = gpu_precision_policy(gpus)
+        tf.keras.mixed_precision.set_global_policy(policy)
+        print(f"⚡ Mixed precision enabled: {policy} ({len(gpus)} GPU(s))")
     else:
         print("ℹ️ No GPU detected; using float32")
 except Exception as e:
@@ -81,6 +92,7 @@ CONFIG = {
     # Training
     'image_size': (224, 224),
     'batch_size': 32,
+    'shuffle_buffer': 2048,  # Reshuffle window for disk-cached datasets
     'plantvillage_epochs': 30,
     'npk_epochs': 50,
     'learning_rate_plantvillage': 0.0001,  # Lower for transfer learning
@@ -127,6 +139,11 @@ def create_mobilenetv2_base(input_shape=(224, 224, 3), pretrained='imagenet'):
     return base_model
 
 
+def get_backbone(model):
+    """The MobileNetV2 base nested inside a classifier built by this module."""
+    return next(layer for layer in model.layers if isinstance(layer, keras.Model))
+
+
 def create_plantvillage_model(num_classes=5, base_weights='imagenet'):
     """
     Create model for PlantVillage training (Stage 1).
@@ -154,7 +171,10 @@ def create_plantvillage_model(num_classes=5, base_weights='imagenet'):
     
     # Build classifier head
     inputs = keras.Input(shape=(*CONFIG['image_size'], 3))
-    x = base_model(inputs, training=False)
+    # Takes raw [0, 255] pixels: batches cross to the device as uint8 and are
+    # scaled there instead of as host-side float32
+    x = layers.Rescaling(1.0 / 255)(inputs)
+    x = base_model(x, training=False)
     x = layers.Dropout(0.3)(x)
     x = layers.Dense(128, activation='relu')(x)
     x = layers.Dropout(0.2)(x)
@@ -162,11 +182,12 @@ def create_plantvillage_model(num_classes=5, base_weights='imagenet'):
     
     model = keras.Model(inputs, outputs, name='plantvillage_mobilenetv2')
     
-    # Compile
+    # Compile (XLA: augmentation runs in tf.data, so every layer can be jit-compiled)
     model.compile(
         optimizer=keras.optimizers.Adam(CONFIG['learning_rate_plantvillage']),
         loss='sparse_categorical_crossentropy',
-        metrics=['accuracy', keras.metrics.TopKCategoricalAccuracy(k=2, name='top2_accuracy')]
+        metrics=['accuracy', keras.metrics.TopKCategoricalAccuracy(k=2, name='top2_accuracy')],
+        jit_compile=True,
     )
     
     print(f"   • Total params: {model.count_params():,}")
@@ -194,10 +215,11 @@ def create_npk_model(plantvillage_weights=None):
         # Load PlantVillage model
         pv_model = keras.models.load_model(plantvillage_weights)
         
-        # Extract MobileNetV2 base (skip input layer and classifier)
+        # Extract MobileNetV2 base (skip input/rescaling layers and classifier)
+        pv_base = get_backbone(pv_model)
         base_model = keras.Model(
-            inputs=pv_model.layers[1].input,
-            outputs=pv_model.layers[1].output
+            inputs=pv_base.input,
+            outputs=pv_base.output
         )
     else:
         print(f"   • Base: MobileNetV2 (ImageNet only)")
@@ -212,7 +234,10 @@ def create_npk_model(plantvillage_weights=None):
     
     # Build multi-label classifier head for NPK
     inputs = keras.Input(shape=(*CONFIG['image_size'], 3))
-    x = base_model(inputs, training=False)
+    # Takes raw [0, 255] pixels: batches cross to the device as uint8 and are
+    # scaled there instead of as host-side float32
+    x = layers.Rescaling(1.0 / 255)(inputs)
+    x = base_model(x, training=False)
     x = layers.Dropout(0.4)(x)
     x = layers.Dense(256, activation='relu')(x)
     x = layers.Dropout(0.3)(x)
@@ -233,7 +258,8 @@ def create_npk_model(plantvillage_weights=None):
             keras.metrics.AUC(name='auc'),
             keras.metrics.Precision(name='precision'),
             keras.metrics.Recall(name='recall')
-        ]
+        ],
+        jit_compile=True,
     )
     
     print(f"   • Total params: {model.count_params():,}")
@@ -242,12 +268,37 @@ def create_npk_model(plantvillage_weights=None):
     return model
 
 
+def load_image(img_path):
+    """Load one image resized to CONFIG['image_size'] as uint8 pixels (None on error)."""
+    try:
+        img = Image.open(img_path)
+        # Let the JPEG decoder downscale by 1/2-1/8 while decoding (no-op for PNG)
+        img.draft('RGB', CONFIG['image_size'])
+        img = img.convert('RGB')
+        img = img.resize(CONFIG['image_size'], Image.LANCZOS)
+        return np.asarray(img, dtype=np.uint8)
+    except Exception as e:
+        print(f"   ⚠️  Error loading {img_path}: {e}")
+        return None
+
+
+def load_images_parallel(image_paths, desc):
+    """Read and decode images on NUM_WORKERS threads, keeping the input order."""
+    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
+        # miniters: only check whether to redraw every 128 images
+        return list(tqdm(executor.map(load_image, image_paths), total=len(image_paths), desc=desc,
+                         leave=False, miniters=128))
+
+
 def load_plantvillage_dataset():
     """
-    Load PlantVillage dataset organized by NPK-like categories.
+    Index PlantVillage images organized by NPK-like categories.
+    
+    Only the file paths are collected here; the images are decoded on the fly
+    by create_path_dataset, so the ~54K images never have to fit in memory.
     
     Returns:
-        X_train, X_val, y_train, y_val: Training and validation data
+        paths_train, paths_val, y_train, y_val: Image paths and class labels
     """
     print("\n📂 Loading PlantVillage dataset...")
     
@@ -267,7 +318,7 @@ def load_plantvillage_dataset():
         'general_stress': 4
     }
     
-    images = []
+    paths = []
     labels = []
     
     print(f"   Loading from: {dataset_path}")
@@ -279,41 +330,33 @@ def load_plantvillage_dataset():
             print(f"   ⚠️  Category not found: {category}")
             continue
         
-        image_files = list(category_path.glob("*.jpg")) + list(category_path.glob("*.JPG"))
+        # One directory scan (*.jpg and *.JPG)
+        with os.scandir(category_path) as entries:
+            image_files = sorted(entry.path for entry in entries if entry.name.lower().endswith('.jpg'))
         
         print(f"   • {category:20s}: {len(image_files):6,} images")
         
-        for img_path in tqdm(image_files, desc=f"   Loading {category}", leave=False):
-            try:
-                img = Image.open(img_path).convert('RGB')
-                img = img.resize(CONFIG['image_size'], Image.LANCZOS)
-                img_array = np.array(img, dtype=np.float32) / 255.0
-                
-                images.append(img_array)
-                labels.append(label)
-            except Exception as e:
-                print(f"   ⚠️  Error loading {img_path}: {e}")
-    
-    X = np.array(images, dtype=np.float32)
+        paths.extend(image_files)
+        labels.extend([label] * len(image_files))
+    
+    paths = np.array(paths)
     y = np.array(labels, dtype=np.int32)
     
-    print(f"\n   ✅ Loaded {len(X):,} images")
-    print(f"   • Shape: {X.shape}")
-    print(f"   • Memory: {X.nbytes / 1024**3:.2f} GB")
+    print(f"\n   ✅ Found {len(paths):,} images")
     
     # Split train/val
-    X_train, X_val, y_train, y_val = train_test_split(
-        X, y,
+    paths_train, paths_val, y_train, y_val = train_test_split(
+        paths, y,
         test_size=CONFIG['validation_split'],
         stratify=y,
         random_state=42
     )
     
     print(f"\n   📊 Split:")
-    print(f"   • Train: {len(X_train):,} images")
-    print(f"   • Val:   {len(X_val):,} images")
+    print(f"   • Train: {len(paths_train):,} images")
+    print(f"   • Val:   {len(paths_val):,} images")
     
-    return X_train, X_val, y_train, y_val
+    return paths_train, paths_val, y_train, y_val
 
 
 def load_npk_dataset():
@@ -349,22 +392,19 @@ def load_npk_dataset():
         
         print(f"   • {folder_name:20s}: {len(image_files):6,} images")
         
-        for img_file in tqdm(image_files, desc=f"   Loading {folder_name}", leave=False):
-            try:
-                img_path = folder_path / img_file
-                img = Image.open(img_path).convert('RGB')
-                img = img.resize(CONFIG['image_size'], Image.LANCZOS)
-                img_array = np.array(img, dtype=np.float32) / 255.0
-                
-                # Parse multi-label
-                label = parse_npk_label(img_file, folder_name)
-                
-                images.append(img_array)
-                labels.append(label)
-            except Exception as e:
-                print(f"   ⚠️  Error loading {img_file}: {e}")
-    
-    X = np.array(images, dtype=np.float32)
+        image_paths = [folder_path / img_file for img_file in image_files]
+        loaded = load_images_parallel(image_paths, f"   Loading {folder_name}")
+        for img_file, img_array in zip(image_files, loaded):
+            if img_array is None:
+                continue
+            
+            # Parse multi-label
+            label = parse_npk_label(img_file, folder_name)
+            
+            images.append(img_array)
+            labels.append(label)
+    
+    X = np.array(images, dtype=np.uint8)
     y = np.array(labels, dtype=np.float32)
     
     print(f"\n   ✅ Loaded {len(X):,} images")
@@ -438,18 +478,169 @@ def create_data_augmentation():
     return augmentation
 
 
-def train_plantvillage_stage(epochs=30, unfreeze_at=10):
+def dataset_options():
+    """
+    Run the input pipeline on its own NUM_WORKERS-thread pool with
+    single-threaded ops, so decoding and augmentation don't compete with the
+    training step for TensorFlow's intra-op threads.
+    """
+    options = tf.data.Options()
+    options.threading.private_threadpool_size = NUM_WORKERS
+    options.threading.max_intra_op_parallelism = 1
+    return options
+
+
+def create_train_dataset(X_train, y_train):
+    """
+    Shuffled, batched training data augmented on the fly.
+    
+    Augmenting inside tf.data draws fresh transforms every epoch and runs on
+    CPU threads while the model trains on the previous batch. Images are uint8
+    [0, 255] pixels; the model does the scaling.
+    """
+    augmentation = create_data_augmentation()
+    ds = tf.data.Dataset.from_tensor_slices((X_train, y_train))
+    ds = ds.shuffle(len(X_train), reshuffle_each_iteration=True)
+    ds = ds.batch(CONFIG['batch_size'])
+    ds = ds.map(lambda x, y: (augmentation(tf.cast(x, tf.float32), training=True), y),
+                num_parallel_calls=tf.data.AUTOTUNE)
+    ds = ds.prefetch(tf.data.AUTOTUNE).with_options(dataset_options())
+    if tf.config.list_physical_devices('GPU'):
+        # Stage the next batches in GPU memory so the host-to-device copy
+        # overlaps the current step (must be the last transformation)
+        ds = ds.apply(tf.data.experimental.prefetch_to_device('/GPU:0', buffer_size=2))
+    return ds
+
+
+def decode_image_file(path):
+    """
+    Read, decode and resize one image file inside tf.data (uint8, like load_image).
+    
+    JPEGs are decoded with libjpeg's DCT scaling at the largest 1/2, 1/4 or
+    1/8 ratio that still covers the target size (what PIL's draft() does in
+    load_image), so large photos are never decoded at full resolution.
+    """
+    data = tf.io.read_file(path)
+    target_h, target_w = CONFIG['image_size']
+    
+    def decode_jpeg():
+        shape = tf.io.extract_jpeg_shape(data)
+        scale = tf.minimum(shape[0] // target_h, shape[1] // target_w)
+        branch = tf.reduce_sum(tf.cast(scale >= tf.constant([2, 4, 8], dtype=scale.dtype), tf.int32))
+        return tf.switch_case(branch, [
+            lambda ratio=ratio: tf.io.decode_jpeg(data, channels=3, ratio=ratio)
+            for ratio in (1, 2, 4, 8)
+        ])
+    
+    img = tf.cond(
+        tf.io.is_jpeg(data),
+        decode_jpeg,
+        lambda: tf.io.decode_image(data, channels=3, expand_animations=False),
+    )
+    img = tf.image.resize(img, CONFIG['image_size'], method='lanczos3', antialias=True)
+    return tf.cast(tf.clip_by_value(tf.round(img), 0, 255), tf.uint8)
+
+
+def dataset_cache_file(paths, name):
+    """
+    tf.data cache prefix for the decoded images of one split.
+    
+    The key covers the image size and every file's path, size and mtime, so
+    adding, removing or editing an image starts a fresh cache. Caches of the
+    same split with a different key are deleted.
+    """
+    digest = hashlib.sha1(repr(tuple(CONFIG['image_size'])).encode())
+    for path in paths:
+        st = os.stat(path)
+        digest.update(f"{path}|{st.st_size}|{st.st_mtime_ns}\n".encode())
+    cache_dir = CONFIG['model_save_path'] / 'dataset_cache'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    prefix = cache_dir / f"{name}_{digest.hexdigest()[:16]}"
+    for stale in cache_dir.glob(f"{name}_*"):
+        if not stale.name.startswith(prefix.name):
+            stale.unlink()
+    return prefix
+
+
+def balanced_path_dataset(paths, labels):
+    """
+    One epoch (len(paths) samples) of (path, label) pairs drawing every class
+    equally often.
+    
+    Each class is its own endlessly reshuffled path stream and
+    sample_from_datasets picks between them uniformly, so minority classes
+    are oversampled without duplicating any files, paths or decodes up front.
+    """
+    per_class = []
+    for label in np.unique(labels):
+        in_class = labels == label
+        class_ds = tf.data.Dataset.from_tensor_slices((paths[in_class], labels[in_class]))
+        per_class.append(class_ds.shuffle(int(in_class.sum()), reshuffle_each_iteration=True).repeat())
+    ds = tf.data.Dataset.sample_from_datasets(
+        per_class,
+        weights=[1.0 / len(per_class)] * len(per_class),
+        rerandomize_each_iteration=True,
+    )
+    return ds.take(len(paths))
+
+
+def create_path_dataset(paths, labels, training=True, cache_file=None, balance_classes=False):
+    """
+    Batched dataset that reads and decodes images straight from their paths.
+    
+    Files are decoded in parallel as batches are needed instead of being
+    loaded into one in-memory array up front. Training data is shuffled and
+    augmented like create_train_dataset.
+    
+    With cache_file, the decoded uint8 images are written to that file during
+    the first epoch and streamed back afterwards, so later epochs skip JPEG
+    decoding and resizing. Augmentation stays after the cache. Cached paths
+    keep their (already shuffled) split order and are reshuffled through a
+    bounded buffer instead of holding a whole epoch of images.
+    
+    With balance_classes (training only, not combined with cache_file), each
+    epoch samples the classes uniformly (see balanced_path_dataset).
+    
+    Validation batches stay uint8; the model scales pixels on the device.
+    """
+    if training and balance_classes:
+        ds = balanced_path_dataset(np.asarray(paths), np.asarray(labels))
+    else:
+        ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+        if training and cache_file is None:
+            ds = ds.shuffle(len(paths), reshuffle_each_iteration=True)
+    ds = ds.map(lambda p, y: (decode_image_file(p), y), num_parallel_calls=tf.data.AUTOTUNE)
+    if cache_file is not None:
+        ds = ds.cache(str(cache_file))
+        if training:
+            ds = ds.shuffle(CONFIG['shuffle_buffer'], reshuffle_each_iteration=True)
+    ds = ds.batch(CONFIG['batch_size'])
+    if training:
+        augmentation = create_data_augmentation()
+        ds = ds.map(lambda x, y: (augmentation(tf.cast(x, tf.float32), training=True), y),
+                    num_parallel_calls=tf.data.AUTOTUNE)
+    ds = ds.prefetch(tf.data.AUTOTUNE).with_options(dataset_options())
+    if training and tf.config.list_physical_devices('GPU'):
+        # Stage the next batches in GPU memory so the host-to-device copy
+        # overlaps the current step (must be the last transformation)
+        ds = ds.apply(tf.data.experimental.prefetch_to_device('/GPU:0', buffer_size=2))
+    return ds
+
+
+def train_plantvillage_stage(epochs=30, unfreeze_at=10, cache_dataset=False, balance_classes=False):
     """
     Train Stage 1: PlantVillage fine-tuning.
     
     This creates a model that understands plant-specific visual features.
+    With cache_dataset, decoded images are cached on disk after the first epoch.
+    With balance_classes, training batches sample the five categories uniformly.
     """
     print("\n" + "=" * 80)
     print("STAGE 1: PLANTVILLAGE TRANSFER LEARNING")
     print("=" * 80)
     
     # Load data
-    X_train, X_val, y_train, y_val = load_plantvillage_dataset()
+    paths_train, paths_val, y_train, y_val = load_plantvillage_dataset()
     
     # Create model
     model = create_plantvillage_model(num_classes=5, base_weights='imagenet')
@@ -485,18 +676,29 @@ def train_plantvillage_stage(epochs=30, unfreeze_at=10):
         )
     ]
     
-    # Data augmentation
-    augmentation = create_data_augmentation()
-    X_train_aug = augmentation(X_train, training=True)
+    # Streamed from disk, training data augmented on the fly
+    train_cache = val_cache = None
+    if cache_dataset:
+        val_cache = dataset_cache_file(paths_val, 'plantvillage_val')
+        if balance_classes:
+            # The balanced stream never reads the classes in one fixed order to cache
+            print("ℹ️ Class-balanced training data is decoded every epoch; caching validation only")
+        else:
+            train_cache = dataset_cache_file(paths_train, 'plantvillage_train')
+        print(f"💾 Caching decoded images under: {val_cache.parent}")
+    if balance_classes:
+        print("⚖️ Sampling PlantVillage categories uniformly")
+    train_ds = create_path_dataset(paths_train, y_train, training=True, cache_file=train_cache,
+                                   balance_classes=balance_classes)
+    val_ds = create_path_dataset(paths_val, y_val, training=False, cache_file=val_cache)
     
     # Phase 1: Train only classifier head
     print(f"\n📚 Phase 1: Training classifier head ({unfreeze_at} epochs)...")
     
     history1 = model.fit(
-        X_train_aug, y_train,
-        validation_data=(X_val, y_val),
+        train_ds,
+        validation_data=val_ds,
         epochs=unfreeze_at,
-        batch_size=CONFIG['batch_size'],
         callbacks=callbacks,
         verbose=1
     )
@@ -504,7 +706,7 @@ def train_plantvillage_stage(epochs=30, unfreeze_at=10):
     # Phase 2: Unfreeze base and fine-tune
     print(f"\n🔓 Phase 2: Unfreezing base and fine-tuning...")
     
-    base_model = model.layers[1]
+    base_model = get_backbone(model)
     base_model.trainable = True
     
     # Freeze early layers, unfreeze last 50
@@ -518,15 +720,15 @@ def train_plantvillage_stage(epochs=30, unfreeze_at=10):
     model.compile(
         optimizer=keras.optimizers.Adam(CONFIG['learning_rate_plantvillage'] / 10),
         loss='sparse_categorical_crossentropy',
-        metrics=['accuracy', keras.metrics.TopKCategoricalAccuracy(k=2, name='top2_accuracy')]
+        metrics=['accuracy', keras.metrics.TopKCategoricalAccuracy(k=2, name='top2_accuracy')],
+        jit_compile=True,
     )
     
     history2 = model.fit(
-        X_train_aug, y_train,
-        validation_data=(X_val, y_val),
+        train_ds,
+        validation_data=val_ds,
         epochs=epochs - unfreeze_at,
         initial_epoch=unfreeze_at,
-        batch_size=CONFIG['batch_size'],
         callbacks=callbacks,
         verbose=1
     )
@@ -585,17 +787,16 @@ def train_npk_stage(plantvillage_weights=None, epochs=50, unfreeze_at=20):
     ]
     
     # Data augmentation
-    augmentation = create_data_augmentation()
-    X_train_aug = augmentation(X_train, training=True)
+    train_ds = create_train_dataset(X_train, y_train)
     
     # Phase 1: Train only NPK classifier head
     print(f"\n📚 Phase 1: Training NPK classifier ({unfreeze_at} epochs)...")
     
     history1 = model.fit(
-        X_train_aug, y_train,
+        train_ds,
         validation_data=(X_val, y_val),
         epochs=unfreeze_at,
-        batch_size=CONFIG['batch_size'],
+        validation_batch_size=CONFIG['batch_size'],
         callbacks=callbacks,
         verbose=1
     )
@@ -603,7 +804,7 @@ def train_npk_stage(plantvillage_weights=None, epochs=50, unfreeze_at=20):
     # Phase 2: Unfreeze base and fine-tune
     print(f"\n🔓 Phase 2: Unfreezing base and fine-tuning...")
     
-    base_model = model.layers[1]
+    base_model = get_backbone(model)
     base_model.trainable = True
     
     # Freeze early layers, unfreeze last 30
@@ -622,15 +823,16 @@ def train_npk_stage(plantvillage_weights=None, epochs=50, unfreeze_at=20):
             keras.metrics.AUC(name='auc'),
             keras.metrics.Precision(name='precision'),
             keras.metrics.Recall(name='recall')
-        ]
+        ],
+        jit_compile=True,
     )
     
     history2 = model.fit(
-        X_train_aug, y_train,
+        train_ds,
         validation_data=(X_val, y_val),
         epochs=epochs - unfreeze_at,
         initial_epoch=unfreeze_at,
-        batch_size=CONFIG['batch_size'],
+        validation_batch_size=CONFIG['batch_size'],
         callbacks=callbacks,
         verbose=1
     )
@@ -671,6 +873,22 @@ def main():
         default=30,
         help='Epochs for PlantVillage training'
     )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=CONFIG['batch_size'],
+        help='Batch size (mixed precision on GPU leaves room for 64+)'
+    )
+    parser.add_argument(
+        '--cache-dataset',
+        action='store_true',
+        help='Cache decoded PlantVillage images on disk after the first epoch'
+    )
+    parser.add_argument(
+        '--balance-classes',
+        action='store_true',
+        help='Sample PlantVillage categories uniformly during training'
+    )
     parser.add_argument(
         '--npk-epochs',
         type=int,
@@ -679,6 +897,7 @@ def main():
     )
     
     args = parser.parse_args()
+    CONFIG['batch_size'] = max(1, args.batch_size)
     
     print("\n" + "=" * 80)
     print("🌱 FASALVAIDYA TRANSFER LEARNING PIPELINE")
@@ -692,7 +911,9 @@ def main():
     # Stage 1: PlantVillage
     if args.stage in ['plantvillage', 'both']:
         model, plantvillage_model_path, hist1, hist2 = train_plantvillage_stage(
-            epochs=args.plantvillage_epochs
+            epochs=args.plantvillage_epochs,
+            cache_dataset=args.cache_dataset,
+            balance_classes=args.balance_classes
         )
         
         print(f"\n✅ Stage 1 complete! Weights: {plantvillage_model_path}")
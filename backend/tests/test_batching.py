@@ -0,0 +1,266 @@
+"""
+FasalVaidya Inference Batching Tests
+====================================
+Covers the dynamic request batcher and the batched/quantized TFLite path.
+Run: pytest test_batching.py -v
+"""
+
+import os
+import sys
+import time
+import threading
+import pytest
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import tensorflow as tf
+from tensorflow import keras
+
+from ml import batching
+from ml.batching import DynamicBatcher, predict_batched, submit_batched
+from ml import inference_v2
+
+
+def create_tiny_model(input_shape=(8, 8, 3), outputs=3, batch_size=None):
+    """Small deterministic Keras model standing in for a real classifier."""
+    keras.utils.set_random_seed(0)
+    inputs = keras.Input(input_shape, batch_size=batch_size)
+    x = keras.layers.Flatten()(inputs)
+    x = keras.layers.Dense(outputs, activation='softmax')(x)
+    return keras.Model(inputs, x)
+
+
+def create_inputs(count, shape=(8, 8, 3), seed=0):
+    """Per-request (1, H, W, C) float inputs in the [-1, 1] model range."""
+    rng = np.random.default_rng(seed)
+    return [rng.uniform(-1, 1, (1,) + shape).astype(np.float32) for _ in range(count)]
+
+
+@pytest.fixture(scope='module')
+def model():
+    """Tiny Keras model shared by the batcher tests."""
+    return create_tiny_model()
+
+
+@pytest.fixture
+def recorded_batches(model):
+    """Model batch function that records the size of every batch it runs."""
+    sizes = []
+
+    def predict_batch(batch):
+        sizes.append(len(batch))
+        return model(batch, training=False).numpy()
+
+    predict_batch.sizes = sizes
+    return predict_batch
+
+
+class TestDynamicBatcher:
+    """Test DynamicBatcher fan-out, flushing and error handling."""
+
+    def test_results_fan_out_to_each_request(self, model, recorded_batches):
+        """Each future resolves to the output row of its own input."""
+        batcher = DynamicBatcher(recorded_batches, name='test-fanout', max_batch_size=16, window_ms=100)
+        inputs = create_inputs(5)
+
+        futures = [batcher.submit(x) for x in inputs]
+        results = [f.result(timeout=10) for f in futures]
+
+        for x, row in zip(inputs, results):
+            np.testing.assert_allclose(row, model(x, training=False).numpy()[0], rtol=1e-5, atol=1e-6)
+        # Submitted inside one window, so they ran as a single batch
+        assert recorded_batches.sizes == [5]
+
+    def test_flushes_when_batch_is_full(self, recorded_batches):
+        """A full batch runs without waiting for the window to close."""
+        batcher = DynamicBatcher(recorded_batches, name='test-maxsize', max_batch_size=4, window_ms=200)
+
+        futures = [batcher.submit(x) for x in create_inputs(6)]
+        for f in futures:
+            f.result(timeout=10)
+
+        assert recorded_batches.sizes == [4, 2]
+
+    def test_flushes_when_window_closes(self, recorded_batches):
+        """A lone request runs once the window closes instead of waiting for more."""
+        batcher = DynamicBatcher(recorded_batches, name='test-window', max_batch_size=16, window_ms=20)
+
+        start = time.monotonic()
+        batcher.predict(create_inputs(1)[0], timeout=10)
+
+        assert recorded_batches.sizes == [1]
+        assert time.monotonic() - start < 5
+
+    def test_exception_reaches_every_waiter(self):
+        """A failing batch sets the exception on every request in it."""
+        def failing_batch(batch):
+            raise RuntimeError('model exploded')
+
+        batcher = DynamicBatcher(failing_batch, name='test-error', max_batch_size=16, window_ms=100)
+        futures = [batcher.submit(x) for x in create_inputs(3)]
+
+        for f in futures:
+            with pytest.raises(RuntimeError, match='model exploded'):
+                f.result(timeout=10)
+
+    def test_worker_survives_a_failed_batch(self, recorded_batches):
+        """Requests after a failed batch are still served."""
+        calls = []
+
+        def flaky_batch(batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise RuntimeError('first batch fails')
+            return recorded_batches(batch)
+
+        batcher = DynamicBatcher(flaky_batch, name='test-recover', max_batch_size=16, window_ms=10)
+        with pytest.raises(RuntimeError):
+            batcher.predict(create_inputs(1)[0], timeout=10)
+
+        assert batcher.predict(create_inputs(1)[0], timeout=10).shape == (3,)
+
+    def test_cancelled_request_is_skipped(self, recorded_batches):
+        """Requests cancelled while queued are dropped from the batch."""
+        release = threading.Event()
+
+        def blocking_batch(batch):
+            release.wait(10)
+            return recorded_batches(batch)
+
+        batcher = DynamicBatcher(blocking_batch, name='test-cancel', max_batch_size=16, window_ms=0)
+        first = batcher.submit(create_inputs(1)[0])
+        # Wait until the worker is busy with the first request
+        while not first.running():
+            time.sleep(0.001)
+
+        cancelled = batcher.submit(create_inputs(1)[0])
+        kept = batcher.submit(create_inputs(1)[0])
+        assert cancelled.cancel()
+        release.set()
+
+        first.result(timeout=10)
+        kept.result(timeout=10)
+        assert recorded_batches.sizes == [1, 1]
+
+
+class TestSharedBatchers:
+    """Test the per-model batcher registry behind predict_batched."""
+
+    def test_concurrent_callers_share_one_batcher(self, model, recorded_batches, monkeypatch):
+        """Concurrent predict_batched calls for one model reuse a single worker."""
+        monkeypatch.setattr(batching, '_batchers', {})
+        inputs = create_inputs(8)
+        results = [None] * len(inputs)
+
+        def call(i):
+            results[i] = predict_batched(model, inputs[i], recorded_batches, name='test-shared')
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(len(inputs))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+
+        assert len(batching._batchers) == 1
+        assert sum(recorded_batches.sizes) == len(inputs)
+        for x, row in zip(inputs, results):
+            np.testing.assert_allclose(row, model(x, training=False).numpy()[0], rtol=1e-5, atol=1e-6)
+
+    def test_submit_batched_returns_future(self, model, recorded_batches, monkeypatch):
+        """submit_batched hands back a Future for the caller to wait on."""
+        monkeypatch.setattr(batching, '_batchers', {})
+
+        future = submit_batched(model, create_inputs(1)[0], recorded_batches, name='test-future')
+
+        assert future.result(timeout=10).shape == (3,)
+
+    def test_batching_off_runs_one_request_at_a_time(self, model, recorded_batches, monkeypatch):
+        """With batching disabled the model still gets its worker, fed one request per call."""
+        monkeypatch.setattr(batching, '_batchers', {})
+        monkeypatch.setattr(batching, 'BATCHING_ENABLED', False)
+
+        futures = [submit_batched(model, x, recorded_batches, name='test-off') for x in create_inputs(3)]
+        for f in futures:
+            f.result(timeout=10)
+
+        assert batching._batchers[id(model)].max_batch_size == 1
+        assert recorded_batches.sizes == [1, 1, 1]
+
+
+def convert_to_tflite(model, tmp_path, int8=False):
+    """Convert a Keras model to a TFLite file (full-integer int8 when asked)."""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if int8:
+        def representative_data():
+            for x in create_inputs(32, seed=1):
+                yield [x]
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_data
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    path = tmp_path / ('model_int8.tflite' if int8 else 'model.tflite')
+    path.write_bytes(converter.convert())
+    return inference_v2._load_tflite_model(path)
+
+
+class TestTFLiteBatches:
+    """Test batched and quantized TFLite inference."""
+
+    def test_float_batches_match_keras(self, model, tmp_path):
+        """Batches of any size match Keras and reuse the padded allocation."""
+        tflite_model = convert_to_tflite(model, tmp_path)
+        assert tflite_model.max_batch_size is None
+
+        for batch_size, allocated in [(1, 1), (3, 4), (2, 4), (5, 8), (16, 16), (9, 16)]:
+            batch = np.concatenate(create_inputs(batch_size, seed=batch_size))
+            output = inference_v2.run_tflite_batch(tflite_model, batch)
+
+            assert output.shape == (batch_size, 3)
+            assert tflite_model.input_shape[0] == allocated
+            np.testing.assert_allclose(output, model(batch, training=False).numpy(), atol=1e-5)
+
+    def test_fixed_batch_model_runs_one_image_at_a_time(self, tmp_path, monkeypatch):
+        """Models exported with a fixed batch of 1 are never resized and get a batcher of size 1."""
+        model = create_tiny_model(batch_size=1)
+        tflite_model = convert_to_tflite(model, tmp_path)
+        assert tflite_model.max_batch_size == 1
+
+        monkeypatch.setattr(batching, '_batchers', {})
+        inputs = create_inputs(3)
+        futures = [inference_v2._submit_row(tflite_model, x, name='test-fixed') for x in inputs]
+
+        for x, future in zip(inputs, futures):
+            np.testing.assert_allclose(future.result(timeout=10), model(x, training=False).numpy()[0], atol=1e-5)
+        assert batching._batchers[id(tflite_model)].max_batch_size == 1
+        assert tflite_model.input_shape == [1, 8, 8, 3]
+
+    def test_quantize_input_uses_model_params(self, model, tmp_path):
+        """Float inputs are quantized with the model's own scale and zero point."""
+        tflite_model = convert_to_tflite(model, tmp_path, int8=True)
+        scale, zero_point = tflite_model.input_quant
+        x = create_inputs(1)[0]
+
+        quantized = inference_v2._quantize_input(tflite_model, x)
+
+        assert quantized.dtype == np.int8
+        expected = np.clip(np.rint(x / scale + zero_point), -128, 127).astype(np.int8)
+        np.testing.assert_array_equal(quantized, expected)
+        # Already-quantized input passes through untouched
+        assert inference_v2._quantize_input(tflite_model, quantized) is quantized
+
+    def test_int8_model_output_is_dequantized(self, model, tmp_path):
+        """Full-integer models take float or int8 input and return float scores close to Keras."""
+        tflite_model = convert_to_tflite(model, tmp_path, int8=True)
+        batch = np.concatenate(create_inputs(3, seed=2))
+
+        from_float = inference_v2.run_tflite_batch(tflite_model, batch)
+        from_int8 = inference_v2.run_tflite_batch(
+            tflite_model, inference_v2._quantize_input(tflite_model, batch)
+        )
+
+        assert from_float.dtype == np.float32
+        np.testing.assert_array_equal(from_float, from_int8)
+        np.testing.assert_allclose(from_float, model(batch, training=False).numpy(), atol=0.05)
@@ -0,0 +1,365 @@
+"""
+FasalVaidya Ollama Client Tests
+===============================
+Covers request coalescing, the response cache, generation options and
+the streaming chat endpoint against a fake Ollama HTTP layer.
+Run: pytest test_ollama_client.py -v
+"""
+
+import os
+import sys
+import json
+import base64
+import time
+import logging
+import threading
+import pytest
+from io import BytesIO
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app import app
+from ml import ollama_client
+
+
+class FakeResponse:
+    """Minimal stand-in for a requests.Response."""
+
+    def __init__(self, status_code=200, payload=None, lines=()):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self._lines = lines
+
+    def json(self):
+        return self._payload
+
+    def iter_lines(self):
+        return iter(self._lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Fake Ollama server: /api/tags lists one model, /api/chat streams a reply."""
+
+    def __init__(self, reply='Apply urea.'):
+        self.reply = reply
+        self.chat_payloads = []
+        self.release = None  # optional threading.Event that chat requests wait on
+        self.lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        return FakeResponse(payload={'models': [{'name': 'llava:7b'}]})
+
+    def post(self, url, json=None, stream=False, timeout=None):
+        with self.lock:
+            self.chat_payloads.append(json)
+        if self.release is not None:
+            self.release.wait(10)
+        words = self.reply.split(' ') if self.reply else []
+        lines = [
+            _ndjson({'message': {'content': word if i == 0 else ' ' + word}, 'done': False})
+            for i, word in enumerate(words)
+        ]
+        lines.append(_ndjson({'message': {'content': ''}, 'done': True,
+                              'total_duration': 1000, 'eval_count': len(words)}))
+        return FakeResponse(lines=lines)
+
+
+def _ndjson(chunk):
+    return json.dumps(chunk).encode('utf-8')
+
+
+def wait_until(predicate, timeout=10):
+    """Poll until predicate() is true (fails the test on timeout)."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out waiting for condition'
+        time.sleep(0.001)
+
+
+def coalesced_callers(caplog):
+    """Number of callers that joined an in-flight request instead of sending their own."""
+    return sum(r.getMessage().startswith('ollama_chat_coalesced') for r in caplog.records)
+
+
+def create_image_base64(size=(2000, 1500)):
+    """Base64 JPEG large enough to be downscaled before upload."""
+    img = Image.effect_noise(size, 64).convert('RGB')
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', quality=95)
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+@pytest.fixture
+def session(monkeypatch, caplog):
+    """Route the client's HTTP calls to a fresh fake server with empty caches."""
+    fake = FakeSession()
+    monkeypatch.setattr(ollama_client, '_SESSION', fake)
+    monkeypatch.setattr(ollama_client, '_RESP_CACHE', ollama_client.OrderedDict())
+    monkeypatch.setattr(ollama_client, '_INFLIGHT', {})
+    ollama_client._invalidate_availability()
+    caplog.set_level(logging.INFO, logger='fasalvaidya.ollama')
+    yield fake
+    ollama_client._invalidate_availability()
+
+
+class TestCoalescing:
+    """Test that identical in-flight requests share one call."""
+
+    def test_followers_share_the_leader_result(self, session, caplog):
+        """Callers arriving while a request is in flight wait for its result."""
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_call():
+            calls.append(1)
+            started.set()
+            release.wait(10)
+            return {'success': True, 'response': 'shared'}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(ollama_client._coalesced('k', slow_call)))
+        leader.start()
+        started.wait(10)
+
+        followers = [
+            threading.Thread(target=lambda: results.append(ollama_client._coalesced('k', slow_call)))
+            for _ in range(3)
+        ]
+        for t in followers:
+            t.start()
+        # Followers join the leader's future before it finishes
+        wait_until(lambda: coalesced_callers(caplog) == 3)
+        release.set()
+        for t in [leader] + followers:
+            t.join(10)
+
+        assert len(calls) == 1
+        assert results == [{'success': True, 'response': 'shared'}] * 4
+        assert ollama_client._INFLIGHT == {}
+
+    def test_exception_reaches_followers(self, session, caplog):
+        """A failing leader raises the same error in every waiting caller."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def failing_call():
+            started.set()
+            release.wait(10)
+            raise RuntimeError('server went away')
+
+        errors = []
+
+        def call():
+            try:
+                ollama_client._coalesced('k', failing_call)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(10)
+        follower = threading.Thread(target=call)
+        follower.start()
+        wait_until(lambda: coalesced_callers(caplog) == 1)
+        release.set()
+        leader.join(10)
+        follower.join(10)
+
+        assert errors == ['server went away'] * 2
+        assert ollama_client._INFLIGHT == {}
+
+    def test_concurrent_identical_chats_send_one_request(self, session, caplog):
+        """Concurrent identical chat_with_ollama calls reach Ollama once."""
+        session.release = threading.Event()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(ollama_client.chat_with_ollama('Why yellow leaves?')))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        wait_until(lambda: coalesced_callers(caplog) == 3)
+        session.release.set()
+        for t in threads:
+            t.join(10)
+
+        assert len(session.chat_payloads) == 1
+        assert [r['response'] for r in results] == ['Apply urea.'] * 4
+        # Every caller owns its result dict
+        assert len({id(r) for r in results}) == 4
+
+
+class TestResponseCache:
+    """Test the LRU+TTL cache of chat responses."""
+
+    def test_repeated_question_is_served_from_cache(self, session):
+        """Asking the same fresh question twice calls Ollama once."""
+        first = ollama_client.chat_with_ollama('Signs of nitrogen deficiency in wheat?')
+        first['response'] = 'mutated by caller'
+        second = ollama_client.chat_with_ollama('Signs of nitrogen deficiency in wheat?')
+
+        assert len(session.chat_payloads) == 1
+        assert second['success'] is True
+        assert second['response'] == 'Apply urea.'
+
+    def test_different_context_is_a_different_entry(self, session):
+        """Scan context is part of the cache key."""
+        ollama_client.chat_with_ollama('What now?', context={'crop_name': 'Wheat'})
+        ollama_client.chat_with_ollama('What now?', context={'crop_name': 'Rice'})
+
+        assert len(session.chat_payloads) == 2
+
+    def test_follow_up_turns_are_not_cached(self, session):
+        """Requests with chat history always reach the model."""
+        history = [{'role': 'user', 'content': 'Hi'}, {'role': 'assistant', 'content': 'Hello'}]
+        ollama_client.chat_with_ollama('And potassium?', chat_history=history)
+        ollama_client.chat_with_ollama('And potassium?', chat_history=history)
+
+        assert len(session.chat_payloads) == 2
+        assert len(ollama_client._RESP_CACHE) == 0
+
+    def test_blank_replies_are_not_cached(self, session):
+        """An empty generation is retried instead of cached."""
+        session.reply = ''
+        result = ollama_client.chat_with_ollama('Anything?')
+        ollama_client.chat_with_ollama('Anything?')
+
+        assert result['success'] is True
+        assert len(session.chat_payloads) == 2
+        assert len(ollama_client._RESP_CACHE) == 0
+
+    def test_failures_are_not_cached(self, session):
+        """Error replies are not stored."""
+        session.post = lambda *args, **kwargs: FakeResponse(status_code=500, payload={'error': 'boom'})
+        result = ollama_client.chat_with_ollama('Anything?')
+
+        assert result == {'success': False, 'error': 'boom'}
+        assert len(ollama_client._RESP_CACHE) == 0
+
+    def test_expired_entries_are_refetched(self, session, monkeypatch):
+        """Entries older than the TTL are dropped."""
+        ollama_client.chat_with_ollama('Signs of potassium deficiency?')
+        monkeypatch.setattr(ollama_client, '_RESP_CACHE_TTL', 0.0)
+        ollama_client.chat_with_ollama('Signs of potassium deficiency?')
+
+        assert len(session.chat_payloads) == 2
+
+    def test_least_recently_used_entry_is_evicted(self, session, monkeypatch):
+        """Past the size limit the least recently used answer goes first."""
+        monkeypatch.setattr(ollama_client, '_RESP_CACHE_MAX', 2)
+        ollama_client.chat_with_ollama('a')
+        ollama_client.chat_with_ollama('b')
+        ollama_client.chat_with_ollama('a')  # hit: 'a' becomes most recent
+        ollama_client.chat_with_ollama('c')  # evicts 'b'
+        ollama_client.chat_with_ollama('a')
+        ollama_client.chat_with_ollama('b')
+
+        asked = [p['messages'][-1]['content'] for p in session.chat_payloads]
+        assert asked == ['a', 'b', 'c', 'b']
+
+    def test_image_hit_skips_image_preparation(self, session, monkeypatch):
+        """A cached image question is answered without decoding the image again."""
+        prepared = []
+        original_prepare = ollama_client.prepare_image_base64
+        monkeypatch.setattr(
+            ollama_client, 'prepare_image_base64',
+            lambda image: prepared.append(1) or original_prepare(image)
+        )
+        image = create_image_base64()
+
+        ollama_client.chat_with_ollama('Analyze this leaf', image_base64=image)
+        ollama_client.chat_with_ollama('Analyze this leaf', image_base64=image)
+
+        assert len(prepared) == 1
+        assert len(session.chat_payloads) == 1
+        sent = session.chat_payloads[0]['messages'][-1]['images'][0]
+        # The large upload was downscaled before being sent
+        assert len(sent) < len(image)
+
+
+class TestChatOptions:
+    """Test the generation options sent to Ollama."""
+
+    def test_model_stays_loaded_between_turns(self, session):
+        """Every chat asks Ollama to keep the model in memory."""
+        ollama_client.chat_with_ollama('Signs of nitrogen deficiency?')
+
+        assert session.chat_payloads[0]['keep_alive'] == ollama_client.OLLAMA_KEEP_ALIVE
+
+    def test_text_turns_stop_after_the_answer(self, session):
+        """Text questions get stop tokens and a short token cap."""
+        ollama_client.chat_with_ollama('Signs of nitrogen deficiency?')
+
+        options = session.chat_payloads[0]['options']
+        assert options['stop'] == ollama_client.CHAT_STOP
+        assert options['num_predict'] == 64
+
+    def test_image_turns_have_no_stop_tokens(self, session):
+        """Leaf analyses span several blocks, so nothing stops them early."""
+        ollama_client.chat_with_ollama('Analyze this leaf', image_base64=create_image_base64((64, 64)))
+
+        options = session.chat_payloads[0]['options']
+        assert 'stop' not in options
+        assert options['num_predict'] == 160
+
+
+@pytest.fixture
+def client():
+    """Create test client."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def read_events(response):
+    """Decode the JSON payloads of a Server-Sent Events response."""
+    body = response.get_data(as_text=True)
+    return [json.loads(line[len('data: '):]) for line in body.split('\n\n') if line.startswith('data: ')]
+
+
+class TestChatStreamEndpoint:
+    """Test /api/chat/stream endpoint."""
+
+    def test_streams_deltas_then_done(self, client, session):
+        """The reply arrives as delta events followed by a done event."""
+        response = client.post('/api/chat/stream', json={'message': 'Why yellow leaves?'})
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        events = read_events(response)
+        assert ''.join(e['delta'] for e in events if 'delta' in e) == 'Apply urea.'
+        assert events[-1] == {'done': True, 'model': ollama_client.OLLAMA_MODEL}
+        assert session.chat_payloads[0]['stream'] is True
+
+    def test_requires_message(self, client, session):
+        """An empty message is rejected before anything is streamed."""
+        response = client.post('/api/chat/stream', json={'message': '  '})
+
+        assert response.status_code == 400
+        assert session.chat_payloads == []
+
+    def test_server_error_becomes_error_event(self, client, session):
+        """An Ollama error reply is sent as an error event."""
+        session.post = lambda *args, **kwargs: FakeResponse(status_code=500, payload={'error': 'model not found'})
+
+        events = read_events(client.post('/api/chat/stream', json={'message': 'Hi'}))
+
+        assert events == [{'error': 'model not found', 'needs_connection': False}]
+
+    def test_unavailable_server_asks_for_connection(self, client, session):
+        """When Ollama is down the stream reports needs_connection."""
+        session.get = lambda *args, **kwargs: FakeResponse(status_code=503)
+
+        events = read_events(client.post('/api/chat/stream', json={'message': 'Hi'}))
+
+        assert len(events) == 1
+        assert events[0]['needs_connection'] is True